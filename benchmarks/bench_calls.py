@@ -0,0 +1,195 @@
+"""
+Benchmark de llamadas a función de la Máquina Virtual Patito
+
+Mide el costo de un par push / pop de registro de activación con:
+- el esquema con dicts (un ActivationRecord y dos dicts nuevos por llamada)
+- el esquema de cuatro listas por ActivationRecord
+- el frame plano actual sacado de la free list de la función (FrameLayout)
+Los dos primeros se reproducen aquí como referencia.
+
+También corre programas con muchas llamadas y reporta llamadas por segundo
+y cuántos frames se crearon en total (los demás salieron de la free list).
+
+Uso:
+    python benchmarks/bench_calls.py [repeticiones]
+"""
+
+import io
+import sys
+import time
+import timeit
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.frame_layout import FrameLayout
+from patito.virtual_machine import ExecutionMemory
+
+RESOURCES = {'local_int': 3, 'local_float': 1, 'temp_int': 4, 'temp_float': 2}
+
+
+class DictRecord:
+    """Esquema con dicts: memoria local y temporal en dicts nuevos."""
+
+    def __init__(self, return_address):
+        self.local_memory = {}
+        self.temp_memory = {}
+        self.return_address = return_address
+
+
+class ListRecord:
+    """Esquema de cuatro listas por registro de activación."""
+
+    __slots__ = ('local_int', 'local_float', 'temp_int', 'temp_float', 'return_address')
+
+    def __init__(self, return_address, local_int=0, local_float=0, temp_int=0, temp_float=0):
+        self.local_int = [0] * local_int
+        self.local_float = [0] * local_float
+        self.temp_int = [0] * temp_int
+        self.temp_float = [0] * temp_float
+        self.return_address = return_address
+
+
+class LegacyStack:
+    def __init__(self, make_record):
+        self.make_record = make_record
+        self.call_stack = []
+        self.current = make_record(-1)
+
+    def push(self, return_address):
+        self.call_stack.append(self.current)
+        self.current = self.make_record(return_address)
+
+    def pop(self):
+        return_address = self.current.return_address
+        self.current = self.call_stack.pop()
+        return return_address
+
+
+def bench_push_pop(number):
+    """ns por par push / pop con cada esquema."""
+    sizes = [RESOURCES[name] for name in ('local_int', 'local_float', 'temp_int', 'temp_float')]
+
+    dicts = LegacyStack(DictRecord)
+    lists = LegacyStack(lambda ret: ListRecord(ret, *sizes))
+    memory = ExecutionMemory()
+    layout = FrameLayout('f', *sizes)
+
+    def dict_cycle():
+        dicts.push(1)
+        dicts.pop()
+
+    def list_cycle():
+        lists.push(1)
+        lists.pop()
+
+    def flat_cycle():
+        memory.push_activation_record(1, layout)
+        memory.pop_activation_record()
+
+    results = {}
+    for name, cycle in (('dicts', dict_cycle), ('4 listas', list_cycle), ('frame plano', flat_cycle)):
+        results[name] = timeit.timeit(cycle, number=number) / number * 1e9
+    return results
+
+
+PROGRAMS = {
+    'fib recursivo (20)': """
+programa Fib;
+var r: int;
+int fib(n: int) {
+    {
+        if (n < 2) {
+            return(n);
+        };
+        return(fib(n - 1) + fib(n - 2));
+    }
+};
+main {
+    r = fib(20);
+    print(r);
+}
+end
+""",
+    'llamadas en ciclo': """
+programa Llamadas;
+var k, t: int;
+var f: float;
+int suma(a: int, b: int) {
+    var c: int;
+    {
+        c = a + b;
+        return(c);
+    }
+};
+float mezcla(x: int, y: float) {
+    {
+        return(x * y / 2);
+    }
+};
+main {
+    k = 0;
+    t = 0;
+    f = 1.0;
+    while (k < 20000) do {
+        t = suma(t, k);
+        f = mezcla(k, f) / 1000;
+        k = k + 1;
+    };
+    print(t);
+}
+end
+""",
+}
+
+
+def bench_program(source, repeats):
+    obj_data = parse_and_validate(source).to_obj()
+    best = float('inf')
+    for _ in range(repeats):
+        vm = VirtualMachine(obj_data)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            vm.execute()
+        best = min(best, time.perf_counter() - start)
+    # Al terminar, todos los frames creados quedaron en alguna free list
+    created = sum(len(layout.free) for layout in vm.frame_layouts.values())
+    return best, created
+
+
+def count_calls(source):
+    """Cuenta las llamadas ejecutadas corriendo el programa con un contador."""
+    obj_data = parse_and_validate(source).to_obj()
+    vm = VirtualMachine(obj_data)
+    calls = [0]
+    original = vm.memory.push_activation_record
+
+    def counting_push(*args):
+        calls[0] += 1
+        return original(*args)
+
+    vm.memory.push_activation_record = counting_push
+    with contextlib.redirect_stdout(io.StringIO()):
+        vm.execute()
+    return calls[0]
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    print("Push + pop de registro de activación (ns por par)")
+    for name, ns in bench_push_pop(200_000).items():
+        print(f"  {name:12} {ns:8.1f}")
+
+    print("\nProgramas con llamadas")
+    for title, source in PROGRAMS.items():
+        elapsed, created = bench_program(source, repeats)
+        calls = count_calls(source)
+        print(f"  {title:22} {calls:7} llamadas  {calls / elapsed / 1000:8.1f} mil llamadas/s  "
+              f"{created} frames creados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark de checkpoints de la Máquina Virtual Patito
+
+Pausa una recursión a distintas profundidades y mide el tamaño del
+checkpoint y lo que tarda guardarlo (checkpoint()) y restaurarlo en una
+VM nueva (restore()).
+
+Uso:
+    python benchmarks/bench_checkpoint.py [profundidad ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.output_sink import DiscardSink
+
+DEPTHS = (10, 1_000, 10_000, 100_000)
+
+SOURCE = """
+programa Profundo;
+var r: int;
+int baja(n: int) {
+    {
+        if (n < 1) {
+            return(0);
+        };
+        return(baja(n - 1) + 1);
+    }
+};
+main {
+    r = baja(%d);
+    print(r);
+}
+end
+"""
+
+
+def paused_at_depth(obj_data, depth):
+    """VM pausada con `depth` llamadas activas."""
+    vm = VirtualMachine(obj_data, max_depth=depth + 2)
+    vm.start(DiscardSink())
+    while len(vm.memory.return_stack) < depth:
+        vm.resume(max(1, (depth - len(vm.memory.return_stack)) * 4))
+    return vm
+
+
+def bench(depth, repeats=5):
+    obj_data = parse_and_validate(SOURCE % depth).to_obj()
+    vm = paused_at_depth(obj_data, depth)
+    vm.checkpoint()     # el hash del programa se calcula una vez
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        snapshot = vm.checkpoint()
+    save_ms = (time.perf_counter() - start) / repeats * 1000
+
+    restored = VirtualMachine(obj_data, max_depth=depth + 2)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        restored.restore(snapshot, DiscardSink())
+    load_ms = (time.perf_counter() - start) / repeats * 1000
+
+    assert restored.resume() and restored.quad_count > vm.quad_count
+    return len(snapshot), save_ms, load_ms
+
+
+def main():
+    depths = [int(arg) for arg in sys.argv[1:]] or DEPTHS
+    print("Checkpoint a media recursión")
+    print(f"  {'profundidad':>12} {'bytes':>10} {'B/nivel':>8} {'guardar':>10} {'restaurar':>10}")
+    for depth in depths:
+        size, save_ms, load_ms = bench(depth)
+        print(f"  {depth:12} {size:10} {size / depth:8.1f} {save_ms:7.2f} ms {load_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
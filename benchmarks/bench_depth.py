@@ -0,0 +1,104 @@
+"""
+Benchmark de recursión profunda de la Máquina Virtual Patito
+
+Corre una función que se llama a sí misma N veces (sin regresar hasta el
+fondo) y mide con tracemalloc el pico de memoria de la corrida dividido
+entre N: los bytes que cuesta cada nivel de recursión.
+
+Como referencia reproduce el mismo stack con el esquema anterior (un
+ActivationRecord con dos dicts por nivel, con las mismas celdas).
+
+Uso:
+    python benchmarks/bench_depth.py [profundidad ...]
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.output_sink import CaptureSink
+from patito.frame_layout import FRAME_SEGMENTS
+
+DEPTHS = (100_000, 300_000, 1_000_000)
+
+SOURCE = """
+programa Profundo;
+var r: int;
+int baja(n: int) {
+    {
+        if (n < 1) {
+            return(0);
+        };
+        return(baja(n - 1) + 1);
+    }
+};
+main {
+    r = baja(%d);
+    print(r);
+}
+end
+"""
+
+
+class DictRecord:
+    """Esquema anterior: memoria local y temporal en dicts por registro."""
+
+    def __init__(self, return_address):
+        self.local_memory = {}
+        self.temp_memory = {}
+        self.return_address = return_address
+
+
+def dict_bytes_per_level(depth, layout):
+    """Bytes por nivel de un stack de DictRecord con las celdas del layout."""
+    local_cells = layout.sizes[FRAME_SEGMENTS[0]] + layout.sizes[FRAME_SEGMENTS[1]]
+    temp_cells = layout.sizes[FRAME_SEGMENTS[2]] + layout.sizes[FRAME_SEGMENTS[3]]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    stack = []
+    for level in range(depth):
+        record = DictRecord(level)
+        for cell in range(local_cells):
+            record.local_memory[3000 + cell] = level + 1000
+        for cell in range(temp_cells):
+            record.temp_memory[5000 + cell] = level + 1000
+        stack.append(record)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del stack
+    return used / depth
+
+
+def bench_vm(depth):
+    """(bytes por nivel, segundos) de la VM a la profundidad dada."""
+    obj_data = parse_and_validate(SOURCE % depth).to_obj()
+    vm = VirtualMachine(obj_data, max_depth=depth + 1)
+    sink = CaptureSink()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    vm.execute(sink)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert sink.captured == [str(depth)], sink.captured
+    return (peak - before) / depth, elapsed, vm.frame_layouts['baja']
+
+
+def main():
+    depths = [int(arg) for arg in sys.argv[1:]] or DEPTHS
+
+    print("Recursión profunda (pico de memoria / profundidad)")
+    print(f"  {'profundidad':>12} {'frame plano':>14} {'dicts':>14} {'tiempo':>9}")
+    for depth in depths:
+        per_level, elapsed, layout = bench_vm(depth)
+        dict_level = dict_bytes_per_level(depth, layout)
+        print(f"  {depth:12} {per_level:10.1f} B/n {dict_level:10.1f} B/n {elapsed:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Benchmark de despacho por opcode de la Máquina Virtual Patito
+
+Para cada opcode arma un programa sintético con un ciclo cuyo cuerpo repite
+K veces ese cuádruplo, y mide el costo por ejecución restando la corrida con
+K = 0. Compara el loop actual (opcodes enteros decodificados al cargar)
+contra el despacho anterior por strings, que se reproduce aquí como
+referencia sobre la misma ExecutionMemory.
+
+Uso:
+    python benchmarks/bench_dispatch.py [iteraciones] [K]
+"""
+
+import os
+import sys
+import time
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import VirtualMachine
+
+CONSTANTS = {7000: 0, 7001: 1, 7003: 3, 8000: 2.5, 8001: 1.5}
+ITER_CONST = 7002
+
+# Cuerpo de cada caso: función (índice del cuádruplo) -> lista de cuádruplos
+CASES = {
+    'PLUS': lambda i: [('PLUS', 1001, 7003, 1002)],
+    'MINUS': lambda i: [('MINUS', 1001, 7003, 1002)],
+    'MUL': lambda i: [('MUL', 1001, 7003, 1002)],
+    'DIV': lambda i: [('DIV', 1001, 7003, 1002)],
+    'DIV_II': lambda i: [('DIV_II', 1001, 7003, 1002)],
+    'DIV_FF': lambda i: [('DIV_FF', 8000, 8001, 2000)],
+    'GT': lambda i: [('GT', 1001, 7003, 5001)],
+    'LT': lambda i: [('LT', 1001, 7003, 5001)],
+    'NEQ': lambda i: [('NEQ', 1001, 7003, 5001)],
+    '=': lambda i: [('=', 7003, None, 1001)],
+    'GOTO': lambda i: [('GOTO', None, None, i + 1)],
+    'GOTOF': lambda i: [('GOTOF', 7001, None, i + 1)],
+    'PRINT': lambda i: [('PRINT', 1001, None, None)],
+    'ERA+PARAM+GOSUB+ENDFUNC': lambda i: [
+        ('ERA', 'f', None, None),
+        ('PARAM', 7001, None, 0),
+        ('GOSUB', 'f', None, 1),
+    ],
+}
+
+
+def build_program(body_fn, repeat, iterations):
+    """Arma el .obj de un ciclo de `iterations` vueltas con el cuerpo repetido."""
+    quads = [('GOTO', None, None, 2), ('ENDFUNC', None, None, None)]
+    quads.append(('=', 7000, None, 1000))                    # i = 0
+    header = len(quads)
+    quads.append(('LT', 1000, ITER_CONST, 5000))            # i < N
+    exit_jump = len(quads)
+    quads.append(None)
+    for _ in range(repeat):
+        quads.extend(body_fn(len(quads)))
+    quads.append(('PLUS', 1000, 7001, 1000))                # i = i + 1
+    quads.append(('GOTO', None, None, header))
+    quads[exit_jump] = ('GOTOF', 5000, None, len(quads))
+    quads.append(('END', None, None, None))
+
+    constants = dict(CONSTANTS)
+    constants[ITER_CONST] = iterations
+    return {
+        'program_name': 'BenchDispatch',
+        'quadruples': quads,
+        'constants': constants,
+        'functions': {
+            'f': {
+                'name': 'f', 'return_type': 'void', 'quad_start': 1, 'return_address': None,
+                'params': [{'name': 'x', 'type': 'int'}],
+                'resources': {'local_int': 1, 'local_float': 0, 'temp_int': 0, 'temp_float': 0},
+            }
+        },
+    }
+
+
+def legacy_execute(vm):
+    """Despacho anterior: cadena de comparaciones de strings por cuádruplo."""
+    memory = vm.memory
+    quads = vm.quadruples
+    ip = 0
+    running = True
+    param_stack = []
+    while running and ip < len(quads):
+        op, arg1, arg2, result = quads[ip]
+        next_ip = ip + 1
+        if op == 'PLUS':
+            memory.set_value(result, memory.get_value(arg1) + memory.get_value(arg2))
+        elif op == 'MINUS':
+            memory.set_value(result, memory.get_value(arg1) - memory.get_value(arg2))
+        elif op == 'MUL':
+            memory.set_value(result, memory.get_value(arg1) * memory.get_value(arg2))
+        elif op == 'DIV':
+            val1 = memory.get_value(arg1)
+            val2 = memory.get_value(arg2)
+            if val2 == 0:
+                raise RuntimeError("División por cero")
+            if isinstance(val1, int) and isinstance(val2, int):
+                memory.set_value(result, val1 // val2)
+            else:
+                memory.set_value(result, val1 / val2)
+        elif op == 'DIV_II':
+            memory.set_value(result, memory.get_value(arg1) // memory.get_value(arg2))
+        elif op == 'DIV_FF':
+            memory.set_value(result, memory.get_value(arg1) / memory.get_value(arg2))
+        elif op == 'GT':
+            memory.set_value(result, 1 if memory.get_value(arg1) > memory.get_value(arg2) else 0)
+        elif op == 'LT':
+            memory.set_value(result, 1 if memory.get_value(arg1) < memory.get_value(arg2) else 0)
+        elif op == 'NEQ':
+            memory.set_value(result, 1 if memory.get_value(arg1) != memory.get_value(arg2) else 0)
+        elif op == '=':
+            memory.set_value(result, memory.get_value(arg1))
+        elif op == 'GOTO':
+            next_ip = result
+        elif op == 'GOTOF':
+            val = memory.get_value(arg1)
+            if val == 0 or val is False:
+                next_ip = result
+        elif op == 'PRINT':
+            output = arg1 if isinstance(arg1, str) else str(memory.get_value(arg1))
+            print(output, end='')
+        elif op == 'ERA':
+            param_stack = []
+        elif op == 'PARAM':
+            param_stack.append((result, memory.get_value(arg1)))
+        elif op == 'GOSUB':
+            memory.push_activation_record(ip + 1, vm.frame_layouts[arg1])
+            param_stack.sort(key=lambda x: x[0])
+            for i, (_, value) in enumerate(param_stack):
+                memory.set_value(3000 + i, value)
+            param_stack = []
+            next_ip = result
+        elif op == 'RETURN':
+            val = memory.get_value(arg1)
+            next_ip = memory.pop_activation_record()
+            if result is not None:
+                memory.set_value(result, val)
+        elif op == 'ENDFUNC':
+            next_ip = memory.pop_activation_record()
+        elif op == 'END':
+            running = False
+        ip = next_ip
+
+
+def timed(obj_data, legacy, repeats=3):
+    best = float('inf')
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeats):
+            vm = VirtualMachine(obj_data, optimize=False)
+            start = time.perf_counter()
+            if legacy:
+                legacy_execute(vm)
+            else:
+                vm.execute()
+            best = min(best, time.perf_counter() - start)
+    return best
+
+
+def per_op_ns(body_fn, repeat, iterations, legacy):
+    empty = timed(build_program(body_fn, 0, iterations), legacy)
+    full = timed(build_program(body_fn, repeat, iterations), legacy)
+    return (full - empty) / (repeat * iterations) * 1e9
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print(f"Despacho por opcode ({iterations} vueltas x {repeat} repeticiones, ns por ejecución)")
+    print(f"{'opcode':26} {'strings':>9} {'enteros':>9} {'mejora':>7}")
+    for name, body_fn in CASES.items():
+        old = per_op_ns(body_fn, repeat, iterations, legacy=True)
+        new = per_op_ns(body_fn, repeat, iterations, legacy=False)
+        speedup = old / new if new > 0 else float('inf')
+        print(f"{name:26} {old:9.1f} {new:9.1f} {speedup:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark de motores de ejecución de la Máquina Virtual Patito
+
+Corre los mismos programas con cada motor (ver virtual_machine.ENGINES),
+verifica que la salida sea idéntica a la del intérprete y reporta el tiempo
+y la mejora contra 'interp'.
+
+Uso:
+    python benchmarks/bench_engines.py [repeticiones]
+"""
+
+import io
+import sys
+import time
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.virtual_machine import ENGINES
+
+PROGRAMS = {
+    'fib recursivo (22)': """
+programa Fib;
+var r: int;
+int fib(n: int) {
+    {
+        if (n < 2) {
+            return(n);
+        };
+        return(fib(n - 1) + fib(n - 2));
+    }
+};
+main {
+    r = fib(22);
+    print(r);
+}
+end
+""",
+    'ciclos anidados': """
+programa Ciclos;
+var i, j, s: int;
+var f: float;
+main {
+    i = 0;
+    s = 0;
+    f = 0.0;
+    while (i < 400) do {
+        j = 0;
+        while (j < 150) do {
+            s = s + i * j - j / 3;
+            f = f + 0.5;
+            j = j + 1;
+        };
+        i = i + 1;
+    };
+    print(s, " ", f);
+}
+end
+""",
+    'muchas llamadas': """
+programa Llamadas;
+var k, t: int;
+int suma(a: int, b: int) {
+    {
+        return(a + b);
+    }
+};
+main {
+    k = 0;
+    t = 0;
+    while (k < 20000) do {
+        t = suma(t, k);
+        k = k + 1;
+    };
+    print(t);
+}
+end
+""",
+}
+
+
+def run_once(obj_data, engine):
+    vm = VirtualMachine(obj_data, engine=engine)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        output = vm.execute()
+    return time.perf_counter() - start, output
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    for title, source in PROGRAMS.items():
+        obj_data = parse_and_validate(source).to_obj()
+        print(f"\n{title}")
+        reference = None
+        base_time = None
+        for engine in ENGINES:
+            best = float('inf')
+            for _ in range(repeats):
+                elapsed, output = run_once(obj_data, engine)
+                best = min(best, elapsed)
+            if reference is None:
+                reference, base_time = output, best
+            same = "ok" if output == reference else "SALIDA DISTINTA"
+            print(f"  {engine:10} {best * 1000:9.1f} ms  {base_time / best:5.2f}x  {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark de los hooks de depuración de la Máquina Virtual Patito
+
+Compara, para las cargas de bench_suite.py, el tiempo de execute() de una
+VM normal contra:
+
+    - la misma VM después de registrar y quitar un hook (debe costar lo
+      mismo: sin hooks execute() usa el loop de siempre),
+    - la VM con un solo hook vacío de cada evento (el costo que paga quien
+      sí depura).
+
+Uso:
+    python benchmarks/bench_hooks.py [--repeat=N] [--engine=interp|threaded] [--only=fib,ciclos]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from patito import VirtualMachine, parse_and_validate
+from patito.output_sink import DiscardSink
+from patito.patito_cli import split_options
+from patito.vm_hooks import HOOK_EVENTS
+
+from bench_suite import WORKLOADS
+
+NO_OP = {
+    'quad': lambda vm, ip: None,
+    'call': lambda vm, name: None,
+    'return': lambda vm, name, value: None,
+    'print': lambda vm, text: None,
+    'write': lambda vm, ip, address, value: None,
+}
+
+
+def best_time(vm, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vm.execute(DiscardSink())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def hooked_vm(obj_data, engine, event):
+    vm = VirtualMachine(obj_data, engine=engine)
+    vm.add_hook(event, NO_OP[event])
+    return vm
+
+
+def main():
+    _, options = split_options(sys.argv[1:])
+    repeat = int(options.get('repeat', 5))
+    engine = options.get('engine', 'interp')
+    names = options['only'].split(',') if 'only' in options else [
+        name for name in WORKLOADS if name != 'fuente_grande']
+
+    columns = ('normal', 'quitados') + HOOK_EVENTS
+    print(f"Motor '{engine}', mejor de {repeat} (ms; entre paréntesis, relativo a normal)")
+    print(f"  {'carga':12}" + "".join(f" {column:>16}" for column in columns))
+    for name in names:
+        obj_data = parse_and_validate(WORKLOADS[name]).to_obj()
+        plain = best_time(VirtualMachine(obj_data, engine=engine), repeat)
+
+        removed = hooked_vm(obj_data, engine, 'quad')
+        removed.remove_hook('quad', NO_OP['quad'])
+        times = [plain, best_time(removed, repeat)]
+        times += [best_time(hooked_vm(obj_data, engine, event), repeat) for event in HOOK_EVENTS]
+
+        print(f"  {name:12}" + "".join(
+            f" {t * 1000:8.2f} ({t / plain:4.2f}x)" for t in times))
+
+
+if __name__ == "__main__":
+    main()
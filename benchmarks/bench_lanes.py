@@ -0,0 +1,132 @@
+"""
+Benchmark de la ejecución por carriles de la Máquina Virtual Patito
+
+Corre un programa sobre N entradas de dos formas y compara el tiempo:
+
+- escalar: la misma VM (motor 'interp') corrida una vez por entrada, con
+  la global de entrada puesta entre start() y resume()
+- carriles: una sola corrida de LaneMachine con un carril por entrada
+
+Programas:
+- uniforme: un ciclo con el mismo número de vueltas en todos los
+  carriles (sin divergencia)
+- divergente: el número de vueltas y la rama del if dependen de la
+  entrada de cada carril
+- recursivo: fib(n) con n distinto por carril
+
+Uso:
+    python benchmarks/bench_lanes.py [carriles ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.output_sink import DiscardSink
+from patito.vm_lanes import LaneMachine
+
+LANES = (100, 1_000, 10_000)
+
+UNIFORME = """
+programa Uniforme;
+var n, i, s: int;
+main {
+    i = 0;
+    s = 0;
+    while (i < 200) do {
+        s = s + i * n;
+        i = i + 1;
+    };
+    print(s);
+}
+end
+"""
+
+DIVERGENTE = """
+programa Divergente;
+var n, i, s: int;
+main {
+    i = 0;
+    s = 0;
+    while (i < n) do {
+        if (i > 100) {
+            s = s + i;
+        } else {
+            s = s - 1;
+        };
+        i = i + 1;
+    };
+    print(s);
+}
+end
+"""
+
+RECURSIVO = """
+programa Recursivo;
+var n: int;
+int fib(k: int) {
+    {
+        if (k < 2) {
+            return(k);
+        };
+        return(fib(k - 1) + fib(k - 2));
+    }
+};
+main {
+    print(fib(n));
+}
+end
+"""
+
+PROGRAMS = (
+    ('uniforme', UNIFORME, lambda lane: lane % 97),
+    ('divergente', DIVERGENTE, lambda lane: 150 + lane % 100),
+    ('recursivo', RECURSIVO, lambda lane: 8 + lane % 5),
+)
+
+
+def bench_scalar(obj_data, values):
+    """Una corrida del motor 'interp' por entrada."""
+    vm = VirtualMachine(obj_data)
+    offset = obj_data['globals']['n'] - 1000
+    sink = DiscardSink()
+    quads = 0
+    start = time.perf_counter()
+    for value in values:
+        # start() deja las globales en 0: la entrada se pone antes de correr
+        vm.start(sink)
+        vm.memory.global_int[offset] = value
+        vm.resume()
+        quads += vm.quad_count
+    return time.perf_counter() - start, quads
+
+
+def bench_lanes(obj_data, values):
+    machine = LaneMachine(obj_data, len(values))
+    start = time.perf_counter()
+    records = machine.run({'n': values})
+    elapsed = time.perf_counter() - start
+    quads = sum(record['quads'] for record in records)
+    return elapsed, quads, quads / (machine.steps * len(values))
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or LANES
+    print(f"  {'programa':12} {'carriles':>8} {'escalar':>10} {'carriles':>10} "
+          f"{'speedup':>8} {'ocupación':>10}")
+    for name, source, value in PROGRAMS:
+        obj_data = parse_and_validate(source).to_obj()
+        for count in counts:
+            values = [value(lane) for lane in range(count)]
+            scalar_time, scalar_quads = bench_scalar(obj_data, values)
+            lanes_time, lanes_quads, occupancy = bench_lanes(obj_data, values)
+            assert lanes_quads == scalar_quads, (lanes_quads, scalar_quads)
+            print(f"  {name:12} {count:8} {scalar_time * 1000:7.1f} ms {lanes_time * 1000:7.1f} ms "
+                  f"{scalar_time / lanes_time:7.1f}x {occupancy:9.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmark de acceso a memoria de la Máquina Virtual Patito
+
+Mide el costo por acceso de get_value / set_value en cada segmento y el
+costo por cuádruplo de un programa con ciclos. Compara la memoria actual
+(listas planas por segmento) contra el esquema anterior de diccionarios,
+que se reproduce aquí como referencia.
+
+Uso:
+    python benchmarks/bench_memory.py [repeticiones]
+"""
+
+import io
+import sys
+import time
+import timeit
+import contextlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.virtual_machine import ExecutionMemory
+
+
+class DictMemory:
+    """Esquema anterior: un dict por segmento y cadena de rangos por acceso."""
+
+    def __init__(self):
+        self.global_memory = {}
+        self.current_local = {}
+        self.current_temp = {}
+        self.constant_memory = {}
+
+    def get_segment(self, address):
+        if 1000 <= address < 3000:
+            return 'global'
+        elif 3000 <= address < 5000:
+            return 'local'
+        elif 5000 <= address < 7000:
+            return 'temp'
+        elif 7000 <= address < 9000:
+            return 'constant'
+        raise ValueError(f"Dirección {address} fuera de rango válido")
+
+    def get_value(self, address):
+        segment = self.get_segment(address)
+        if segment == 'global':
+            return self.global_memory.get(address, 0)
+        elif segment == 'local':
+            return self.current_local.get(address, 0)
+        elif segment == 'temp':
+            return self.current_temp.get(address, 0)
+        return self.constant_memory[address]
+
+    def set_value(self, address, value):
+        segment = self.get_segment(address)
+        if segment == 'global':
+            self.global_memory[address] = value
+        elif segment == 'local':
+            self.current_local[address] = value
+        elif segment == 'temp':
+            self.current_temp[address] = value
+
+
+LOOP_PROGRAM = """
+programa BenchMemoria;
+var i, j, s: int;
+var f: float;
+
+main {
+    i = 0;
+    s = 0;
+    f = 0.0;
+    while (i < 300) do {
+        j = 0;
+        while (j < 100) do {
+            s = s + i * j - j;
+            f = f + 0.5;
+            j = j + 1;
+        };
+        i = i + 1;
+    };
+    print(s);
+}
+end
+"""
+
+# Una dirección representativa por segmento
+ADDRESSES = {
+    'global': 1003,
+    'local': 3002,
+    'temp': 5004,
+    'constant': 7001,
+}
+
+
+def bench_access(memory, number):
+    """Regresa {segmento: (ns por get, ns por set)}."""
+    results = {}
+    for segment, address in ADDRESSES.items():
+        get_time = timeit.timeit(lambda: memory.get_value(address), number=number)
+        if segment == 'constant':
+            set_time = None
+        else:
+            set_time = timeit.timeit(lambda: memory.set_value(address, 1), number=number)
+        results[segment] = (
+            get_time / number * 1e9,
+            set_time / number * 1e9 if set_time is not None else None,
+        )
+    return results
+
+
+def bench_program(repeats):
+    """Regresa (ns por cuádruplo, cuádruplos ejecutados)."""
+    obj_data = parse_and_validate(LOOP_PROGRAM).to_obj()
+
+    vm = VirtualMachine(obj_data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        vm.execute()
+    executed = vm.quad_count
+
+    best = float('inf')
+    for _ in range(repeats):
+        vm = VirtualMachine(obj_data)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            vm.execute()
+        best = min(best, time.perf_counter() - start)
+
+    return best / executed * 1e9, executed
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    number = 200_000
+
+    legacy = DictMemory()
+    legacy.constant_memory = {7001: 5}
+    for address in (1003, 3002, 5004):
+        legacy.set_value(address, 1)
+
+    current = ExecutionMemory(global_int=10)
+    current.load_constants({7000: 1, 7001: 5})
+    current.size_main_frame({3: 5, 4: 0, 5: 8, 6: 0})
+
+    print("Acceso a memoria (ns por operación)")
+    print(f"{'segmento':10} {'get dict':>10} {'get lista':>10} {'set dict':>10} {'set lista':>10}")
+    old = bench_access(legacy, number)
+    new = bench_access(current, number)
+    for segment in ADDRESSES:
+        og, os_ = old[segment]
+        ng, ns = new[segment]
+        fmt = lambda v: f"{v:10.1f}" if v is not None else f"{'-':>10}"
+        print(f"{segment:10} {fmt(og)} {fmt(ng)} {fmt(os_)} {fmt(ns)}")
+
+    per_quad, executed = bench_program(repeats)
+    print(f"\nPrograma con ciclos: {executed} cuádruplos, {per_quad:.1f} ns por cuádruplo")
+
+
+if __name__ == "__main__":
+    main()
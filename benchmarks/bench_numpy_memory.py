@@ -0,0 +1,142 @@
+"""
+Benchmark de la memoria tipada (motor 'numpy') de la Máquina Virtual Patito
+
+Compara el motor 'interp' (celdas como int / float de Python en listas)
+contra el motor 'numpy' (arreglos int64 / float64):
+
+- Globales: un programa con todas las globales int y float ocupadas por
+  valores distintos; bytes por celda de los segmentos al terminar.
+- Recursión: pico de memoria (tracemalloc) entre la profundidad.
+- Tiempo: fib(20) con cada motor.
+
+Uso:
+    python benchmarks/bench_numpy_memory.py [globales] [profundidad]
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.output_sink import CaptureSink, DiscardSink
+
+ENGINES = ('interp', 'numpy')
+
+PROFUNDO = """
+programa Profundo;
+var r: int;
+int baja(n: int) {
+    {
+        if (n < 1) {
+            return(0);
+        };
+        return(baja(n - 1) + 1);
+    }
+};
+main {
+    r = baja(%d);
+    print(r);
+}
+end
+"""
+
+FIB = """
+programa Fib;
+int fib(n: int) {
+    {
+        if (n < 2) {
+            return(n);
+        };
+        return(fib(n - 1) + fib(n - 2));
+    }
+};
+main {
+    print(fib(20));
+}
+end
+"""
+
+
+def globals_source(count):
+    """Programa con `count` globales int y `count` float, todas distintas."""
+    ints = ", ".join(f"i{n}" for n in range(count))
+    floats = ", ".join(f"f{n}" for n in range(count))
+    body = "".join(f"    i{n} = {100_000 + n} * 3;\n    f{n} = {n}.5 * 2.0;\n" for n in range(count))
+    return f"programa Globales;\nvar {ints}: int;\nvar {floats}: float;\nmain {{\n{body}}}\nend\n"
+
+
+def segment_bytes(segment):
+    """Bytes de un segmento: el contenedor más cada valor en caja."""
+    if hasattr(segment, 'nbytes'):
+        return sys.getsizeof(segment)       # incluye los datos del arreglo
+    # Los ints chicos los comparte el intérprete: no cuentan
+    return sys.getsizeof(segment) + sum(
+        sys.getsizeof(value) for value in segment
+        if not (isinstance(value, int) and -5 <= value <= 256))
+
+
+def bench_globals(count):
+    obj_data = parse_and_validate(globals_source(count)).to_obj()
+    results = {}
+    for engine in ENGINES:
+        vm = VirtualMachine(obj_data, engine=engine)
+        vm.execute(DiscardSink())
+        memory = vm.memory
+        cells = len(memory.global_int) + len(memory.global_float)
+        results[engine] = (segment_bytes(memory.global_int) + segment_bytes(memory.global_float)) / cells
+    return results
+
+
+def bench_depth(depth):
+    obj_data = parse_and_validate(PROFUNDO % depth).to_obj()
+    results = {}
+    for engine in ENGINES:
+        vm = VirtualMachine(obj_data, engine=engine, max_depth=depth + 1)
+        sink = CaptureSink()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        vm.execute(sink)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert sink.captured == [str(depth)], sink.captured
+        results[engine] = (peak - before) / depth
+    return results
+
+
+def bench_time(repeats=3):
+    obj_data = parse_and_validate(FIB).to_obj()
+    results = {}
+    for engine in ENGINES:
+        vm = VirtualMachine(obj_data, engine=engine)
+        best = float('inf')
+        for _ in range(repeats):
+            start = time.perf_counter()
+            vm.execute(DiscardSink())
+            best = min(best, time.perf_counter() - start)
+        results[engine] = (best, vm.quad_count / best)
+    return results
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 999
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 30_000
+
+    print(f"  {'':26} {'interp':>14} {'numpy':>14}")
+    per_cell = bench_globals(count)
+    print(f"  {f'globales ({2 * count} celdas)':26} "
+          + " ".join(f"{per_cell[engine]:10.1f} B/c" for engine in ENGINES))
+    per_level = bench_depth(depth)
+    print(f"  {f'recursión ({depth} niveles)':26} "
+          + " ".join(f"{per_level[engine]:10.1f} B/n" for engine in ENGINES))
+    times = bench_time()
+    print(f"  {'fib(20)':26} "
+          + " ".join(f"{times[engine][0] * 1000:11.1f} ms" for engine in ENGINES))
+    print(f"  {'':26} "
+          + " ".join(f"{times[engine][1] / 1e6:9.2f} M/s" for engine in ENGINES))
+
+
+if __name__ == "__main__":
+    main()
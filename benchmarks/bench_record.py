@@ -0,0 +1,83 @@
+"""
+Benchmark de la grabación binaria de la ejecución (vm_record)
+
+Para las cargas de bench_suite.py compara el tiempo de execute() sin
+grabar (motores 'interp' y 'threaded') contra la misma corrida con
+record_trace, y contra escribir cada cuádruplo como texto desde un hook
+'quad' (la traza "a mano"). Reporta también el tamaño de la traza y la
+velocidad de lectura de TraceReader (lo que usa patito trace-dump).
+
+Uso:
+    python benchmarks/bench_record.py [--repeat=N] [--only=fib,ciclos]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from patito import VirtualMachine, parse_and_validate
+from patito.output_sink import DiscardSink
+from patito.patito_cli import split_options
+from patito.vm_record import TraceReader
+
+from bench_suite import WORKLOADS
+
+
+def best_time(vm, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vm.execute(DiscardSink())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def text_trace_vm(obj_data, trace_file):
+    """VM que escribe cada cuádruplo (con la profundidad) como una línea de texto."""
+    vm = VirtualMachine(obj_data, engine='threaded')
+    write = trace_file.write
+
+    def quad(vm, ip):
+        write(f"{ip} {len(vm.memory.call_stack)} {vm.quadruples[ip]}\n")
+    vm.add_hook('quad', quad)
+    return vm
+
+
+def main():
+    _, options = split_options(sys.argv[1:])
+    repeat = int(options.get('repeat', 5))
+    names = options['only'].split(',') if 'only' in options else [
+        name for name in WORKLOADS if name != 'fuente_grande']
+
+    print(f"Mejor de {repeat} (ms; entre paréntesis, relativo al motor sin grabar)")
+    print(f"  {'carga':12} {'interp':>9} {'threaded':>9} {'grabando':>16} {'texto':>16} "
+          f"{'cuádruplos':>10} {'MB':>6} {'lectura':>10}")
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'bench.ptrace')
+        for name in names:
+            obj_data = parse_and_validate(WORKLOADS[name]).to_obj()
+            interp = best_time(VirtualMachine(obj_data), repeat)
+            threaded = best_time(VirtualMachine(obj_data, engine='threaded'), repeat)
+            recording = VirtualMachine(obj_data, engine='threaded', record_trace=path)
+            recorded = best_time(recording, repeat)
+            stats = recording.get_record_stats()
+            with open(os.path.join(workdir, 'bench.txt'), 'w', encoding='utf-8') as trace_file:
+                text = best_time(text_trace_vm(obj_data, trace_file), repeat)
+
+            start = time.perf_counter()
+            records = sum(1 for _ in TraceReader(path).read())
+            reading = time.perf_counter() - start
+
+            print(f"  {name:12} {interp * 1000:9.2f} {threaded * 1000:9.2f} "
+                  f"{recorded * 1000:8.2f} ({recorded / threaded:4.2f}x) "
+                  f"{text * 1000:8.2f} ({text / threaded:4.2f}x) {records:10} "
+                  f"{stats['bytes'] / 1e6:6.2f} {records / reading / 1e6:6.2f} M/s")
+
+
+if __name__ == "__main__":
+    main()
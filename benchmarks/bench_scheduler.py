@@ -0,0 +1,105 @@
+"""
+Benchmark del scheduler de asyncio de la Máquina Virtual Patito
+
+Corre muchos programas cortos (más unos cuantos con ciclo infinito y
+presupuesto) uno tras otro con execute() y luego todos juntos en el
+VMScheduler con varios tamaños de tramo. Reporta cuádruplos por segundo
+agregados y cuántos tramos se corrieron.
+
+Uso:
+    python benchmarks/bench_scheduler.py [programas]
+"""
+
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.output_sink import AsyncSink, CaptureSink
+from patito.vm_scheduler import VMScheduler
+
+CORTO = """
+programa Corto;
+var i, s: int;
+int doble(x: int) {
+    {
+        return(x * 2);
+    }
+};
+main {
+    i = 0;
+    s = 0;
+    while (i < %d) do {
+        s = s + doble(i);
+        i = i + 1;
+    };
+    print(s);
+}
+end
+"""
+
+ETERNO = """
+programa Eterno;
+var i: int;
+main {
+    i = 0;
+    while (1 > 0) do {
+        i = i + 1;
+    };
+}
+end
+"""
+
+# Presupuesto de cada programa
+BUDGET = 200_000
+
+
+def build_vms(objs):
+    return [VirtualMachine(obj, max_quads=BUDGET) for obj in objs]
+
+
+def bench_sequential(objs):
+    vms = build_vms(objs)
+    start = time.perf_counter()
+    quads = 0
+    for vm in vms:
+        try:
+            vm.execute(CaptureSink())
+        except RuntimeError:
+            pass
+        quads += vm.quad_count
+    return quads, time.perf_counter() - start
+
+
+async def _drain(text):
+    pass
+
+
+def bench_scheduler(objs, slice_quads):
+    scheduler = VMScheduler(slice_quads)
+    for vm in build_vms(objs):
+        scheduler.submit(vm, AsyncSink(_drain))
+    return asyncio.run(scheduler.run())
+
+
+def main():
+    programs = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    objs = [parse_and_validate(CORTO % (20 + index % 50)).to_obj() for index in range(programs)]
+    objs += [parse_and_validate(ETERNO).to_obj()] * 5
+
+    quads, elapsed = bench_sequential(objs)
+    print(f"{len(objs)} programas ({BUDGET} cuadruplos de presupuesto c/u)")
+    print(f"  {'secuencial':18} {elapsed:7.2f}s  {quads / elapsed / 1e6:6.2f} M cuad/s")
+
+    for slice_quads in (100, 1000, 10_000):
+        stats = bench_scheduler(objs, slice_quads)
+        print(f"  {'tramos de ' + str(slice_quads):18} {stats['wall_time']:7.2f}s  "
+              f"{stats['quads_per_sec'] / 1e6:6.2f} M cuad/s  {stats['slices']:7} tramos  "
+              f"{stats['finished']} terminados, {stats['failed']} detenidos")
+
+
+if __name__ == "__main__":
+    main()
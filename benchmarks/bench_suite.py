@@ -0,0 +1,428 @@
+"""
+Suite de benchmarks del compilador y la Máquina Virtual Patito
+
+Corre un conjunto fijo de cargas de trabajo y mide cada fase por separado:
+
+- parse: texto -> árbol de Lark (parse_text)
+- sdt: árbol -> tablas y cuádruplos (PatitoSDT().transform)
+- obj_write: escritura del .obj (ObjGenerator.generate)
+- obj_load: lectura del .obj (ObjGenerator.load)
+- vm_load: construcción de la VirtualMachine (decodificación incluida)
+- vm_run: execute() con la salida a os.devnull
+
+Por fase reporta el mejor tiempo de N repeticiones y el pico de memoria
+(tracemalloc, en una corrida aparte para no inflar los tiempos); para
+vm_run también los cuádruplos por segundo.
+
+Cargas:
+- fib: fib(20) recursivo
+- factorial: factorial(12) recursivo, 2000 veces
+- ciclos: dos while anidados de 300 x 300
+- llamadas: 20000 llamadas a una función void con parámetros
+- prints: 20000 print de enteros y flotantes
+- fuente_grande: fuente generado de ~4000 líneas (80 funciones de 20
+  asignaciones y 20 if cada una)
+  mide sobre todo parse y sdt
+
+Línea base: --save-baseline escribe los resultados en el archivo de
+--baseline (default benchmarks/baseline.json). Sin --save-baseline, si el
+archivo existe se compara contra él y se marca REGRESIÓN cualquier fase
+cuyo tiempo o pico de memoria crezca más de --threshold (fracción,
+default 0.25); con regresiones el código de salida es 1. Fases de menos
+de 1 ms y crecimientos de memoria de menos de 64 KiB no se marcan (son
+ruido).
+
+Los tiempos se comparan relativos a una calibración: en cada repetición
+se corre primero un ciclo fijo de Python puro (calibrate()) y el mejor
+tiempo de cada fase se divide entre el mejor de la calibración. Así la línea base sirve aunque la máquina (o
+su carga del momento) sea más lenta o más rápida que cuando se guardó.
+
+Uso:
+    python benchmarks/bench_suite.py [--repeat=N] [--only=fib,ciclos]
+        [--baseline=archivo.json] [--save-baseline] [--threshold=0.25]
+        [--out=resultados.json]
+"""
+
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from patito import ObjGenerator, PatitoSDT, VirtualMachine, parse_text
+from patito.output_sink import BufferedSink
+from patito.patito_cli import split_options
+
+PHASES = ('parse', 'sdt', 'obj_write', 'obj_load', 'vm_load', 'vm_run')
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.25
+MIN_TIME = 0.001
+MIN_PEAK_DELTA = 64 * 1024
+
+FIB = """
+programa Fib;
+var r: int;
+int fib(k: int) {
+    {
+        if (k < 2) {
+            return(k);
+        };
+        return(fib(k - 1) + fib(k - 2));
+    }
+};
+main {
+    r = fib(20);
+    print(r);
+}
+end
+"""
+
+FACTORIAL = """
+programa Factorial;
+var i, r: int;
+int fact(x: int) {
+    {
+        if (x < 2) {
+            return(1);
+        };
+        return(x * fact(x - 1));
+    }
+};
+main {
+    i = 0;
+    while (i < 2000) do {
+        r = fact(12);
+        i = i + 1;
+    };
+    print(r);
+}
+end
+"""
+
+CICLOS = """
+programa Ciclos;
+var i, j, s: int;
+    f: float;
+main {
+    i = 0;
+    s = 0;
+    f = 0.0;
+    while (i < 300) do {
+        j = 0;
+        while (j < 300) do {
+            s = s + i * j - j;
+            f = f + 0.5;
+            j = j + 1;
+        };
+        i = i + 1;
+    };
+    print(s, f);
+}
+end
+"""
+
+LLAMADAS = """
+programa Llamadas;
+var i, total: int;
+void acumula(v: int, w: int) {
+    {
+        total = total + v - w;
+    }
+};
+main {
+    i = 0;
+    total = 0;
+    while (i < 20000) do {
+        acumula(i, 1);
+        i = i + 1;
+    };
+    print(total);
+}
+end
+"""
+
+PRINTS = """
+programa Prints;
+var i: int;
+    x: float;
+main {
+    i = 0;
+    x = 0.25;
+    while (i < 10000) do {
+        print(i);
+        print("valor: ", i, x);
+        i = i + 1;
+    };
+}
+end
+"""
+
+
+def huge_source(functions=80, statements=20):
+    """
+    Genera un programa grande: muchas funciones void con locales y un main
+    que las llama a todas una vez.
+
+    Args:
+        functions: Número de funciones generadas
+        statements: Estatutos de asignación por función
+
+    Returns:
+        str: Código fuente Patito
+    """
+    lines = ["programa Grande;", "var g, h: int;", "    z: float;"]
+    for number in range(functions):
+        lines.append(f"void f{number}(a: int, b: float) {{")
+        lines.append("    var x, y: int;")
+        lines.append("    var w: float;")
+        lines.append("    {")
+        lines.append("        x = a;")
+        lines.append("        w = b;")
+        for step in range(statements):
+            lines.append(f"        y = x * {step + 1} + (a - {step}) / 3;")
+            lines.append(f"        if (y > {step * 7}) {{ x = x + 1; }} else {{ w = w * 1.5; }};")
+        lines.append("        g = g + x;")
+        lines.append("    }")
+        lines.append("};")
+    lines.append("main {")
+    lines.append("    g = 0;")
+    for number in range(functions):
+        lines.append(f"    f{number}({number}, 0.5);")
+    lines.append("    print(g);")
+    lines.append("}")
+    lines.append("end")
+    return "\n".join(lines) + "\n"
+
+
+WORKLOADS = {
+    'fib': FIB,
+    'factorial': FACTORIAL,
+    'ciclos': CICLOS,
+    'llamadas': LLAMADAS,
+    'prints': PRINTS,
+    'fuente_grande': huge_source(),
+}
+
+
+def run_phases(source, obj_path, devnull):
+    """
+    Corre todas las fases una vez.
+
+    Returns:
+        tuple: ({fase: segundos}, cuádruplos ejecutados, número de cuádruplos)
+    """
+    times = {}
+
+    start = time.perf_counter()
+    tree = parse_text(source)
+    times['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sdt = PatitoSDT()
+    sdt.transform(tree)
+    times['sdt'] = time.perf_counter() - start
+    if sdt.errors:
+        raise RuntimeError(f"errores semánticos: {sdt.errors}")
+
+    start = time.perf_counter()
+    ObjGenerator.generate(sdt, obj_path)
+    times['obj_write'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    obj_data = ObjGenerator.load(obj_path)
+    times['obj_load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vm = VirtualMachine(obj_data)
+    times['vm_load'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vm.execute(BufferedSink(stream=devnull))
+    times['vm_run'] = time.perf_counter() - start
+
+    return times, vm.quad_count, len(obj_data['quadruples'])
+
+
+def measure_peaks(source, obj_path, devnull):
+    """Pico de memoria (bytes) de cada fase, con tracemalloc reiniciado por fase."""
+    peaks = {}
+    tracemalloc.start()
+    try:
+        def step(phase, action):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            result = action()
+            peaks[phase] = tracemalloc.get_traced_memory()[1] - base
+            return result
+
+        tree = step('parse', lambda: parse_text(source))
+        sdt = PatitoSDT()
+        step('sdt', lambda: sdt.transform(tree))
+        step('obj_write', lambda: ObjGenerator.generate(sdt, obj_path))
+        obj_data = step('obj_load', lambda: ObjGenerator.load(obj_path))
+        vm = step('vm_load', lambda: VirtualMachine(obj_data))
+        step('vm_run', lambda: vm.execute(BufferedSink(stream=devnull)))
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def calibrate():
+    """Tiempo de un ciclo fijo de Python puro (aritmética, listas y dicts)."""
+    start = time.perf_counter()
+    cells = [0] * 64
+    table = {}
+    for i in range(100_000):
+        cells[i & 63] = cells[(i + 1) & 63] + i * 3 - 1
+        table[i & 255] = cells[i & 63]
+    return time.perf_counter() - start
+
+
+def bench_workload(source, repeat, workdir, devnull):
+    """
+    Mide una carga de trabajo.
+
+    Returns:
+        dict: calibration, quads, executed, quads_per_sec y
+              phases {fase: {time, relative, peak}}; relative es el mejor
+              tiempo dividido entre la mejor calibración
+    """
+    obj_path = os.path.join(workdir, "bench.obj")
+    best = dict.fromkeys(PHASES, float('inf'))
+    calibration = float('inf')
+    for _ in range(repeat):
+        calibration = min(calibration, calibrate())
+        times, executed, quads = run_phases(source, obj_path, devnull)
+        for phase in PHASES:
+            best[phase] = min(best[phase], times[phase])
+    peaks = measure_peaks(source, obj_path, devnull)
+    return {
+        'calibration': calibration,
+        'quads': quads,
+        'executed': executed,
+        'quads_per_sec': executed / best['vm_run'] if best['vm_run'] else 0.0,
+        'phases': {
+            phase: {'time': best[phase], 'relative': best[phase] / calibration, 'peak': peaks[phase]}
+            for phase in PHASES
+        },
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Compara contra la línea base: tiempos relativos a la calibración y
+    picos de memoria.
+
+    Returns:
+        list: (carga, fase, métrica, base, actual) de cada regresión
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get('workloads', {}).get(name)
+        if reference is None:
+            continue
+        for phase in PHASES:
+            before = reference['phases'].get(phase)
+            if before is None:
+                continue
+            now = result['phases'][phase]
+            old, new = before['relative'], now['relative']
+            if new > old * (1 + threshold) and now['time'] > MIN_TIME:
+                regressions.append((name, phase, 'relative', old, new))
+            old, new = before['peak'], now['peak']
+            if new > old * (1 + threshold) and new - old > MIN_PEAK_DELTA:
+                regressions.append((name, phase, 'peak', old, new))
+    return regressions
+
+
+def print_results(results, baseline):
+    header = "".join(f"{phase:>11}" for phase in PHASES)
+    print("Tiempo por fase (ms, mejor de las repeticiones)")
+    print(f"  {'carga':14}{header}{'Mquads/s':>10}")
+    for name, result in results.items():
+        cells = "".join(f"{result['phases'][phase]['time'] * 1000:11.2f}" for phase in PHASES)
+        print(f"  {name:14}{cells}{result['quads_per_sec'] / 1e6:10.2f}")
+        reference = baseline.get('workloads', {}).get(name) if baseline else None
+        if reference:
+            ratios = "".join(
+                f"{result['phases'][phase]['relative'] / reference['phases'][phase]['relative']:10.2f}x"
+                if phase in reference['phases'] else f"{'-':>11}"
+                for phase in PHASES
+            )
+            before = reference['phases'].get('vm_run')
+            rate = (f"{before['relative'] / result['phases']['vm_run']['relative']:9.2f}x"
+                    if before else f"{'-':>10}")
+            print(f"  {'  vs base':14}{ratios}{rate}")
+
+    print("\nPico de memoria por fase (KiB)")
+    print(f"  {'carga':14}{header}{'cuádruplos':>12}")
+    for name, result in results.items():
+        cells = "".join(f"{result['phases'][phase]['peak'] / 1024:11.0f}" for phase in PHASES)
+        print(f"  {name:14}{cells}{result['quads']:12}")
+
+
+def main():
+    _, options = split_options(sys.argv[1:])
+    repeat = int(options.get('repeat', DEFAULT_REPEAT))
+    threshold = float(options.get('threshold', DEFAULT_THRESHOLD))
+    baseline_path = Path(options.get('baseline', DEFAULT_BASELINE))
+    only = options.get('only')
+    names = only.split(',') if isinstance(only, str) else list(WORKLOADS)
+    unknown = [name for name in names if name not in WORKLOADS]
+    if unknown:
+        print(f"Cargas desconocidas: {', '.join(unknown)} (hay: {', '.join(WORKLOADS)})")
+        sys.exit(2)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, open(os.devnull, 'w') as devnull:
+        for name in names:
+            results[name] = bench_workload(WORKLOADS[name], repeat, workdir, devnull)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'workloads': results,
+    }
+
+    baseline = None
+    if not options.get('save-baseline') and baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+
+    print_results(results, baseline)
+
+    if 'out' in options:
+        Path(options['out']).write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+    if options.get('save-baseline'):
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n", encoding='utf-8')
+        print(f"\nLínea base guardada en {baseline_path}")
+        return
+
+    if baseline is None:
+        print(f"\nSin línea base ({baseline_path}); usa --save-baseline para crearla")
+        return
+
+    regressions = compare(results, baseline, threshold)
+    if not regressions:
+        print(f"\nSin regresiones contra {baseline_path} (umbral {threshold:.0%})")
+        return
+    print(f"\nREGRESIÓN contra {baseline_path} (umbral {threshold:.0%}):")
+    for name, phase, metric, old, new in regressions:
+        if metric == 'relative':
+            print(f"  {name}/{phase}: tiempo relativo {new / old:.2f}x la base "
+                  f"({results[name]['phases'][phase]['time'] * 1000:.2f} ms)")
+        else:
+            print(f"  {name}/{phase}: {old / 1024:.0f} KiB -> {new / 1024:.0f} KiB ({new / old:.2f}x)")
+    sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark de superinstrucciones de la Máquina Virtual Patito
+
+Perfila los programas de prueba (los de test/test_vm_engines.py y los
+ejemplo*.patito del repo) y reporta, por superinstrucción, la fracción de
+despachos que se ahorraría (ver vm_superinstructions.fusion_report()), el
+conjunto que elige choose_superinstructions() y la reducción de despachos
+con DEFAULT_SUPERINSTRUCTIONS. Al final compara el tiempo del motor
+'interp' con y sin superinstrucciones.
+
+Uso:
+    python benchmarks/bench_superinstructions.py [repeticiones]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "test"))
+
+from patito import parse_and_validate, VirtualMachine
+from patito.output_sink import DiscardSink
+from patito.vm_superinstructions import (
+    DEFAULT_SUPERINSTRUCTIONS, choose_superinstructions, fusion_report, format_fusion_report,
+)
+from test_vm_engines import PROGRAMS
+
+
+def test_programs():
+    """{nombre: .obj} de los programas de prueba."""
+    programs = {name: parse_and_validate(source).to_obj() for name, source in PROGRAMS.items()}
+    for path in sorted(ROOT.glob("ejemplo*.patito")):
+        programs[path.stem] = parse_and_validate(path.read_text(encoding='utf-8')).to_obj()
+    return programs
+
+
+def best_time(obj_data, superinstructions, repeats):
+    vm = VirtualMachine(obj_data, superinstructions=superinstructions)
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        vm.execute(DiscardSink())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    programs = test_programs()
+
+    profiled = []
+    for obj_data in programs.values():
+        vm = VirtualMachine(obj_data, profile=True)
+        vm.execute(DiscardSink())
+        profiled.append(vm)
+    report = fusion_report(profiled)
+
+    print("Despachos ahorrados por superinstrucción (fracción de los cuádruplos)")
+    print(format_fusion_report(report))
+    print(f"\nElegidas por el perfil: {', '.join(choose_superinstructions(report))}")
+    print(f"DEFAULT_SUPERINSTRUCTIONS: {', '.join(DEFAULT_SUPERINSTRUCTIONS)}")
+
+    print(f"\nTiempo del motor 'interp' (mejor de {repeats})")
+    print(f"  {'programa':18} {'sin':>10} {'con':>10} {'mejora':>7}")
+    for name, obj_data in programs.items():
+        plain = best_time(obj_data, False, repeats)
+        fused = best_time(obj_data, True, repeats)
+        print(f"  {name:18} {plain * 1000:7.2f} ms {fused * 1000:7.2f} ms {plain / fused:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
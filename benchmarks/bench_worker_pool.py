@@ -0,0 +1,97 @@
+"""
+Benchmark del worker-pool de la Máquina Virtual Patito
+
+Compara la latencia de correr un programa corto lanzando un proceso por
+corrida (`python -m patito run x.obj`: arranque de Python, imports,
+ObjGenerator.load y ejecución) contra mandarlo a un WorkerPool ya
+arrancado, donde un acierto de caché solo cuesta la ejecución.
+
+Uso:
+    python benchmarks/bench_worker_pool.py [pedidos]
+"""
+
+import sys
+import time
+import asyncio
+import tempfile
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from patito import parse_and_validate, ObjGenerator
+from patito.worker_pool import WorkerPool, format_stats
+
+SOURCE = """
+programa Corto;
+var i, s: int;
+main {
+    i = 0;
+    s = 0;
+    while (i < 200) do {
+        s = s + i;
+        i = i + 1;
+    };
+    print(s);
+}
+end
+"""
+
+# Corridas en frío (cada una es un proceso nuevo)
+COLD_RUNS = 10
+
+
+def bench_cold(obj_path):
+    latencies = []
+    for _ in range(COLD_RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "patito", "run", obj_path],
+                       cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def bench_pool(obj_path, requests, sequential):
+    pool = WorkerPool(workers=2)
+    pool.start()
+
+    async def run_all():
+        if sequential:
+            return [await pool.run({'id': n, 'obj': obj_path}) for n in range(requests)]
+        return await asyncio.gather(*(pool.run({'id': n, 'obj': obj_path}) for n in range(requests)))
+
+    try:
+        start = time.perf_counter()
+        asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+    finally:
+        pool.close()
+    return pool.stats(), elapsed
+
+
+def report(name, latencies):
+    print(f"  {name:24} p50 {latencies[len(latencies) // 2] * 1000:8.2f} ms   "
+          f"max {latencies[-1] * 1000:8.2f} ms")
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        obj_path = str(Path(tmp) / "corto.obj")
+        ObjGenerator.generate(parse_and_validate(SOURCE), obj_path)
+
+        print(f"Programa corto, {requests} pedidos al pool ({COLD_RUNS} procesos en frio)")
+        report("proceso por corrida", bench_cold(obj_path))
+        stats, elapsed = bench_pool(obj_path, requests, sequential=True)
+        print(f"  {'pool, uno a la vez':24} p50 {stats['latency_ms']['p50']:8.2f} ms   "
+              f"p99 {stats['latency_ms']['p99']:8.2f} ms   {requests / elapsed:8.0f} pedidos/s")
+        stats, elapsed = bench_pool(obj_path, requests, sequential=False)
+        print(f"  {'pool, todos a la vez':24} p50 {stats['latency_ms']['p50']:8.2f} ms   "
+              f"p99 {stats['latency_ms']['p99']:8.2f} ms   {requests / elapsed:8.0f} pedidos/s")
+        print()
+        print(format_stats(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+"""
+Ejecución por lotes de programas .obj en varios procesos
+
+run_batch() toma un directorio con .obj o un manifiesto (un .obj por
+línea, rutas relativas al manifiesto, '#' para comentarios; repetir una
+ruta la corre otra vez) y reparte las corridas en un pool de procesos.
+
+Cada proceso guarda las VMs que ya cargó en un LRU de cache_size
+programas: el .obj se lee y se decodifica una vez y las corridas repetidas
+del mismo programa reusan su VM (execute() deja la memoria como recién
+cargada). Los trabajos se mandan en orden de programa, así que las
+repeticiones de un programa tienden a caer en el mismo proceso.
+
+Si un proceso muere de golpe (falta de memoria, un segfault), el pool
+queda roto: los trabajos ya terminados se conservan, el bloque que estaba
+esperando se vuelve a correr un programa por proceso y el resto sigue en un
+pool nuevo. El programa que vuelva a tirar su proceso queda como 'error'.
+
+El tiempo límite por programa es el time_limit de la VM (motor 'interp'):
+un ciclo infinito se detiene en su siguiente arista de regreso sin matar
+al proceso.
+
+Cada corrida produce un registro (ver run_one()) y run_batch() los
+escribe como JSONL en el orden de entrada.
+"""
+
+import os
+import json
+import time
+from collections import OrderedDict
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Códigos de salida de cada corrida
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_LIMIT = 2
+EXIT_LOAD_ERROR = 3
+
+# Trabajos que se mandan juntos a un proceso
+DEFAULT_CHUNK_SIZE = 16
+
+# Programas cargados que guarda cada proceso si no se da otro valor
+DEFAULT_CACHE_SIZE = 64
+
+# VMs ya cargadas en este proceso (LRU): {ruta: VirtualMachine o excepción}
+_worker_vms: 'OrderedDict[str, Any]' = OrderedDict()
+_worker_options: Dict[str, Any] = {}
+_worker_cache_size = [DEFAULT_CACHE_SIZE]
+
+
+def collect_programs(source: str) -> List[str]:
+    """
+    Lista de .obj a correr.
+
+    Args:
+        source: Directorio (todos sus .obj, en orden) o manifiesto
+
+    Returns:
+        list: Rutas, con repeticiones si el manifiesto las trae
+    """
+    path = Path(source)
+    if path.is_dir():
+        return [str(obj) for obj in sorted(path.glob('*.obj'))]
+    if not path.exists():
+        raise FileNotFoundError(f"No existe '{source}'")
+    programs = []
+    for line in path.read_text(encoding='utf-8').splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        entry = Path(line)
+        programs.append(str(entry if entry.is_absolute() else path.parent / entry))
+    return programs
+
+
+def _init_worker(options: Dict[str, Any], cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+    _worker_vms.clear()
+    _worker_options.clear()
+    _worker_options.update(options)
+    _worker_cache_size[0] = cache_size
+
+
+def _load_vm(path: str):
+    """VM del programa, del LRU del proceso o recién cargada."""
+    vm = _worker_vms.get(path)
+    if vm is not None:
+        _worker_vms.move_to_end(path)
+        return vm
+    from .obj_generator import ObjGenerator
+    from .virtual_machine import VirtualMachine
+    # Las excepciones también se guardan: las repeticiones de un .obj que
+    # no carga no lo vuelven a leer
+    try:
+        vm = VirtualMachine(ObjGenerator.load(path), **_worker_options)
+    except Exception as e:
+        vm = e
+    _worker_vms[path] = vm
+    while len(_worker_vms) > _worker_cache_size[0]:
+        _worker_vms.popitem(last=False)
+    return vm
+
+
+def run_loaded(vm, record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Corre una VM ya cargada y llena el registro de la corrida.
+
+    Args:
+        vm: VirtualMachine (execute() la deja lista para otra corrida)
+        record: Registro a llenar: 'status', 'exit_code', 'error',
+                'time', 'output' y 'quads'
+
+    Returns:
+        dict: El mismo registro
+    """
+    from .output_sink import CaptureSink
+    from .virtual_machine import ExecutionLimitExceeded
+
+    sink = CaptureSink()
+    started = time.perf_counter()
+    try:
+        vm.execute(sink)
+    except ExecutionLimitExceeded as e:
+        record.update(status='timeout', exit_code=EXIT_LIMIT, error=str(e))
+    except Exception as e:
+        record.update(status='error', exit_code=EXIT_ERROR, error=str(e))
+    record['time'] = time.perf_counter() - started
+    record['output'] = ''.join(sink.captured)
+    record['quads'] = vm.quad_count
+    return record
+
+
+def run_one(job: Tuple[int, str, int]) -> Dict[str, Any]:
+    """
+    Corre un programa una vez en este proceso.
+
+    Args:
+        job: (índice, ruta del .obj, número de repetición)
+
+    Returns:
+        dict: {'index', 'program', 'run', 'status', 'exit_code', 'output',
+        'quads', 'time', 'error', 'worker'}
+    """
+    index, path, run = job
+    record: Dict[str, Any] = {
+        'index': index, 'program': path, 'run': run, 'status': 'ok', 'exit_code': EXIT_OK,
+        'output': '', 'quads': 0, 'time': 0.0, 'error': None, 'worker': os.getpid(),
+    }
+    vm = _load_vm(path)
+    if isinstance(vm, Exception):
+        record.update(status='load_error', exit_code=EXIT_LOAD_ERROR, error=str(vm))
+        return record
+    return run_loaded(vm, record)
+
+
+def _run_chunk(chunk: List[Tuple[int, str, int]]) -> List[Dict[str, Any]]:
+    return [run_one(job) for job in chunk]
+
+
+def _crashed_record(job: Tuple[int, str, int], error: BaseException) -> Dict[str, Any]:
+    index, path, run = job
+    return {
+        'index': index, 'program': path, 'run': run, 'status': 'error', 'exit_code': EXIT_ERROR,
+        'output': '', 'quads': 0, 'time': 0.0, 'worker': None,
+        'error': f"El proceso que corría el programa terminó de golpe ({error})",
+    }
+
+
+def _run_isolated(chunk: List[Tuple[int, str, int]], options: Dict[str, Any],
+                  cache_size: int) -> Iterator[Dict[str, Any]]:
+    """Corre cada trabajo en su propio proceso; si lo tira, su registro es un error."""
+    for job in chunk:
+        with ProcessPoolExecutor(max_workers=1, initializer=_init_worker,
+                                 initargs=(options, cache_size)) as pool:
+            try:
+                yield pool.submit(_run_chunk, [job]).result()[0]
+            except BrokenProcessPool as e:
+                yield _crashed_record(job, e)
+
+
+def _run_pooled(chunks: List[List[Tuple[int, str, int]]], jobs: Optional[int],
+                options: Dict[str, Any], cache_size: int) -> Iterator[Dict[str, Any]]:
+    """Corre los bloques en un pool y regresa sus registros en orden, sobreviviendo a procesos rotos."""
+    while chunks:
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                   initargs=(options, cache_size))
+        broken = None
+        try:
+            futures = [pool.submit(_run_chunk, chunk) for chunk in chunks]
+            for position, future in enumerate(futures):
+                try:
+                    records = future.result()
+                except BrokenProcessPool:
+                    broken = position
+                    break
+                yield from records
+        finally:
+            pool.shutdown()
+        if broken is None:
+            return
+        # No se sabe qué proceso murió: el bloque que esperábamos se corre
+        # uno por uno y los siguientes vuelven a un pool nuevo
+        yield from _run_isolated(chunks[broken], options, cache_size)
+        chunks = chunks[broken + 1:]
+
+
+def iter_batch(programs: List[str], jobs: Optional[int] = None, repeat: int = 1,
+               timeout: Optional[float] = None, max_quads: Optional[int] = None,
+               engine: str = 'interp', chunk_size: int = DEFAULT_CHUNK_SIZE,
+               cache_size: int = DEFAULT_CACHE_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Corre los programas y regresa sus registros en el orden de entrada.
+
+    Args:
+        programs: Rutas de .obj (ver collect_programs())
+        jobs: Procesos del pool; None usa todos los núcleos, 1 corre aquí
+        repeat: Corridas de cada programa
+        timeout: Segundos por corrida (time_limit de la VM)
+        max_quads: Presupuesto de cuádruplos por corrida
+        engine: Motor de la VM; los límites solo existen con 'interp'
+        chunk_size: Trabajos por envío a un proceso
+        cache_size: Programas cargados que guarda cada proceso (LRU)
+    """
+    if cache_size < 1:
+        raise ValueError(f"La caché debe guardar al menos 1 programa: {cache_size}")
+    if (timeout is not None or max_quads is not None) and engine != 'interp':
+        raise ValueError("El tiempo límite y el presupuesto solo existen con el motor 'interp'")
+    options: Dict[str, Any] = {'engine': engine}
+    if timeout is not None:
+        options['time_limit'] = timeout
+    if max_quads is not None:
+        options['max_quads'] = max_quads
+    work = [(index * repeat + run, path, run)
+            for index, path in enumerate(programs) for run in range(repeat)]
+
+    if jobs == 1:
+        _init_worker(options, cache_size)
+        try:
+            yield from map(run_one, work)
+        finally:
+            _worker_vms.clear()
+        return
+
+    chunks = [work[start:start + chunk_size] for start in range(0, len(work), chunk_size)]
+    yield from _run_pooled(chunks, jobs, options, cache_size)
+
+
+def run_batch(source: str, output_path: str, **kwargs) -> Dict[str, Any]:
+    """
+    Corre un lote completo y escribe los registros como JSONL.
+
+    Args:
+        source: Directorio o manifiesto (ver collect_programs())
+        output_path: Archivo .jsonl de resultados
+        **kwargs: Opciones de iter_batch()
+
+    Returns:
+        dict: Resumen {'runs', 'ok', 'errors', 'timeouts', 'load_errors',
+        'quads', 'wall_time', 'quads_per_sec'}
+    """
+    programs = collect_programs(source)
+    summary = {'runs': 0, 'ok': 0, 'errors': 0, 'timeouts': 0, 'load_errors': 0, 'quads': 0}
+    counters = {'ok': 'ok', 'error': 'errors', 'timeout': 'timeouts', 'load_error': 'load_errors'}
+    started = time.perf_counter()
+    with open(output_path, 'w', encoding='utf-8') as results:
+        for record in iter_batch(programs, **kwargs):
+            results.write(json.dumps(record, ensure_ascii=False) + "\n")
+            summary['runs'] += 1
+            summary[counters[record['status']]] += 1
+            summary['quads'] += record['quads']
+    wall_time = time.perf_counter() - started
+    summary['wall_time'] = wall_time
+    summary['quads_per_sec'] = summary['quads'] / wall_time if wall_time > 0 else 0.0
+    return summary
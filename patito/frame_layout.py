@@ -0,0 +1,266 @@
+"""
+Frames Planos para la Máquina Virtual Patito
+
+Cada activación de una función usa UNA sola lista con todas sus celdas,
+acomodadas en este orden:
+
+    [ local int | local float | temp int | temp float ]
+
+El FrameLayout de la función dice dónde empieza cada parte (sacado de sus
+'resources') y guarda una free list de frames ya usados: al regresar de la
+función el frame vuelve a la lista y la siguiente llamada lo reutiliza, así
+que la recursión en estado estable no crea listas nuevas. La free list
+guarda como mucho FREE_LIST_LIMIT frames: después de una recursión muy
+profunda el resto se libera en vez de quedarse retenido con la VM.
+
+La profundidad de llamadas está acotada (max_depth de la VM, default
+DEFAULT_MAX_DEPTH); pasarla es un CallDepthError en lugar de crecer hasta
+un MemoryError.
+
+Al cargar, los operandos locales y temporales de cada región de código
+(cuerpo de función o main) se reescriben a (FRAME, posición en la lista
+plana) con el layout de esa región, así que la VM lee cualquier celda del
+frame con segs[FRAME][i].
+
+Cada función tiene además un CallPlan: su layout, su cuádruplo de entrada
+y la posición en el frame de cada parámetro. bind_call_plans() cambia los
+nombres de función de ERA / GOSUB por el plan y el número de parámetro de
+PARAM por su posición en el frame, así que una llamada no busca nada por
+nombre ni ordena argumentos al ejecutarse.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_GOTO, OP_GOTOF, OP_PRINT, OP_ERA, OP_PARAM, OP_GOSUB,
+    OP_RETURN, OP_ENDFUNC, OP_END, OP_ERROR, BINARY_OPS, OPCODES,
+)
+
+LOCAL_INT, LOCAL_FLOAT, TEMP_INT, TEMP_FLOAT = 3, 4, 5, 6
+
+# Segmentos que viven en el frame y orden en que se acomodan
+FRAME_SEGMENTS = (LOCAL_INT, LOCAL_FLOAT, TEMP_INT, TEMP_FLOAT)
+
+# Índice en la tabla de segmentos donde queda el frame plano actual
+FRAME = LOCAL_INT
+
+# Frames que guarda la free list de cada función
+FREE_LIST_LIMIT = 1024
+
+# Llamadas activas permitidas si no se da otro límite
+DEFAULT_MAX_DEPTH = 1_000_000
+
+_BINARY_OPCODES = frozenset(OPCODES[name] for name in BINARY_OPS)
+
+
+class CallDepthError(RuntimeError):
+    """
+    Una llamada pasaría la profundidad máxima de llamadas.
+
+    Attributes:
+        max_depth: Límite de llamadas activas
+        function: Función que se estaba llamando
+    """
+
+    def __init__(self, max_depth: int, function: str, note: str = ""):
+        super().__init__(f"Profundidad máxima de llamadas excedida ({max_depth}) "
+                         f"al llamar a '{function}'{note}")
+        self.max_depth = max_depth
+        self.function = function
+
+
+class FrameLayout:
+    """
+    Acomodo del frame plano de una función y su free list de frames.
+
+    Attributes:
+        name: Nombre de la función (o 'main')
+        sizes: {segmento: celdas} para local/temp int/float
+        bases: {segmento: posición donde empieza en la lista plana}
+        size: Total de celdas del frame
+    """
+
+    __slots__ = ('name', 'sizes', 'bases', 'size', 'template', 'free')
+
+    def __init__(self, name: str, local_int: int = 0, local_float: int = 0,
+                 temp_int: int = 0, temp_float: int = 0):
+        self.name = name
+        self.sizes = dict(zip(FRAME_SEGMENTS, (local_int, local_float, temp_int, temp_float)))
+        self.bases: Dict[int, int] = {}
+        offset = 0
+        for segment in FRAME_SEGMENTS:
+            self.bases[segment] = offset
+            offset += self.sizes[segment]
+        self.size = offset
+        # Las celdas empiezan en 0, igual que una dirección nunca escrita
+        self.template: List[Any] = [0] * offset
+        self.free: List[List[Any]] = []
+
+    def slot(self, segment: int, offset: int) -> int:
+        """Posición en la lista plana de (segmento, offset); IndexError si no cabe."""
+        if not 0 <= offset < self.sizes[segment]:
+            raise IndexError(f"Celda {offset} fuera del frame de '{self.name}'")
+        return self.bases[segment] + offset
+
+    def acquire(self) -> List[Any]:
+        """Regresa un frame en ceros, reutilizando uno de la free list si hay."""
+        free = self.free
+        if free:
+            frame = free.pop()
+            frame[:] = self.template
+            return frame
+        return self.template[:]
+
+    def release(self, frame: List[Any]) -> None:
+        """Regresa un frame a la free list (si no está llena)."""
+        if len(self.free) < FREE_LIST_LIMIT:
+            self.free.append(frame)
+
+    def view(self, frame: List[Any], segment: int) -> List[Any]:
+        """Copia de la parte del frame que corresponde a un segmento."""
+        base = self.bases[segment]
+        return frame[base:base + self.sizes[segment]]
+
+    def __repr__(self):
+        sizes = ", ".join(f"{self.sizes[segment]}" for segment in FRAME_SEGMENTS)
+        return f"FrameLayout({self.name}: {sizes}, libres={len(self.free)})"
+
+
+class CallPlan:
+    """
+    Todo lo que necesita una llamada a una función, calculado al cargar.
+
+    Attributes:
+        name: Nombre de la función
+        entry: Cuádruplo donde empieza (quad_start), o None si no se conoce
+        layout: FrameLayout de la función (de ahí salen sus frames)
+        slots: Posición en el frame plano de cada parámetro, por índice
+    """
+
+    __slots__ = ('name', 'entry', 'layout', 'slots')
+
+    def __init__(self, name: str, entry: Optional[int], layout: FrameLayout, slots: List[int]):
+        self.name = name
+        self.entry = entry
+        self.layout = layout
+        self.slots = slots
+
+    @classmethod
+    def for_function(cls, name: str, func_info: dict, layout: FrameLayout) -> 'CallPlan':
+        """Plan de una función del .obj: int a local int, float a local float, en orden."""
+        slots = []
+        int_slot = layout.bases[LOCAL_INT]
+        float_slot = layout.bases[LOCAL_FLOAT]
+        for param in func_info.get('params', []):
+            if param.get('type', 'int') == 'int':
+                slots.append(int_slot)
+                int_slot += 1
+            else:
+                slots.append(float_slot)
+                float_slot += 1
+        entry = func_info.get('quad_start')
+        return cls(name, entry if isinstance(entry, int) else None, layout, slots)
+
+    def __repr__(self):
+        return f"CallPlan({self.name} @ {self.entry}, slots={self.slots})"
+
+
+def bind_call_plans(code: List, plans: Dict[str, CallPlan]) -> None:
+    """
+    Reescribe en sitio ERA / PARAM / GOSUB para usar los planes de llamada:
+
+        ERA:    a = CallPlan
+        PARAM:  a, b = argumento    c = número de parámetro    f = posición en el frame
+        GOSUB:  a = CallPlan                                   f = quad_start
+
+    Los argumentos de una llamada siempre quedan entre su ERA y su GOSUB
+    (las llamadas anidadas dentro de los argumentos van completas en
+    medio), así que un stack de llamadas pendientes basta para saber a
+    qué llamada pertenece cada PARAM.
+    """
+    pending: List[CallPlan] = []
+    for index, instr in enumerate(code):
+        op, a, b, c, d, e, f = instr
+
+        if op == OP_ERA:
+            plan = plans.get(a)
+            if plan is None:
+                # Función que no viene en la tabla: frame vacío, como antes
+                plan = plans[a] = CallPlan(a, None, FrameLayout(a), [])
+            pending.append(plan)
+            code[index] = (OP_ERA, plan, 0, 0, 0, 0, 0)
+
+        elif op == OP_PARAM:
+            if not pending:
+                code[index] = (OP_ERROR, f"PARAM sin ERA en el cuádruplo {index}", 0, 0, 0, 0, 0)
+                continue
+            slots = pending[-1].slots
+            if isinstance(f, int) and 0 <= f < len(slots):
+                code[index] = (OP_PARAM, a, b, f, 0, 0, slots[f])
+            else:
+                # Argumento de más: se ignora, como siempre ha hecho la VM
+                code[index] = (OP_GOTO, 0, 0, 0, 0, 0, index + 1)
+
+        elif op == OP_GOSUB:
+            if not pending or pending[-1].name != a:
+                code[index] = (OP_ERROR, f"GOSUB '{a}' sin su ERA en el cuádruplo {index}", 0, 0, 0, 0, 0)
+                continue
+            code[index] = (OP_GOSUB, pending.pop(), 0, 0, 0, 0, f)
+
+        elif op in (OP_ENDFUNC, OP_END):
+            pending.clear()
+
+
+def _flat(layout: FrameLayout, segment: Any, offset: Any):
+    if segment in FRAME_SEGMENTS:
+        return FRAME, layout.bases[segment] + offset
+    return segment, offset
+
+
+def flatten_frame_operands(code: List, start: int, end: int, layout: FrameLayout) -> None:
+    """
+    Reescribe en sitio los operandos de frame de code[start:end] a
+    posiciones de la lista plana según el layout.
+    """
+    for index in range(start, end):
+        op, a, b, c, d, e, f = code[index]
+        if op in _BINARY_OPCODES:
+            a, b = _flat(layout, a, b)
+            c, d = _flat(layout, c, d)
+            e, f = _flat(layout, e, f)
+        elif op == OP_ASSIGN or op == OP_RETURN:
+            a, b = _flat(layout, a, b)
+            e, f = _flat(layout, e, f)
+        elif op in (OP_GOTOF, OP_PRINT, OP_PARAM):
+            a, b = _flat(layout, a, b)
+        else:
+            continue
+        code[index] = (op, a, b, c, d, e, f)
+
+
+def code_regions(code: List, starts: Dict[int, Any]) -> List[tuple]:
+    """
+    Parte el código en regiones que terminan en ENDFUNC o END.
+
+    Args:
+        code: Instrucciones decodificadas
+        starts: {índice de inicio: dueño} de funciones y main; si un dueño
+                empieza a mitad de una región, la región se corta ahí
+
+    Returns:
+        list: [(inicio, fin exclusivo, dueño o None)]
+    """
+    regions = []
+    start = 0
+    owner: Optional[Any] = starts.get(0)
+    for index, instr in enumerate(code):
+        if index in starts and index != start:
+            regions.append((start, index, owner))
+            start, owner = index, starts[index]
+        if instr[0] in (OP_ENDFUNC, OP_END):
+            regions.append((start, index + 1, owner))
+            start = index + 1
+            owner = starts.get(start)
+    if start < len(code):
+        regions.append((start, len(code), owner))
+    return regions
@@ -3,8 +3,35 @@ Sistema de Direcciones Virtuales para el Compilador Patito
 
 Asigna direcciones de memoria virtuales a variables, temporales y constantes
 según su tipo y scope (global, local, temporal, constante).
+
+Cada segmento ocupa 1000 direcciones; el índice de segmento es
+address // 1000 y de ahí salen el scope y el tipo (ver SEGMENTS).
 """
 
+from typing import NamedTuple
+
+SEGMENT_SIZE = 1000
+
+# Índice de segmento -> (scope, tipo)
+SEGMENTS = {
+    1: ('global', 'int'),
+    2: ('global', 'float'),
+    3: ('local', 'int'),
+    4: ('local', 'float'),
+    5: ('temp', 'int'),
+    6: ('temp', 'float'),
+    7: ('constant', 'int'),
+    8: ('constant', 'float'),
+}
+
+
+class OperandDescriptor(NamedTuple):
+    """Dirección virtual ya resuelta."""
+    segment: int    # índice de segmento (address // 1000)
+    slot: int       # celda dentro del segmento (address % 1000)
+    scope: str      # 'global', 'local', 'temp' o 'constant'
+    type: str       # 'int' o 'float'
+
 
 class MemoryMap:
     
@@ -164,31 +191,25 @@ class MemoryMap:
         }
     
     @staticmethod
-    def get_segment(address): #determinar a qué segmento pertenece una dirección
-        if 1000 <= address < 3000:
-            return 'global'
-        elif 3000 <= address < 5000:
-            return 'local'
-        elif 5000 <= address < 7000:
-            return 'temp'
-        elif 7000 <= address < 9000:
-            return 'constant'
-        else:
-            raise ValueError(f"Dirección {address} fuera de rango válido")
-    
-    @staticmethod
-    def get_type_from_address(address): #determinar el tipo de dato según la dirección  
-        #direcciones pares son int, impares son float en cada segmento
-        if address < 1000 or address >= 9000:
-            raise ValueError(f"Dirección {address} fuera de rango válido")
+    def resolve(address): #resolver una dirección a (segmento, celda, scope, tipo) de un jalon
+        if not isinstance(address, int) or isinstance(address, bool):
+            raise ValueError(f"Operando inválido: {address!r}")
         
         #global int: 1000-1999, global float: 2000-2999
         #local int: 3000-3999, local float: 4000-4999
         #temp int: 5000-5999, temp float: 6000-6999
         #cte int: 7000-7999, cte float: 8000-8999
-        segment_offset = address % 2000
-        if segment_offset < 1000:
-            return 'int'
-        else:
-            return 'float'
+        segment = address // SEGMENT_SIZE
+        info = SEGMENTS.get(segment)
+        if info is None:
+            raise ValueError(f"Dirección {address} fuera de rango válido")
+        return OperandDescriptor(segment, address % SEGMENT_SIZE, info[0], info[1])
+    
+    @staticmethod
+    def get_segment(address): #determinar a qué segmento pertenece una dirección
+        return MemoryMap.resolve(address).scope
+    
+    @staticmethod
+    def get_type_from_address(address): #determinar el tipo de dato según la dirección  
+        return MemoryMap.resolve(address).type
 
@@ -0,0 +1,337 @@
+"""
+Reporte de Memoria del Compilador y la Máquina Virtual Patito
+
+Con MemoryReport cada fase corre bajo tracemalloc y se reporta, por fase,
+el pico (lo más alto que llegó la memoria trazada durante la fase, sobre
+lo que había al empezarla) y lo retenido (lo que la fase deja vivo):
+
+- parse: el árbol de Lark
+- sdt: tablas, cuádruplos y constantes
+- to_obj / obj_write / obj_load: el .obj en memoria o en disco
+- vm_load: decodificación, layouts y memoria de la VM
+- vm_run: la corrida (frames, salida)
+
+Al terminar de compilar, lo que creció desde el inicio se reparte por
+estructura según la línea donde se hizo cada asignación (ver STRUCTURES):
+el árbol de Lark, VariableTable / FunctionDirectory, los cuádruplos
+(gen_quad / fill_quad), ConstantTable y las direcciones de MemoryMap.
+
+La corrida usa el loop instrumentado de vm_profile, que da la profundidad
+máxima de llamadas y, por función, el máximo de activaciones vivas a la
+vez. Con eso y el FrameLayout de cada función se reportan las celdas
+(slots) de su frame y los bytes de frames que llegó a tener vivos. Solo
+se cuenta la lista plana de cada frame: los int chicos que guardan las
+celdas son compartidos por Python.
+
+Las closures del loop instrumentado se compilan en su propia fase
+('instrument'), para que no se cuenten como memoria del programa.
+"""
+
+import inspect
+import json
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from .frame_layout import LOCAL_INT, LOCAL_FLOAT, TEMP_INT, TEMP_FLOAT
+from .patito_parser import parse_text
+from .patito_sdt import PatitoSDT
+from .vm_profile import ExecutionProfiler
+
+# (clave, etiqueta) de cada estructura del compilador, en orden de reporte
+STRUCTURES = (
+    ('lark_tree', 'arbol de Lark'),
+    ('tables', 'VariableTable / FunctionDirectory'),
+    ('quadruples', 'cuadruplos'),
+    ('constants', 'ConstantTable'),
+    ('addresses', 'direcciones (MemoryMap)'),
+    ('other', 'otros'),
+)
+
+_MODULE_STRUCTURES = {
+    'variable_table.py': 'tables',
+    'function_directory.py': 'tables',
+    'constant_table.py': 'constants',
+    'memory_map.py': 'addresses',
+}
+
+_PACKAGE_DIR = Path(__file__).resolve().parent
+
+# reset_peak() llegó en Python 3.9; antes el pico por fase no se puede medir
+_reset_peak = getattr(tracemalloc, 'reset_peak', None)
+
+_quad_lines: Optional[Dict[str, set]] = None
+
+
+def _quadruple_lines() -> Dict[str, set]:
+    """{archivo: líneas} de los métodos de PatitoSDT que crean cuádruplos."""
+    global _quad_lines
+    if _quad_lines is None:
+        _quad_lines = {}
+        for method in (PatitoSDT.gen_quad, PatitoSDT.fill_quad):
+            lines, first = inspect.getsourcelines(method)
+            filename = method.__code__.co_filename
+            _quad_lines.setdefault(filename, set()).update(range(first, first + len(lines)))
+    return _quad_lines
+
+
+def structure_of(filename: str, lineno: int) -> str:
+    """
+    Estructura a la que se atribuye una asignación hecha en filename:lineno.
+
+    Returns:
+        str: Una de las claves de STRUCTURES
+    """
+    path = Path(filename)
+    if 'lark' in path.parts:
+        return 'lark_tree'
+    if lineno in _quadruple_lines().get(filename, ()):
+        return 'quadruples'
+    if path.parent == _PACKAGE_DIR:
+        return _MODULE_STRUCTURES.get(path.name, 'other')
+    return 'other'
+
+
+def attribute_growth(snapshot: 'tracemalloc.Snapshot', baseline: 'tracemalloc.Snapshot') -> Dict[str, int]:
+    """
+    Reparte por estructura lo que creció la memoria entre dos snapshots.
+
+    Returns:
+        dict: {clave de STRUCTURES: bytes}
+    """
+    totals = {key: 0 for key, _ in STRUCTURES}
+    # Lo que asigna el propio tracemalloc al tomar los snapshots no cuenta
+    own = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    for diff in snapshot.filter_traces(own).compare_to(baseline.filter_traces(own), 'lineno'):
+        frame = diff.traceback[0]
+        totals[structure_of(frame.filename, frame.lineno)] += diff.size_diff
+    return totals
+
+
+class MemoryReport:
+    """
+    Contabilidad de memoria por fase con tracemalloc.
+
+    Uso:
+        with MemoryReport() as report:
+            sdt = report.compile(source)
+            with report.phase('vm_load'):
+                vm = VirtualMachine(sdt.to_obj())
+            report.run(vm)
+        print(format_memory_report(report.to_dict()))
+
+    Attributes:
+        phases: [{'phase', 'peak', 'retained'}] en el orden en que corrieron
+                (peak es None si el Python no tiene tracemalloc.reset_peak)
+        structures: {estructura: bytes} al terminar de compilar, o {}
+        vm: Contabilidad de la corrida (ver run()), o None
+    """
+
+    def __init__(self):
+        self.program: Optional[str] = None
+        self.phases: List[Dict[str, Any]] = []
+        self.structures: Dict[str, int] = {}
+        self.vm: Optional[Dict[str, Any]] = None
+        self.traced_peak = 0
+        self._owns_tracing = False
+        # Bytes que ocupa el snapshot base de compile() mientras está vivo
+        self._overhead = 0
+
+    def start(self) -> 'MemoryReport':
+        """Empieza a trazar (si nadie más lo estaba haciendo)."""
+        # inspect deja el fuente de patito_sdt en linecache: que no se cuente
+        _quadruple_lines()
+        self._owns_tracing = not tracemalloc.is_tracing()
+        if self._owns_tracing:
+            tracemalloc.start()
+        return self
+
+    def stop(self) -> None:
+        """Deja de trazar si start() fue quien empezó."""
+        if self._owns_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+            self._owns_tracing = False
+
+    def __enter__(self) -> 'MemoryReport':
+        return self.start()
+
+    def __exit__(self, *exc_info) -> bool:
+        self.stop()
+        return False
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Mide el pico y lo retenido del bloque como la fase name."""
+        if _reset_peak is not None:
+            _reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            self.traced_peak = max(self.traced_peak, peak - self._overhead)
+            self.phases.append({
+                'phase': name,
+                'peak': peak - before if _reset_peak is not None else None,
+                'retained': current - before,
+            })
+
+    def compile(self, text: str) -> PatitoSDT:
+        """
+        Parsea y traduce text en las fases 'parse' y 'sdt' y reparte lo
+        retenido por estructura (con el árbol todavía vivo).
+
+        Returns:
+            PatitoSDT: El SDT, igual que parse_and_validate()
+        """
+        before = tracemalloc.get_traced_memory()[0]
+        baseline = tracemalloc.take_snapshot()
+        self._overhead = tracemalloc.get_traced_memory()[0] - before
+        try:
+            with self.phase('parse'):
+                tree = parse_text(text)
+            with self.phase('sdt'):
+                sdt = PatitoSDT()
+                sdt.transform(tree)
+            self.structures = attribute_growth(tracemalloc.take_snapshot(), baseline)
+        finally:
+            del baseline
+            self._overhead = 0
+        self.program = sdt.program_name
+        return sdt
+
+    def run(self, vm, output: Any = None) -> List[str]:
+        """
+        Ejecuta el programa completo de vm en la fase 'vm_run' con el loop
+        instrumentado de vm_profile y guarda la contabilidad en self.vm.
+
+        Args:
+            vm: VirtualMachine con motor 'interp' o 'threaded', sin trazas
+                ni presupuesto; si se creó con profile=True su perfil
+                también queda en get_profile()
+            output: Destino de la salida, igual que en VirtualMachine.execute()
+
+        Returns:
+            List[str]: Salida del programa, igual que execute()
+        """
+        if vm.engine not in ('interp', 'threaded') or vm.tracer is not None \
+                or vm.max_quads is not None or vm.time_limit is not None:
+            raise ValueError("El reporte de memoria solo está disponible con los motores "
+                             "'interp' y 'threaded', sin trazas ni presupuesto")
+        if self.program is None:
+            self.program = vm.program_name
+        profiler = vm.profiler if vm.profiler is not None else ExecutionProfiler(vm)
+        with self.phase('instrument'):
+            profiler.prepare()
+        vm.start(output)
+        try:
+            with self.phase('vm_run'):
+                profiler.run()
+        finally:
+            vm.output.flush()
+            self.vm = vm_accounting(vm, profiler.profile)
+        return vm.output_buffer
+
+    def to_dict(self) -> Dict[str, Any]:
+        """El reporte como dict listo para JSON."""
+        return {
+            'program': self.program,
+            'traced_peak': self.traced_peak,
+            'phases': list(self.phases),
+            'structures': dict(self.structures),
+            'vm': self.vm,
+        }
+
+
+def vm_accounting(vm, profile: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Celdas y frames de una corrida perfilada.
+
+    Args:
+        vm: La VirtualMachine
+        profile: Perfil de la corrida (ExecutionProfiler.profile)
+
+    Returns:
+        dict: max_depth, global_slots, constant_slots y functions
+              {nombre: calls, max_active, slots, sizes, frame_bytes,
+              peak_frame_bytes}, de más a menos bytes de frames
+    """
+    profiled = profile['functions'] if profile else {}
+    layouts = dict(vm.frame_layouts)
+    layouts['main'] = vm.memory.main_layout
+    functions = {}
+    for name, layout in layouts.items():
+        info = profiled.get(name, {})
+        frame_bytes = sys.getsizeof(layout.template)
+        max_active = info.get('max_active', 0)
+        functions[name] = {
+            'calls': info.get('calls', 0),
+            'max_active': max_active,
+            'slots': layout.size,
+            'sizes': {
+                'local_int': layout.sizes[LOCAL_INT],
+                'local_float': layout.sizes[LOCAL_FLOAT],
+                'temp_int': layout.sizes[TEMP_INT],
+                'temp_float': layout.sizes[TEMP_FLOAT],
+            },
+            'frame_bytes': frame_bytes,
+            'peak_frame_bytes': max_active * frame_bytes,
+        }
+    memory = vm.memory
+    return {
+        'max_depth': profile['max_depth'] if profile else 0,
+        'global_slots': len(memory.global_int) + len(memory.global_float),
+        'constant_slots': len(memory.constant_memory),
+        'functions': dict(sorted(functions.items(), key=lambda item: -item[1]['peak_frame_bytes'])),
+    }
+
+
+def _kib(size: Optional[int]) -> str:
+    return f"{size / 1024:10.1f}" if size is not None else f"{'-':>10}"
+
+
+def format_memory_report(report: Dict[str, Any], top: int = 15) -> str:
+    """
+    Reporte de texto de MemoryReport.to_dict().
+
+    Args:
+        report: El reporte
+        top: Cuántas funciones mostrar (las de más bytes de frames)
+    """
+    lines = [f"Memoria de {report['program']} (tracemalloc): "
+             f"pico total {report['traced_peak'] / 1024:.1f} KiB"]
+
+    lines.append("\nFases (KiB):")
+    lines.append(f"  {'fase':12} {'pico':>10} {'retenido':>10}")
+    for phase in report['phases']:
+        lines.append(f"  {phase['phase']:12} {_kib(phase['peak'])} {_kib(phase['retained'])}")
+
+    structures = report['structures']
+    if structures:
+        total = sum(size for size in structures.values() if size > 0) or 1
+        lines.append("\nRetenido al terminar de compilar (KiB):")
+        for key, label in STRUCTURES:
+            size = structures.get(key, 0)
+            lines.append(f"  {label:34} {_kib(size)} {max(size, 0) * 100 / total:6.1f}%")
+
+    vm = report['vm']
+    if vm is not None:
+        functions = list(vm['functions'].items())
+        lines.append(f"\nVM: profundidad maxima {vm['max_depth']}, "
+                     f"{vm['global_slots']} celdas globales, {vm['constant_slots']} constantes")
+        lines.append(f"  {'funcion':16} {'llamadas':>9} {'activas':>8} {'celdas':>7} "
+                     f"{'bytes/frame':>12} {'KiB frames':>11}")
+        if len(functions) > top:
+            lines[-1] += f"  (top {top} de {len(functions)})"
+        for name, info in functions[:top]:
+            lines.append(f"  {name:16} {info['calls']:9} {info['max_active']:8} {info['slots']:7} "
+                         f"{info['frame_bytes']:12} {info['peak_frame_bytes'] / 1024:11.1f}")
+    return "\n".join(lines)
+
+
+def dump_memory_report(report: Dict[str, Any], path: str) -> None:
+    """Guarda el reporte como JSON."""
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump(report, report_file, indent=2, ensure_ascii=False)
@@ -27,8 +27,12 @@ class ObjGenerator:
                 "params": [{"name": "x", "type": "int"}, ...],
                 "resources": {"local_int": int, "local_float": int, ...}
             }
-        }
+        },
+        "globals": {"nombre": addr, ...}
     }
+    
+    "globals" es opcional (los .obj viejos no lo traen); lo usa la
+    ejecución por carriles para nombrar las columnas de entrada.
     """
     
     @staticmethod
@@ -59,7 +63,20 @@ class ObjGenerator:
             dict: Datos del programa compilado
         """
         with open(input_path, 'r', encoding='utf-8') as f:
-            obj_data = json.load(f)
+            return ObjGenerator.loads(f.read())
+    
+    @staticmethod
+    def loads(text):
+        """
+        Carga un .obj ya leído.
+        
+        Args:
+            text: Contenido JSON del archivo .obj
+        
+        Returns:
+            dict: Datos del programa compilado
+        """
+        obj_data = json.loads(text)
         
         # Convertir claves de constantes de string a int
         if 'constants' in obj_data:
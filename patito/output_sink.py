@@ -0,0 +1,245 @@
+"""
+Destinos de Salida para la Máquina Virtual Patito
+
+Cada PRINT de un programa termina en un solo sink.write(texto). El sink
+decide qué hacer con el texto:
+
+- BufferedSink: junta el texto y lo escribe al stream (stdout por default)
+  en pedazos de flush_size caracteres; opcionalmente también lo captura
+- CaptureSink: solo lo guarda en una lista (para tests)
+- DiscardSink: lo tira (para medir la VM sin el costo de la salida)
+- AsyncSink: lo junta por tramo y lo entrega a una corrutina (para VMs
+  que corren en el scheduler de asyncio, ver vm_scheduler)
+
+stream_execution() corre la VM en un hilo aparte y regresa un iterador de
+pedazos de texto con una cola acotada, así que la memoria no crece con el
+tamaño de la salida.
+"""
+
+import sys
+import queue
+import threading
+from typing import Any, Awaitable, Callable, Iterator, List, Optional
+
+# Caracteres que junta un BufferedSink antes de escribir al stream
+DEFAULT_FLUSH_SIZE = 8192
+
+# Pedazos que pueden esperar en la cola de stream_execution()
+DEFAULT_QUEUE_SIZE = 16
+
+
+class OutputSink:
+    """
+    Destino de la salida de un programa.
+
+    El sink base guarda cada texto en captured si captura y si no lo tira;
+    las subclases que escriben a otro lado reemplazan write().
+
+    Attributes:
+        captured: Lista con todo lo que se escribió, o None si el sink no
+                  captura (la VM la expone como output_buffer)
+    """
+
+    def __init__(self, capture: bool = False):
+        self.captured: Optional[List[str]] = [] if capture else None
+
+    def write(self, text: str) -> None:
+        if self.captured is not None:
+            self.captured.append(text)
+
+    def flush(self) -> None:
+        """Escribe lo pendiente (si el sink tiene buffer)."""
+
+
+class BufferedSink(OutputSink):
+    """
+    Escribe al stream en pedazos de flush_size caracteres.
+
+    Args:
+        stream: Objeto con .write(str); default sys.stdout (el actual al
+                crear el sink, para que redirect_stdout funcione)
+        flush_size: Caracteres pendientes antes de escribir; 0 escribe cada print
+        capture: Si es True también guarda cada texto en captured
+    """
+
+    def __init__(self, stream: Any = None, flush_size: int = DEFAULT_FLUSH_SIZE,
+                 capture: bool = False):
+        super().__init__(capture)
+        self.stream = stream if stream is not None else sys.stdout
+        self.flush_size = flush_size
+        self._pending: List[str] = []
+        self._size = 0
+        if capture:
+            self.write = self._write_and_capture
+
+    def write(self, text: str) -> None:
+        self._pending.append(text)
+        self._size += len(text)
+        if self._size >= self.flush_size:
+            self.flush()
+
+    def _write_and_capture(self, text: str) -> None:
+        self.captured.append(text)
+        self._pending.append(text)
+        self._size += len(text)
+        if self._size >= self.flush_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self.stream.write(''.join(self._pending))
+            self._pending.clear()
+            self._size = 0
+        flush = getattr(self.stream, 'flush', None)
+        if flush is not None:
+            flush()
+
+
+class CaptureSink(OutputSink):
+    """Solo guarda la salida en captured; no escribe nada."""
+
+    def __init__(self):
+        super().__init__(capture=True)
+
+
+class DiscardSink(OutputSink):
+    """Tira la salida."""
+
+    def __init__(self):
+        super().__init__(capture=False)
+
+
+class AsyncSink(OutputSink):
+    """
+    Salida de una VM que corre por tramos en un scheduler de asyncio.
+
+    write() junta el texto; flush() (al final de cada tramo) lo deja listo
+    y drain() lo entrega con await a `writer`, así que un consumidor lento
+    solo frena a su programa.
+
+    Args:
+        writer: Corrutina async def writer(texto); None no entrega nada
+        capture: Si es True también guarda cada texto en captured
+    """
+
+    def __init__(self, writer: Optional[Callable[[str], Awaitable[Any]]] = None,
+                 capture: bool = True):
+        super().__init__(capture)
+        self.writer = writer
+        self._pending: List[str] = []
+        self._ready: List[str] = []
+        if capture:
+            self.write = self._write_and_capture
+
+    def write(self, text: str) -> None:
+        self._pending.append(text)
+
+    def _write_and_capture(self, text: str) -> None:
+        self.captured.append(text)
+        self._pending.append(text)
+
+    def flush(self) -> None:
+        if self._pending:
+            self._ready.append(''.join(self._pending))
+            self._pending.clear()
+
+    async def drain(self) -> None:
+        """Entrega a writer lo que dejaron listo los flush()."""
+        ready, self._ready = self._ready, []
+        if self.writer is not None:
+            for chunk in ready:
+                await self.writer(chunk)
+
+
+class StreamCancelled(Exception):
+    """El consumidor del iterador dejó de leer; la VM se detiene."""
+
+
+class _QueueSink(OutputSink):
+    """Junta texto en pedazos y los pasa por una cola acotada."""
+
+    def __init__(self, chunks: 'queue.Queue', cancelled: threading.Event, chunk_size: int):
+        super().__init__()
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.chunk_size = chunk_size
+        self._pending: List[str] = []
+        self._size = 0
+
+    def write(self, text: str) -> None:
+        self._pending.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        chunk = ''.join(self._pending)
+        self._pending.clear()
+        self._size = 0
+        # Esperar lugar en la cola sin quedarse colgado si ya nadie lee
+        while True:
+            if self.cancelled.is_set():
+                raise StreamCancelled()
+            try:
+                self.chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+
+_DONE = object()
+
+
+def stream_execution(run: Callable[[OutputSink], Any],
+                     chunk_size: int = DEFAULT_FLUSH_SIZE,
+                     queue_size: int = DEFAULT_QUEUE_SIZE) -> Iterator[str]:
+    """
+    Corre run(sink) en otro hilo y regresa un iterador con la salida.
+
+    Como mucho hay queue_size pedazos de chunk_size caracteres en memoria;
+    si el consumidor es lento la VM espera. Un error de la VM se relanza en
+    el iterador después de entregar la salida anterior al error.
+
+    Args:
+        run: Función que ejecuta el programa escribiendo en el sink dado
+        chunk_size: Tamaño aproximado de cada pedazo
+        queue_size: Pedazos máximos en espera
+    """
+    chunks: 'queue.Queue' = queue.Queue(maxsize=queue_size)
+    cancelled = threading.Event()
+    sink = _QueueSink(chunks, cancelled, chunk_size)
+    failure: List[BaseException] = []
+
+    def worker():
+        try:
+            run(sink)
+        except StreamCancelled:
+            return
+        except BaseException as e:
+            failure.append(e)
+        # La señal de fin siempre entra, aunque tenga que esperar lugar
+        while not cancelled.is_set():
+            try:
+                chunks.put(_DONE, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def iterate():
+        thread = threading.Thread(target=worker, name="patito-vm-stream", daemon=True)
+        thread.start()
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is _DONE:
+                    break
+                yield chunk
+            if failure:
+                raise failure[0]
+        finally:
+            cancelled.set()
+            thread.join()
+
+    return iterate()
@@ -6,10 +6,42 @@ Comandos disponibles:
     patito compile <archivo.patito>  - Compila y genera .obj
     patito run <archivo.obj>         - Ejecuta un .obj
     patito execute <archivo.patito>  - Compila y ejecuta de un jalon
+    patito run-batch <dir|manifiesto> - Ejecuta muchos .obj en varios procesos
+    patito worker-pool               - Servidor de ejecucion (JSONL por stdin
+                                       o --socket) con procesos calientes
+    patito run-lanes <archivo.obj>   - Ejecuta un .obj sobre muchas entradas
+                                       a la vez (carriles con NumPy)
+    patito trace-dump <archivo>      - Muestra una traza grabada con
+                                       --record-trace (filtra por funcion
+                                       o rango de cuadruplos)
     patito <archivo.patito>          - Muestra analisis completo
+
+Opciones de run / execute:
+    --engine=<motor>                 - Motor de ejecucion de la VM
+                                       (interp, threaded, pyjit o numpy)
+    --overflow=<error|wrap>          - Desbordamiento int64 del motor numpy
+    --hot-loops=<N>                  - Traza los ciclos que den N vueltas
+                                       y reporta las trazas al final
+    --output=<archivo>               - Manda la salida del programa a un archivo
+    --max-depth=<N>                  - Maximo de llamadas activas (recursion)
+    --profile[=<archivo.json>]       - Perfila la corrida: reporte al final
+                                       y opcionalmente el perfil en JSON
+    --sample=<archivo.folded>        - Muestrea el stack de llamadas y lo
+                                       guarda para flamegraph
+    --sample-rate=<N>                - Muestras por segundo (default 1000)
+    --max-quads=<N>                  - Presupuesto de cuadruplos (motor interp)
+    --time-limit=<segundos>          - Tiempo limite de la corrida (motor interp)
+    --checkpoint=<archivo>           - Guarda un checkpoint cada N cuadruplos
+    --checkpoint-every=<N>           - Cuadruplos entre checkpoints (default 1000000)
+    --restore=<archivo>              - Sigue la corrida guardada en un checkpoint
+    --memory-report[=<archivo.json>] - Memoria por fase, estructura y frame
+                                       (tracemalloc; tambien en compile)
+    --record-trace=<archivo>         - Graba un registro binario por cuadruplo
+                                       ejecutado (ver trace-dump)
 """
 
 import sys
+from contextlib import nullcontext
 from pathlib import Path
 
 
@@ -20,11 +52,12 @@ def print_header(text):
     print("=" * 50)
 
 
-def cmd_compile(source_path: str, output_path: str = None):
+def cmd_compile(source_path: str, output_path: str = None, options: dict = None):
     """Compila un archivo .patito a .obj"""
     from .patito_parser import parse_and_validate
     from .obj_generator import ObjGenerator
     
+    options = options or {}
     source_file = Path(source_path)
     
     if not source_file.exists():
@@ -45,9 +78,10 @@ def cmd_compile(source_path: str, output_path: str = None):
     src = source_file.read_text(encoding='utf-8')
     
     # Paso 1: Parsear
+    report = start_memory_report(options)
     print("\n[1/3] Parseando...")
     try:
-        sdt = parse_and_validate(src)
+        sdt = report.compile(src) if report is not None else parse_and_validate(src)
         print("      OK!")
     except Exception as e:
         print(f"      Error de sintaxis: {e}")
@@ -64,7 +98,8 @@ def cmd_compile(source_path: str, output_path: str = None):
     
     # Paso 3: Generar .obj
     print("[3/3] Generando .obj...")
-    ObjGenerator.generate(sdt, str(output_path))
+    with measured(report, 'obj_write'):
+        ObjGenerator.generate(sdt, str(output_path))
     print("      OK!")
     
     # Listo!
@@ -72,13 +107,154 @@ def cmd_compile(source_path: str, output_path: str = None):
     print(f"  Cuadruplos: {len(sdt.quadruples)}")
     print(f"  Funciones:  {len(sdt.func_dir.get_all_functions())}")
     print(f"  Archivo:    {output_path}")
+    print_memory_report(report, options)
+
+
+def build_vm(obj_data: dict, options: dict):
+    """Crea la VM con las opciones de la linea de comandos"""
+    from .virtual_machine import VirtualMachine
+    
+    from .frame_layout import DEFAULT_MAX_DEPTH
+    from .vm_profile import DEFAULT_SAMPLE_RATE
+    
+    threshold = options.get('hot-loops')
+    sample_rate = int(options.get('sample-rate', DEFAULT_SAMPLE_RATE)) if 'sample' in options else None
+    return VirtualMachine(
+        obj_data,
+        engine=options.get('engine', 'interp'),
+        hot_loop_threshold=int(threshold) if threshold is not None else None,
+        max_depth=int(options.get('max-depth', DEFAULT_MAX_DEPTH)),
+        profile='profile' in options,
+        sample_rate=sample_rate,
+        max_quads=int(options['max-quads']) if 'max-quads' in options else None,
+        time_limit=float(options['time-limit']) if 'time-limit' in options else None,
+        overflow=options.get('overflow', 'error'),
+        record_trace=options.get('record-trace'),
+    )
+
+
+def start_memory_report(options: dict):
+    """Un MemoryReport ya trazando si se pidio --memory-report, si no None"""
+    if 'memory-report' not in options:
+        return None
+    from .memory_report import MemoryReport
+    return MemoryReport().start()
+
+
+def measured(report, phase: str):
+    """Contexto que mide el bloque como una fase del reporte (si hay reporte)"""
+    return report.phase(phase) if report is not None else nullcontext()
+
+
+def print_memory_report(report, options: dict):
+    """Imprime el reporte de memoria y lo guarda en JSON si --memory-report trae archivo"""
+    if report is None:
+        return
+    from .memory_report import format_memory_report, dump_memory_report
+    
+    report.stop()
+    data = report.to_dict()
+    print("\n" + format_memory_report(data))
+    path = options.get('memory-report')
+    if isinstance(path, str):
+        dump_memory_report(data, path)
+        print(f"\nReporte de memoria guardado en {path}")
+
+
+def run_vm(vm, options: dict, report=None):
+    """Ejecuta la VM mandando la salida a donde diga --output (stdout por default)"""
+    path = options.get('output')
+    if path is None:
+        return run_vm_with_checkpoints(vm, options, None, report)
+    with open(path, 'w', encoding='utf-8') as output_file:
+        return run_vm_with_checkpoints(vm, options, output_file, report)
+
+
+def run_vm_with_checkpoints(vm, options: dict, output, report=None):
+    """Ejecuta de corrido, o por tramos si se pidio --checkpoint / --restore"""
+    from .vm_checkpoint import DEFAULT_CHECKPOINT_EVERY
+    
+    checkpoint_path = options.get('checkpoint')
+    restore_path = options.get('restore')
+    if report is not None:
+        if checkpoint_path is not None or restore_path is not None:
+            raise ValueError("--memory-report no se puede usar con --checkpoint ni --restore")
+        return report.run(vm, output)
+    if checkpoint_path is None and restore_path is None:
+        return vm.execute(output)
+    
+    if restore_path is not None:
+        vm.restore(restore_path, output)
+    else:
+        vm.start(output)
+    every = int(options.get('checkpoint-every', DEFAULT_CHECKPOINT_EVERY)) if checkpoint_path else None
+    while not vm.resume(every):
+        vm.checkpoint(checkpoint_path)
+    return vm.output_buffer
+
+
+def print_vm_reports(vm, options: dict = None):
+    """Imprime los reportes que se pidieron con opciones (trazas, perfil, etc.)"""
+    from .vm_profile import format_profile, dump_profile, dump_collapsed
+    
+    options = options or {}
+    stats = vm.get_trace_stats()
+    if stats is not None:
+        print(f"\nCiclos calientes (umbral {stats['threshold']}):")
+        if not stats['loops']:
+            print("  (ninguno)")
+        for edge, info in stats['loops'].items():
+            line = f"  {info['header']:03}-{edge:03}: {info['hits']} vueltas, {info['status']}"
+            if info['status'] == 'compilado':
+                line += (f", {info['length']} cuadruplos, {info['entries']} entradas, "
+                         f"{info['iterations']} vueltas en traza")
+            elif info['status'] == 'rechazado':
+                line += f" ({info['reason']})"
+            print(line)
+        for event in stats['events']:
+            if event['event'] == 'compile':
+                print(f"  compilado {event['header']:03}-{event['edge']:03} "
+                      f"en {event['compile_ms']:.2f} ms")
+    
+    profile = vm.get_profile()
+    if profile is not None:
+        print("\n" + format_profile(profile))
+        path = options.get('profile')
+        if isinstance(path, str):
+            dump_profile(profile, path)
+            print(f"\nPerfil guardado en {path}")
+    
+    checkpoints = vm.get_checkpoint_stats()
+    if checkpoints is not None:
+        print("\nCheckpoints:")
+        if checkpoints['restores']:
+            print(f"  restaurado en {checkpoints['restore_ms']:.2f} ms")
+        if checkpoints['checkpoints']:
+            print(f"  {checkpoints['checkpoints']} guardados, {checkpoints['bytes']} bytes el ultimo, "
+                  f"{checkpoints['checkpoint_ms'] / checkpoints['checkpoints']:.2f} ms en promedio")
+    
+    recording = vm.get_record_stats()
+    if recording is not None:
+        print(f"\nEjecucion grabada en {recording['path']}: {recording['records']} cuadruplos, "
+              f"{recording['bytes']} bytes, {recording['flushes']} escrituras")
+    
+    samples = vm.get_samples()
+    if samples is not None:
+        total = sum(int(line.rsplit(' ', 1)[1]) for line in samples)
+        print(f"\nMuestras del stack de llamadas: {total}")
+        for line in samples[:5]:
+            print(f"  {line}")
+        path = options.get('sample')
+        if isinstance(path, str):
+            dump_collapsed(samples, path)
+            print(f"Muestras guardadas en {path}")
 
 
-def cmd_run(obj_path: str):
+def cmd_run(obj_path: str, options: dict = None):
     """Ejecuta un archivo .obj"""
     from .obj_generator import ObjGenerator
-    from .virtual_machine import VirtualMachine
     
+    options = options or {}
     obj_file = Path(obj_path)
     
     if not obj_file.exists():
@@ -92,25 +268,30 @@ def cmd_run(obj_path: str):
     print("-" * 30 + "\n")
     
     try:
-        obj_data = ObjGenerator.load(str(obj_file))
-        vm = VirtualMachine(obj_data)
-        output = vm.execute()
+        report = start_memory_report(options)
+        with measured(report, 'obj_load'):
+            obj_data = ObjGenerator.load(str(obj_file))
+        with measured(report, 'vm_load'):
+            vm = build_vm(obj_data, options)
+        output = run_vm(vm, options, report)
         
         # Salto de linea al final
         print("\n")
         print("-" * 30)
         print("Listo!")
+        print_vm_reports(vm, options)
+        print_memory_report(report, options)
         
     except Exception as e:
         print(f"\nError: {e}")
         sys.exit(1)
 
 
-def cmd_execute(source_path: str):
+def cmd_execute(source_path: str, options: dict = None):
     """Compila y ejecuta un .patito de un jalon"""
     from .patito_parser import parse_and_validate
-    from .virtual_machine import VirtualMachine
     
+    options = options or {}
     source_file = Path(source_path)
     
     if not source_file.exists():
@@ -124,9 +305,10 @@ def cmd_execute(source_path: str):
     src = source_file.read_text(encoding='utf-8')
     
     # Compilar
+    report = start_memory_report(options)
     print("\nCompilando... ", end="")
     try:
-        sdt = parse_and_validate(src)
+        sdt = report.compile(src) if report is not None else parse_and_validate(src)
         
         if sdt.has_errors():
             print("ERROR")
@@ -146,14 +328,18 @@ def cmd_execute(source_path: str):
     print("-" * 30 + "\n")
     
     try:
-        obj_data = sdt.to_obj()
-        vm = VirtualMachine(obj_data)
-        output = vm.execute()
+        with measured(report, 'to_obj'):
+            obj_data = sdt.to_obj()
+        with measured(report, 'vm_load'):
+            vm = build_vm(obj_data, options)
+        output = run_vm(vm, options, report)
         
         # Salto de linea al final para que se vea bien
         print("\n")
         print("-" * 30)
         print("Ejecucion terminada!")
+        print_vm_reports(vm, options)
+        print_memory_report(report, options)
         
     except Exception as e:
         print(f"\nError de ejecucion: {e}")
@@ -237,15 +423,87 @@ def print_usage():
 Compilador Patito - Ayuda
 
 Comandos:
-  patito compile <archivo.patito> [salida.obj]
+  patito compile <archivo.patito> [salida.obj] [--memory-report[=reporte.json]]
       Compila a .obj
 
-  patito run <archivo.obj>
+  patito run <archivo.obj> [opciones]
       Ejecuta un .obj
 
-  patito execute <archivo.patito>
+  patito execute <archivo.patito> [opciones]
       Compila y ejecuta directo
 
+  patito run-batch <directorio|manifiesto> [opciones]
+      Ejecuta todos los .obj del directorio (o los del manifiesto, uno por
+      linea) en un pool de procesos y escribe un registro JSON por corrida
+        --jobs=N          Procesos (default: todos los nucleos)
+        --timeout=S       Segundos por corrida (default 10)
+        --max-quads=N     Presupuesto de cuadruplos por corrida
+        --repeat=N        Corridas de cada programa (default 1)
+        --cache=N         Programas cargados por proceso (default 64)
+        --out=archivo     Resultados JSONL (default batch_results.jsonl)
+
+  patito worker-pool [opciones]
+      Servidor de ejecucion: lee pedidos JSONL de stdin (o de un socket
+      Unix) como {"id": 1, "obj": "x.obj"} o {"id": 2, "source": "..."},
+      los corre en procesos que ya cargaron la VM y responde un registro
+      JSON por pedido. {"cmd": "stats"} regresa las estadisticas; al
+      terminar se imprimen en stderr
+        --workers=N       Procesos (default: todos los nucleos)
+        --socket=ruta     Escucha en un socket Unix en vez de stdin
+        --cache=N         Programas decodificados por proceso (default 64)
+        --timeout=S       Segundos por corrida (default 10)
+        --max-quads=N     Presupuesto de cuadruplos por corrida
+
+  patito run-lanes <archivo.obj> --inputs=entradas.csv [opciones]
+      Corre el programa una vez por fila de entradas, todas a la vez en
+      carriles vectoriales (necesita NumPy). Cada fila trae las globales
+      iniciales de su carril: CSV con encabezado de nombres de globales
+      (o direcciones), o .npy estructurado o 2D. Escribe un registro JSON
+      por carril con su salida y sus globales al terminar
+        --inputs=archivo  Entradas .csv o .npy
+        --max-quads=N     Presupuesto de cuadruplos por carril
+        --max-depth=N     Maximo de llamadas activas por carril
+        --out=archivo     Resultados JSONL (default lanes_results.jsonl)
+
+  patito trace-dump <archivo> [opciones]
+      Muestra la traza binaria de una corrida con --record-trace: un
+      cuadruplo por linea con su profundidad de llamadas, su funcion, los
+      valores de sus operandos y el resultado
+        --function=nombre Solo los cuadruplos de esa funcion (o main)
+        --ip=N[-M]        Solo los cuadruplos N a M
+        --limit=N         Muestra a lo mas N registros
+        --last            Con --limit, los ultimos N en vez de los primeros
+
+Opciones de run / execute:
+  --engine=interp|threaded|pyjit|numpy
+                                   Motor de ejecucion (numpy: memoria tipada
+                                   int64 / float64, necesita NumPy; pyjit:
+                                   recursion de a lo mas 20000 llamadas)
+  --overflow=error|wrap            Desbordamiento con --engine=numpy: error
+                                   (default) o complemento a dos
+  --hot-loops=N                    Traza ciclos calientes (motor interp)
+  --output=archivo                 Escribe la salida del programa al archivo
+  --max-depth=N                    Maximo de llamadas activas (default 1000000)
+  --profile[=perfil.json]          Reporte de funciones, opcodes y cuadruplos
+                                   calientes (y el perfil en JSON)
+  --sample=perfil.folded           Muestrea el stack de llamadas (formato
+                                   collapsed de flamegraph)
+  --sample-rate=N                  Muestras por segundo (default 1000)
+  --max-quads=N                    Detiene el programa despues de N cuadruplos
+  --time-limit=S                   Detiene el programa despues de S segundos
+  --checkpoint=archivo             Guarda el estado de la corrida cada N
+                                   cuadruplos (motor interp)
+  --checkpoint-every=N             Cuadruplos entre checkpoints (default 1000000)
+  --restore=archivo                Sigue desde un checkpoint
+  --memory-report[=reporte.json]   Memoria por fase (tracemalloc), por
+                                   estructura del compilador y por frame de
+                                   cada funcion, con la profundidad maxima
+                                   de llamadas (y el reporte en JSON).
+                                   Tambien con compile
+  --record-trace=archivo           Graba cada cuadruplo ejecutado (ip,
+                                   opcode, valores, profundidad) en binario
+                                   (motores interp y threaded)
+
   patito <archivo.patito>
       Muestra analisis (cuadruplos, tablas, etc)
 
@@ -255,10 +513,174 @@ Comandos:
 Ejemplos:
   patito compile mi_programa.patito
   patito run mi_programa.obj
+  patito run mi_programa.obj --engine=pyjit
   patito execute mi_programa.patito
+  patito run mi_programa.obj --record-trace=corrida.ptrace
+  patito trace-dump corrida.ptrace --function=fibonacci --limit=20
 """)
 
 
+def cmd_run_batch(source: str, options: dict = None):
+    """Ejecuta un lote de .obj en varios procesos"""
+    from .batch_runner import run_batch, DEFAULT_CACHE_SIZE
+    
+    options = options or {}
+    output_path = options.get('out', 'batch_results.jsonl')
+    
+    print_header("Patito - Ejecucion por lotes")
+    print(f"\nProgramas: {source}")
+    print(f"Resultados: {output_path}")
+    
+    try:
+        summary = run_batch(
+            source, output_path,
+            jobs=int(options['jobs']) if 'jobs' in options else None,
+            repeat=int(options.get('repeat', 1)),
+            timeout=float(options.get('timeout', 10)),
+            max_quads=int(options['max-quads']) if 'max-quads' in options else None,
+            cache_size=int(options.get('cache', DEFAULT_CACHE_SIZE)),
+        )
+    except Exception as e:
+        print(f"\nError: {e}")
+        sys.exit(1)
+    
+    print(f"\nCorridas:   {summary['runs']}")
+    print(f"  OK:       {summary['ok']}")
+    print(f"  Errores:  {summary['errors']}")
+    print(f"  Limite:   {summary['timeouts']}")
+    print(f"  Sin cargar: {summary['load_errors']}")
+    print(f"Cuadruplos: {summary['quads']} ({summary['quads_per_sec'] / 1e6:.2f} M/s)")
+    print(f"Tiempo:     {summary['wall_time']:.2f} s")
+    if summary['runs'] != summary['ok']:
+        sys.exit(1)
+
+
+def cmd_run_lanes(obj_path: str, options: dict = None):
+    """Ejecuta un .obj sobre muchas entradas en carriles vectoriales"""
+    import json
+    import time
+    from .obj_generator import ObjGenerator
+    from .frame_layout import DEFAULT_MAX_DEPTH
+    from .vm_lanes import LaneMachine, load_inputs, input_lanes
+    
+    options = options or {}
+    output_path = options.get('out', 'lanes_results.jsonl')
+    if 'inputs' not in options:
+        print("Error: Falta --inputs=<archivo.csv|archivo.npy>")
+        sys.exit(1)
+    
+    print_header("Patito - Ejecucion por carriles")
+    print(f"\nPrograma:   {obj_path}")
+    print(f"Entradas:   {options['inputs']}")
+    print(f"Resultados: {output_path}")
+    
+    try:
+        obj_data = ObjGenerator.load(obj_path)
+        inputs = load_inputs(options['inputs'], obj_data.get('globals', {}))
+        machine = LaneMachine(
+            obj_data, input_lanes(inputs),
+            max_depth=int(options.get('max-depth', DEFAULT_MAX_DEPTH)),
+            max_quads=int(options['max-quads']) if 'max-quads' in options else None,
+        )
+        started = time.perf_counter()
+        records = machine.run(inputs)
+        elapsed = time.perf_counter() - started
+    except Exception as e:
+        print(f"\nError: {e}")
+        sys.exit(1)
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    
+    quads = sum(record['quads'] for record in records)
+    ok = sum(record['status'] == 'ok' for record in records)
+    print(f"\nCarriles:   {machine.lanes}")
+    print(f"  OK:       {ok}")
+    print(f"  Errores:  {sum(record['status'] == 'error' for record in records)}")
+    print(f"  Limite:   {sum(record['status'] == 'timeout' for record in records)}")
+    print(f"Cuadruplos: {quads} en {machine.steps} pasos "
+          f"(ocupacion {quads / max(1, machine.steps * machine.lanes):.0%})")
+    print(f"Tiempo:     {elapsed:.2f} s")
+    if ok != machine.lanes:
+        sys.exit(1)
+
+
+def cmd_trace_dump(trace_path: str, options: dict = None):
+    """Muestra una traza grabada con --record-trace"""
+    from collections import deque
+    from itertools import islice
+    from .vm_record import TraceReader, parse_ip_range
+    
+    options = options or {}
+    try:
+        reader = TraceReader(trace_path)
+        ip_range = parse_ip_range(options['ip']) if 'ip' in options else None
+        records = reader.read(function=options.get('function'), ip_range=ip_range)
+        limit = int(options['limit']) if 'limit' in options else None
+        if limit is not None:
+            records = deque(records, maxlen=limit) if 'last' in options else islice(records, limit)
+        
+        print(f"Traza de {reader.header['program']}: {reader.records} cuadruplos grabados")
+        print(f"{'ip':>6} {'prof':>4} {'funcion':<14} {'opcode':<8} valores")
+        shown = 0
+        for record in records:
+            print(reader.format_record(record))
+            shown += 1
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"\n{shown} registros mostrados")
+
+
+def cmd_worker_pool(options: dict = None):
+    """Servidor de ejecucion con procesos calientes"""
+    import asyncio
+    from .worker_pool import WorkerPool, DEFAULT_CACHE_SIZE, serve_stdin, serve_unix, format_stats
+    
+    options = options or {}
+    try:
+        pool = WorkerPool(
+            workers=int(options['workers']) if 'workers' in options else None,
+            cache_size=int(options.get('cache', DEFAULT_CACHE_SIZE)),
+            timeout=float(options.get('timeout', 10)),
+            max_quads=int(options['max-quads']) if 'max-quads' in options else None,
+        )
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    
+    # stdout es para las respuestas: los mensajes van a stderr
+    pool.start()
+    print(f"Patito worker-pool: {pool.size} procesos listos", file=sys.stderr)
+    try:
+        if 'socket' in options:
+            print(f"Escuchando en {options['socket']}", file=sys.stderr)
+            asyncio.run(serve_unix(pool, options['socket']))
+        else:
+            asyncio.run(serve_stdin(pool))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pool.close()
+        print(format_stats(pool.stats()), file=sys.stderr)
+
+
+def split_options(args):
+    """Separa las opciones --nombre=valor (o --nombre solo) de los argumentos posicionales"""
+    options = {}
+    positional = []
+    for arg in args:
+        if arg.startswith('--') and '=' in arg:
+            name, value = arg[2:].split('=', 1)
+            options[name] = value
+        elif arg.startswith('--') and len(arg) > 2:
+            options[arg[2:]] = True
+        else:
+            positional.append(arg)
+    return positional, options
+
+
 def main():
     """Main del CLI"""
     args = sys.argv[1:]
@@ -271,27 +693,53 @@ def main():
         print_usage()
         return
     
+    args, options = split_options(args)
+    
     if args[0] == 'compile':
         if len(args) < 2:
             print("Error: Falta el archivo")
             print("Uso: patito compile <archivo.patito>")
             sys.exit(1)
         output = args[2] if len(args) > 2 else None
-        cmd_compile(args[1], output)
+        cmd_compile(args[1], output, options)
     
     elif args[0] == 'run':
         if len(args) < 2:
             print("Error: Falta el archivo .obj")
             print("Uso: patito run <archivo.obj>")
             sys.exit(1)
-        cmd_run(args[1])
+        cmd_run(args[1], options)
     
     elif args[0] == 'execute':
         if len(args) < 2:
             print("Error: Falta el archivo")
             print("Uso: patito execute <archivo.patito>")
             sys.exit(1)
-        cmd_execute(args[1])
+        cmd_execute(args[1], options)
+    
+    elif args[0] == 'run-batch':
+        if len(args) < 2:
+            print("Error: Falta el directorio o manifiesto")
+            print("Uso: patito run-batch <directorio|manifiesto>")
+            sys.exit(1)
+        cmd_run_batch(args[1], options)
+    
+    elif args[0] == 'run-lanes':
+        if len(args) < 2:
+            print("Error: Falta el archivo .obj")
+            print("Uso: patito run-lanes <archivo.obj> --inputs=<entradas.csv>")
+            sys.exit(1)
+        cmd_run_lanes(args[1], options)
+    
+    elif args[0] == 'trace-dump':
+        if len(args) < 2:
+            print("Error: Falta el archivo de la traza")
+            print("Uso: patito trace-dump <archivo> [--function=nombre] [--ip=N-M]")
+            sys.exit(1)
+        cmd_trace_dump(args[1], options)
+    
+    elif args[0] == 'worker-pool':
+        cmd_worker_pool(options)
     
     else:
         # Si no es un comando, asumo que es un archivo
@@ -87,7 +87,8 @@ class PatitoSDT:
         Exporta los datos necesarios para el archivo .obj.
         
         Returns:
-            dict: Diccionario con cuádruplos, constantes y funciones
+            dict: Diccionario con cuádruplos, constantes, funciones y
+                  globales declaradas (nombre -> dirección)
         """
         # Convertir cuádruplos a formato serializable
         quads_list = []
@@ -101,11 +102,18 @@ class PatitoSDT:
             if isinstance(addr, int):
                 constants[addr] = value
         
+        # Globales declaradas en el programa (sin las de retorno de funciones)
+        global_vars = {}
+        for name, info in self.var_table.global_vars.items():
+            if not name.startswith('_return_') and info.address is not None:
+                global_vars[name] = info.address
+        
         return {
             'program_name': self.program_name,
             'quadruples': quads_list,
             'constants': constants,
-            'functions': self.func_dir.to_dict()
+            'functions': self.func_dir.to_dict(),
+            'globals': global_vars
         }
 
 
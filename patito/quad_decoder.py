@@ -0,0 +1,220 @@
+"""
+Decodificador de Cuádruplos para la Máquina Virtual Patito
+
+Convierte los cuádruplos del .obj (opcode string + direcciones virtuales)
+a instrucciones que la VM puede ejecutar sin volver a interpretarlas:
+- El opcode pasa a ser un entero (OP_*)
+- Cada dirección pasa a ser (índice de segmento, offset dentro del segmento)
+
+Todas las instrucciones tienen la misma forma para desempacarlas de un jalón:
+
+    (op, a, b, c, d, e, f)
+
+- Operaciones binarias:   a, b = operando 1    c, d = operando 2    e, f = resultado
+- Asignación:             a, b = origen                             e, f = destino
+- GOTO:                                                             f = destino
+- GOTOF:                  a, b = condición                          f = destino
+- PRINT:                  a, b = valor
+- PRINT_STR:              a = texto
+- ERA:                    a = nombre de la función
+- PARAM:                  a, b = argumento                          f = número de parámetro
+- GOSUB:                  a = nombre de la función                  f = quad_start
+- RETURN:                 a, b = valor                              e, f = variable de retorno
+- ERROR:                  a = mensaje (el cuádruplo no se puede ejecutar)
+- LOOP:                                                             f = destino
+  (GOTO hacia atrás; no lo produce decode(), la VM lo marca así cuando
+  tiene activas las trazas de ciclos calientes, ver vm_trace)
+
+Superinstrucciones (tampoco las produce decode(); ver vm_superinstructions):
+- CALL:                   a = CallPlan    b = ((seg, off, posición), ...)
+                          c = cuádruplos fusionados - 1             f = quad_start
+- PLUS_SET / MINUS_SET / MUL_SET:
+                          a, b = operando 1    c, d = operando 2    e, f = variable
+- LT_JUMP / GT_JUMP / NEQ_JUMP:
+                          a, b = operando 1    c, d = operando 2    f = destino si es falso
+- BRANCH:                 a, b = condición    e = destino si es cierta    f = si es falsa
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from .memory_map import MemoryMap
+
+# Opcodes enteros. El orden no importa para la VM, solo que sean únicos.
+OP_ASSIGN = 0
+OP_PLUS = 1
+OP_MINUS = 2
+OP_MUL = 3
+OP_DIV = 4
+OP_DIV_II = 5
+OP_DIV_FF = 6
+OP_GT = 7
+OP_LT = 8
+OP_NEQ = 9
+OP_GOTO = 10
+OP_GOTOF = 11
+OP_PRINT = 12
+OP_PRINT_STR = 13
+OP_ERA = 14
+OP_PARAM = 15
+OP_GOSUB = 16
+OP_RETURN = 17
+OP_ENDFUNC = 18
+OP_END = 19
+OP_ERROR = 20
+OP_LOOP = 21
+OP_CALL = 22
+OP_PLUS_SET = 23
+OP_MINUS_SET = 24
+OP_MUL_SET = 25
+OP_LT_JUMP = 26
+OP_GT_JUMP = 27
+OP_NEQ_JUMP = 28
+OP_BRANCH = 29
+
+OPCODES = {
+    '=': OP_ASSIGN,
+    'PLUS': OP_PLUS,
+    'MINUS': OP_MINUS,
+    'MUL': OP_MUL,
+    'DIV': OP_DIV,
+    'DIV_II': OP_DIV_II,
+    'DIV_FF': OP_DIV_FF,
+    'GT': OP_GT,
+    'LT': OP_LT,
+    'NEQ': OP_NEQ,
+    'GOTO': OP_GOTO,
+    'GOTOF': OP_GOTOF,
+    'PRINT': OP_PRINT,
+    'ERA': OP_ERA,
+    'PARAM': OP_PARAM,
+    'GOSUB': OP_GOSUB,
+    'RETURN': OP_RETURN,
+    'ENDFUNC': OP_ENDFUNC,
+    'END': OP_END,
+}
+
+OPCODE_NAMES = {code: name for name, code in OPCODES.items()}
+OPCODE_NAMES[OP_PRINT_STR] = 'PRINT'
+OPCODE_NAMES[OP_ERROR] = 'ERROR'
+OPCODE_NAMES[OP_LOOP] = 'LOOP'
+OPCODE_NAMES[OP_CALL] = 'CALL'
+OPCODE_NAMES[OP_PLUS_SET] = 'PLUS_SET'
+OPCODE_NAMES[OP_MINUS_SET] = 'MINUS_SET'
+OPCODE_NAMES[OP_MUL_SET] = 'MUL_SET'
+OPCODE_NAMES[OP_LT_JUMP] = 'LT_JUMP'
+OPCODE_NAMES[OP_GT_JUMP] = 'GT_JUMP'
+OPCODE_NAMES[OP_NEQ_JUMP] = 'NEQ_JUMP'
+OPCODE_NAMES[OP_BRANCH] = 'BRANCH'
+
+BINARY_OPS = ('PLUS', 'MINUS', 'MUL', 'DIV', 'DIV_II', 'DIV_FF', 'GT', 'LT', 'NEQ')
+
+Instruction = Tuple[int, Any, Any, Any, Any, Any, Any]
+
+
+class DecodeError(ValueError):
+    """Un operando del cuádruplo no es una dirección válida."""
+
+
+def resolve_operand(address: Any, constants: Dict[int, Any], writable: bool = False) -> Tuple[int, int]:
+    """
+    Convierte una dirección virtual en (índice de segmento, offset).
+
+    Toda la validación de direcciones se hace aquí, al cargar; la VM ya no
+    revisa rangos al ejecutar.
+
+    Args:
+        address: Dirección virtual
+        constants: {dirección: valor} de constantes, para validar lecturas
+        writable: True si el operando es destino de una escritura
+
+    Returns:
+        tuple: (address // 1000, address % 1000)
+    """
+    try:
+        descriptor = MemoryMap.resolve(address)
+    except ValueError as e:
+        raise DecodeError(str(e)) from None
+    if descriptor.scope == 'constant':
+        if writable:
+            raise DecodeError(f"No se puede escribir en memoria de constantes: {address}")
+        if address not in constants:
+            raise DecodeError(f"Constante {address} no encontrada")
+    return descriptor.segment, descriptor.slot
+
+
+def decode_quad(quad, constants: Dict[int, Any]) -> Instruction:
+    """Decodifica un cuádruplo. Si no se puede, regresa una instrucción ERROR."""
+    op, arg1, arg2, result = quad
+
+    try:
+        if op in BINARY_OPS:
+            s1, o1 = resolve_operand(arg1, constants)
+            s2, o2 = resolve_operand(arg2, constants)
+            sr, orr = resolve_operand(result, constants, writable=True)
+            return (OPCODES[op], s1, o1, s2, o2, sr, orr)
+
+        if op == '=':
+            s1, o1 = resolve_operand(arg1, constants)
+            sr, orr = resolve_operand(result, constants, writable=True)
+            return (OP_ASSIGN, s1, o1, 0, 0, sr, orr)
+
+        if op == 'GOTO':
+            return (OP_GOTO, 0, 0, 0, 0, 0, result)
+
+        if op == 'GOTOF':
+            s1, o1 = resolve_operand(arg1, constants)
+            return (OP_GOTOF, s1, o1, 0, 0, 0, result)
+
+        if op == 'PRINT':
+            if isinstance(arg1, str):
+                return (OP_PRINT_STR, arg1, 0, 0, 0, 0, 0)
+            s1, o1 = resolve_operand(arg1, constants)
+            return (OP_PRINT, s1, o1, 0, 0, 0, 0)
+
+        if op == 'ERA':
+            return (OP_ERA, arg1, 0, 0, 0, 0, 0)
+
+        if op == 'PARAM':
+            s1, o1 = resolve_operand(arg1, constants)
+            return (OP_PARAM, s1, o1, 0, 0, 0, result)
+
+        if op == 'GOSUB':
+            return (OP_GOSUB, arg1, 0, 0, 0, 0, result)
+
+        if op == 'RETURN':
+            s1, o1 = resolve_operand(arg1, constants)
+            if result is None:
+                return (OP_RETURN, s1, o1, 0, 0, None, None)
+            sr, orr = resolve_operand(result, constants, writable=True)
+            return (OP_RETURN, s1, o1, 0, 0, sr, orr)
+
+        if op == 'ENDFUNC':
+            return (OP_ENDFUNC, 0, 0, 0, 0, 0, 0)
+
+        if op == 'END':
+            return (OP_END, 0, 0, 0, 0, 0, 0)
+
+    except DecodeError as e:
+        return (OP_ERROR, str(e), 0, 0, 0, 0, 0)
+
+    return (OP_ERROR, f"Operación desconocida: {op}", 0, 0, 0, 0, 0)
+
+
+def decode(quadruples: List, constants: Dict[int, Any]) -> List[Instruction]:
+    """
+    Decodifica todos los cuádruplos del programa.
+
+    Al final se agrega un END de guardia, para que caer después del último
+    cuádruplo termine el programa igual que antes.
+
+    Returns:
+        list: Instrucciones decodificadas (len(quadruples) + 1)
+    """
+    code = [decode_quad(quad, constants) for quad in quadruples]
+    code.append((OP_END, 0, 0, 0, 0, 0, 0))
+    return code
+
+
+def opcode_name(opcode: int) -> Optional[str]:
+    """Nombre del opcode entero (para debugging y reportes)."""
+    return OPCODE_NAMES.get(opcode)
@@ -0,0 +1,395 @@
+"""
+Análisis de Rangos y Tipos sobre Cuádruplos
+
+Análisis de flujo de datos (intraprocedural) que calcula, para cada cuádruplo,
+el tipo exacto en tiempo de ejecución (int / float) y un intervalo de valores
+de cada dirección de memoria.
+
+Se usa para especializar las divisiones:
+- DIV_II: ambos operandos son int y el divisor es distinto de cero (//)
+- DIV_FF: al menos un operando es float y el divisor es distinto de cero (/)
+
+Donde no se puede probar nada se deja el DIV normal (con sus checks).
+
+El análisis es intraprocedural, así que specialize_divisions() solo analiza
+las regiones (main o una función) que tienen algún DIV, y se salta las de
+más de MAX_REGION_QUADS cuádruplos: el costo de cargar un programa grande
+queda acotado y esas divisiones simplemente no se especializan.
+
+Nota: el tipo que importa es el del valor en Python, no el de la variable.
+Una variable float a la que se le asigna un int guarda un int, y una celda
+sin inicializar vale 0 (int); el análisis respeta eso.
+"""
+
+import heapq
+from typing import Any, Dict, List, Optional, Tuple
+
+from .memory_map import MemoryMap
+
+INF = float('inf')
+
+# Valor abstracto: (tipo, minimo, maximo). tipo None = desconocido
+AbstractValue = Tuple[Optional[str], float, float]
+
+TOP: AbstractValue = (None, -INF, INF)
+ZERO_INT: AbstractValue = ('int', 0, 0)
+BOOL_INT: AbstractValue = ('int', 0, 1)
+
+ARITHMETIC_OPS = ('PLUS', 'MINUS', 'MUL', 'DIV')
+RELATIONAL_OPS = ('GT', 'LT', 'NEQ')
+
+# Después de cuántas visitas a un cuádruplo se ensanchan los intervalos
+WIDEN_AFTER = 3
+
+# Regiones más largas que esto no se analizan al especializar divisiones
+MAX_REGION_QUADS = 2000
+
+
+class _State:
+    """
+    Estado abstracto de la memoria en un punto del programa.
+
+    - values: {dirección: valor abstracto}
+    - globals_known: si es False, las globales que no estén en values son TOP
+      (p.ej. al entrar a una función o después de un GOSUB). Si es True
+      valen 0 (inicio del programa).
+
+    Locales y temporales que no estén en values valen 0, porque cada
+    registro de activación empieza vacío.
+    """
+
+    __slots__ = ('values', 'globals_known')
+
+    def __init__(self, values=None, globals_known=True):
+        self.values: Dict[int, AbstractValue] = values if values is not None else {}
+        self.globals_known = globals_known
+
+    def copy(self):
+        return _State(dict(self.values), self.globals_known)
+
+    def default(self, address: int) -> AbstractValue:
+        if MemoryMap.get_segment(address) == 'global' and not self.globals_known:
+            return TOP
+        return ZERO_INT
+
+    def get(self, address: int) -> AbstractValue:
+        value = self.values.get(address)
+        return value if value is not None else self.default(address)
+
+    def havoc_globals(self):
+        """Olvida todo lo que se sabe de las globales (una llamada puede cambiarlas)."""
+        self.values = {
+            addr: val for addr, val in self.values.items()
+            if MemoryMap.get_segment(addr) != 'global'
+        }
+        self.globals_known = False
+
+
+def _join_value(a: AbstractValue, b: AbstractValue) -> AbstractValue:
+    tipo = a[0] if a[0] == b[0] else None
+    return (tipo, min(a[1], b[1]), max(a[2], b[2]))
+
+
+def _widen_value(old: AbstractValue, new: AbstractValue) -> AbstractValue:
+    tipo = old[0] if old[0] == new[0] else None
+    lo = old[1] if new[1] >= old[1] else -INF
+    hi = old[2] if new[2] <= old[2] else INF
+    return (tipo, lo, hi)
+
+
+def _merge(old: Optional[_State], new: _State, widen: bool) -> Tuple[_State, bool]:
+    """
+    Une new dentro de old. Retorna (estado, cambió).
+
+    Los estados guardados nunca se modifican (_transfer copia antes de
+    escribir), así que la primera visita puede compartir new sin copiarlo.
+    """
+    if old is None:
+        return new, True
+    if new is old:
+        return old, False
+
+    globals_known = old.globals_known and new.globals_known
+    changed = globals_known != old.globals_known
+    values = dict(old.values)
+    # Solo cambian las direcciones donde old y new difieren
+    for addr, b in new.values.items():
+        a = old.get(addr)
+        if a == b:
+            continue
+        joined = _join_value(a, b)
+        if widen:
+            joined = _widen_value(a, joined)
+        if joined != a:
+            values[addr] = joined
+            changed = True
+    for addr in old.values.keys() - new.values.keys():
+        a = old.values[addr]
+        joined = _join_value(a, new.default(addr))
+        if widen:
+            joined = _widen_value(a, joined)
+        if joined != a:
+            values[addr] = joined
+            changed = True
+
+    if not changed:
+        return old, False
+    return _State(values, globals_known), True
+
+
+def _result_type(t1: Optional[str], t2: Optional[str]) -> Optional[str]:
+    """Tipo del valor Python resultante de una operación aritmética."""
+    if t1 == 'float' or t2 == 'float':
+        return 'float'
+    if t1 == 'int' and t2 == 'int':
+        return 'int'
+    return None
+
+
+def _safe(value: float, fallback: float) -> float:
+    # inf - inf da nan; en ese caso el límite no se conoce
+    return fallback if value != value else value
+
+
+def _mul(a: float, b: float) -> float:
+    # En aritmética de intervalos 0 * inf = 0
+    if a == 0 or b == 0:
+        return 0
+    return a * b
+
+
+def _interval(op: str, v1: AbstractValue, v2: AbstractValue) -> Tuple[float, float]:
+    l1, h1 = v1[1], v1[2]
+    l2, h2 = v2[1], v2[2]
+
+    if op == 'PLUS':
+        return _safe(l1 + l2, -INF), _safe(h1 + h2, INF)
+    if op == 'MINUS':
+        return _safe(l1 - h2, -INF), _safe(h1 - l2, INF)
+    if op == 'MUL':
+        products = [_mul(l1, l2), _mul(l1, h2), _mul(h1, l2), _mul(h1, h2)]
+        return min(products), max(products)
+    # DIV: no se intenta acotar
+    return -INF, INF
+
+
+def is_nonzero(value: AbstractValue) -> bool:
+    """True si el intervalo excluye al cero."""
+    return value[1] > 0 or value[2] < 0
+
+
+class RangeAnalysis:
+    """
+    Análisis de rangos y tipos sobre la lista de cuádruplos.
+
+    Uso:
+        analysis = RangeAnalysis(quadruples, constants, functions)
+        analysis.run()
+        analysis.value_before(i, address)
+
+    Con only_divisions=True solo se analizan las regiones con algún DIV y
+    de a lo más max_region_quads cuádruplos; en las demás value_before()
+    regresa None, como en código inalcanzable.
+    """
+
+    def __init__(self, quadruples: List, constants: Dict[int, Any], functions: Dict[str, dict],
+                 only_divisions: bool = False, max_region_quads: int = MAX_REGION_QUADS):
+        self.quadruples = quadruples
+        self.constants = constants
+        self.functions = functions
+        self.only_divisions = only_divisions
+        self.max_region_quads = max_region_quads
+        # Estado a la entrada de cada cuádruplo (None = inalcanzable)
+        self.states: List[Optional[_State]] = [None] * len(quadruples)
+
+    def _worth_analyzing(self, start: int, terminator: str) -> bool:
+        """True si la región que empieza en start tiene un DIV y cabe en el límite."""
+        if not self.only_divisions:
+            return True
+        has_division = False
+        index = start
+        while index < len(self.quadruples):
+            op = self.quadruples[index][0]
+            has_division = has_division or op == 'DIV'
+            if op == terminator:
+                break
+            index += 1
+        return has_division and index - start < self.max_region_quads
+
+    def _entry_states(self) -> List[Tuple[int, _State]]:
+        entries = []
+        first = self.quadruples[0] if self.quadruples else None
+        main_start = first[3] if first and first[0] == 'GOTO' and isinstance(first[3], int) else 0
+        if self._worth_analyzing(main_start, 'END'):
+            entries.append((0, _State({}, globals_known=True)))
+
+        for func_info in self.functions.values():
+            quad_start = func_info.get('quad_start')
+            if quad_start is None or not (0 <= quad_start < len(self.quadruples)):
+                continue
+            if not self._worth_analyzing(quad_start, 'ENDFUNC'):
+                continue
+            # Parámetros: vienen del llamador, no se sabe nada
+            state = _State({}, globals_known=False)
+            int_offset = 0
+            float_offset = 0
+            for param in func_info.get('params', []):
+                if param.get('type', 'int') == 'int':
+                    state.values[3000 + int_offset] = TOP
+                    int_offset += 1
+                else:
+                    state.values[4000 + float_offset] = TOP
+                    float_offset += 1
+            entries.append((quad_start, state))
+
+        return entries
+
+    def _read(self, state: _State, address: Any) -> AbstractValue:
+        if not isinstance(address, int):
+            return TOP
+        try:
+            segment = MemoryMap.get_segment(address)
+        except ValueError:
+            return TOP
+        if segment == 'constant':
+            if address not in self.constants:
+                return TOP
+            value = self.constants[address]
+            tipo = 'float' if isinstance(value, float) else 'int'
+            return (tipo, value, value)
+        return state.get(address)
+
+    def _write(self, state: _State, address: Any, value: AbstractValue):
+        if isinstance(address, int):
+            state.values[address] = value
+
+    def _transfer(self, index: int, state: _State) -> List[Tuple[int, _State]]:
+        """Aplica el cuádruplo y regresa [(sucesor, estado)]."""
+        op, arg1, arg2, result = self.quadruples[index]
+        nxt = index + 1
+
+        if op in ARITHMETIC_OPS or op in ('DIV_II', 'DIV_FF'):
+            out = state.copy()
+            if arg2 is None:
+                # Operador unario
+                self._write(out, result, TOP)
+            else:
+                v1 = self._read(state, arg1)
+                v2 = self._read(state, arg2)
+                base_op = 'DIV' if op.startswith('DIV') else op
+                lo, hi = _interval(base_op, v1, v2)
+                self._write(out, result, (_result_type(v1[0], v2[0]), lo, hi))
+            return [(nxt, out)]
+
+        if op in RELATIONAL_OPS:
+            out = state.copy()
+            self._write(out, result, BOOL_INT)
+            return [(nxt, out)]
+
+        if op == '=':
+            out = state.copy()
+            self._write(out, result, self._read(state, arg1))
+            return [(nxt, out)]
+
+        if op == 'GOTO':
+            return [(result, state)] if isinstance(result, int) else []
+
+        if op == 'GOTOF':
+            succ = [(nxt, state)]
+            if isinstance(result, int):
+                succ.append((result, state))
+            return succ
+
+        if op == 'GOSUB':
+            out = state.copy()
+            out.havoc_globals()
+            return [(nxt, out)]
+
+        if op in ('RETURN', 'ENDFUNC', 'END'):
+            return []
+
+        # PRINT, ERA, PARAM: no cambian la memoria del contexto actual
+        return [(nxt, state)]
+
+    def run(self):
+        """
+        Itera hasta punto fijo (con ensanchamiento en ciclos).
+
+        La lista de trabajo se procesa en orden de cuádruplo: así un punto
+        de unión (el fin de un if/else) se visita ya con los estados de
+        todas sus ramas y no se vuelve a propagar el resto de la función
+        una vez por rama.
+        """
+        visits = [0] * len(self.quadruples)
+        worklist = []
+        pending = set()
+
+        for index, state in self._entry_states():
+            merged, changed = _merge(self.states[index], state, widen=False)
+            if changed:
+                self.states[index] = merged
+                if index not in pending:
+                    pending.add(index)
+                    heapq.heappush(worklist, index)
+
+        while worklist:
+            index = heapq.heappop(worklist)
+            pending.discard(index)
+            state = self.states[index]
+            for succ, out in self._transfer(index, state):
+                if not (0 <= succ < len(self.quadruples)):
+                    continue
+                visits[succ] += 1
+                merged, changed = _merge(self.states[succ], out, widen=visits[succ] > WIDEN_AFTER)
+                if changed:
+                    self.states[succ] = merged
+                    if succ not in pending:
+                        pending.add(succ)
+                        heapq.heappush(worklist, succ)
+
+        return self
+
+    def value_before(self, index: int, address: Any) -> Optional[AbstractValue]:
+        """Valor abstracto de una dirección justo antes del cuádruplo index."""
+        state = self.states[index]
+        if state is None:
+            return None
+        return self._read(state, address)
+
+
+def specialize_divisions(quadruples: List, constants: Dict[int, Any],
+                         functions: Dict[str, dict]) -> List:
+    """
+    Regresa una copia de los cuádruplos donde cada DIV que se pueda probar
+    seguro se cambia por DIV_II o DIV_FF.
+
+    Args:
+        quadruples: Cuádruplos del programa
+        constants: {dirección: valor} de constantes
+        functions: Directorio de funciones del .obj
+
+    Returns:
+        list: Cuádruplos especializados
+    """
+    if not any(quad[0] == 'DIV' for quad in quadruples):
+        return list(quadruples)
+
+    analysis = RangeAnalysis(quadruples, constants, functions, only_divisions=True).run()
+    specialized = list(quadruples)
+
+    for index, quad in enumerate(quadruples):
+        op, arg1, arg2, result = quad
+        if op != 'DIV' or arg2 is None:
+            continue
+        v1 = analysis.value_before(index, arg1)
+        v2 = analysis.value_before(index, arg2)
+        if v1 is None or v2 is None or not is_nonzero(v2):
+            continue
+
+        tipo = _result_type(v1[0], v2[0])
+        if tipo == 'int':
+            specialized[index] = ('DIV_II', arg1, arg2, result)
+        elif tipo == 'float':
+            specialized[index] = ('DIV_FF', arg1, arg2, result)
+
+    return specialized
@@ -2,42 +2,110 @@
 Máquina Virtual para el Compilador Patito
 
 Ejecuta programas compilados (.obj) utilizando:
-- Memoria de ejecución con diccionarios (dirección -> valor)
+- Memoria de ejecución con segmentos en listas planas (dirección - base)
 - Stack de activación para funciones y recursión
 - Soporte completo para expresiones, control de flujo y funciones
 """
 
-from typing import Dict, Any, List, Optional, Tuple
+import os
+import sys
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple, Union
 
+from .memory_map import MemoryMap, SEGMENT_SIZE
+from .output_sink import OutputSink, BufferedSink, stream_execution
+from .frame_layout import (
+    FrameLayout, CallPlan, CallDepthError, FRAME, FRAME_SEGMENTS, FREE_LIST_LIMIT, DEFAULT_MAX_DEPTH,
+    code_regions, flatten_frame_operands, bind_call_plans,
+)
+from .range_analysis import specialize_divisions
+from .quad_decoder import (
+    decode,
+    OP_ASSIGN, OP_PLUS, OP_MINUS, OP_MUL, OP_DIV, OP_DIV_II, OP_DIV_FF,
+    OP_GT, OP_LT, OP_NEQ, OP_GOTO, OP_GOTOF, OP_PRINT, OP_PRINT_STR,
+    OP_ERA, OP_PARAM, OP_GOSUB, OP_RETURN, OP_ENDFUNC, OP_END, OP_LOOP,
+    OP_CALL, OP_PLUS_SET, OP_MINUS_SET, OP_MUL_SET, OP_LT_JUMP, OP_GT_JUMP,
+    OP_NEQ_JUMP, OP_BRANCH,
+)
+from .vm_superinstructions import DEFAULT_SUPERINSTRUCTIONS, check_names, fuse
+from .vm_trace import HotLoopTracer, TraceFault, mark_back_edges
+from .vm_threaded import ThreadedCode
+from .vm_pyjit import PyJitCode
+from .vm_numpy import NumpyCode
+from .vm_profile import ExecutionProfiler, SamplingProfiler
+from .vm_hooks import HOOK_EVENTS, HookedCode, hook_key
+from .vm_record import TraceRecorder
+from .vm_checkpoint import dump_state, load_state
 
-class ActivationRecord:
-    """
-    Registro de activación para llamadas a funciones.
-    
-    Almacena el contexto de una función:
-    - Memoria local (parámetros y variables locales)
-    - Memoria temporal
-    - Dirección de retorno (IP a donde volver)
+# Motores de ejecución disponibles
+ENGINES = ('interp', 'threaded', 'pyjit')
+
+# Motores con memoria tipada: misma salida que el intérprete salvo donde la
+# semántica tipada cambia el resultado (ver vm_numpy)
+TYPED_ENGINES = ('numpy',)
+
+# Con time_limit, cada cuántos cuádruplos (como mucho) se consulta el reloj
+CLOCK_CHECK_QUADS = 10_000
+
+# Resultado de _checkpoint(): pausar la corrida
+_PAUSE = -1
+
+
+class ExecutionLimitExceeded(RuntimeError):
+    """El programa agotó su presupuesto de cuádruplos o su tiempo límite."""
+
+
+# Índice de segmento = dirección // SEGMENT_SIZE
+GLOBAL_INT, GLOBAL_FLOAT = 1, 2
+LOCAL_INT, LOCAL_FLOAT = 3, 4
+TEMP_INT, TEMP_FLOAT = 5, 6
+CONST_INT, CONST_FLOAT = 7, 8
+
+# Orden de los campos de 'resources' que forman un frame
+FRAME_RESOURCES = ('local_int', 'local_float', 'temp_int', 'temp_float')
+
+
+def scan_segment_sizes(quadruples: List, start: int = 0, end: Optional[int] = None) -> Dict[int, int]:
     """
+    Calcula cuántas celdas usa cada segmento en un rango de cuádruplos.
     
-    def __init__(self, return_address: int):
-        self.local_memory: Dict[int, Any] = {}  # Memoria local de la función
-        self.temp_memory: Dict[int, Any] = {}   # Temporales de la función
-        self.return_address = return_address     # IP para retornar
+    Sirve para dimensionar las globales y el frame de main, que no
+    vienen en la tabla de funciones del .obj.
     
-    def __repr__(self):
-        return f"AR(ret={self.return_address}, locals={len(self.local_memory)}, temps={len(self.temp_memory)})"
+    Returns:
+        dict: {índice de segmento: número de celdas}
+    """
+    sizes = {index: 0 for index in range(GLOBAL_INT, CONST_FLOAT + 1)}
+    for op, arg1, arg2, result in quadruples[start:end]:
+        # En saltos y llamadas el result es un índice de cuádruplo, no dirección
+        if op in ('GOTO', 'ERA', 'GOSUB', 'ENDFUNC', 'END'):
+            continue
+        operands = (arg1,) if op in ('GOTOF', 'PARAM', 'PRINT') else (arg1, arg2, result)
+        for address in operands:
+            try:
+                descriptor = MemoryMap.resolve(address)
+            except ValueError:
+                continue
+            sizes[descriptor.segment] = max(sizes[descriptor.segment], descriptor.slot + 1)
+    return sizes
 
 
 class ExecutionMemory:
     """
     Gestiona la memoria de ejecución de la máquina virtual.
     
-    Utiliza diccionarios (dirección -> valor) para cada segmento:
-    - global_memory: Variables globales (1000-2999)
-    - local_stack: Stack de memorias locales para recursión
-    - temp_memory: Temporales del contexto actual
-    - constant_memory: Constantes (solo lectura)
+    Globales y constantes son una lista plana por segmento, indexada por
+    (dirección - base). Locales y temporales viven en el frame plano de la
+    activación actual (ver frame_layout): una sola lista por llamada,
+    acomodada según el FrameLayout de la función y reutilizada desde su
+    free list.
+    
+    Cada nivel de recursión cuesta su frame plano más una entrada en cada
+    stack paralelo; el número de llamadas activas no pasa de max_depth.
+    
+    self.segments[dirección // 1000] es la lista de globales / constantes;
+    self.segments[FRAME] es el frame plano actual. Así leer cualquier
+    operando ya decodificado es un índice a una tabla y otro a una lista.
     
     Rangos de direcciones:
     - Global int:    1000-1999
@@ -50,33 +118,72 @@ class ExecutionMemory:
     - Const float:   8000-8999
     """
     
-    def __init__(self):
-        self.global_memory: Dict[int, Any] = {}
+    def __init__(self, global_int: int = 0, global_float: int = 0,
+                 max_depth: int = DEFAULT_MAX_DEPTH):
+        if max_depth < 1:
+            raise ValueError(f"La profundidad máxima de llamadas debe ser >= 1: {max_depth}")
+        self.max_depth = max_depth
+        self.global_int: List[Any] = [0] * global_int
+        self.global_float: List[Any] = [0] * global_float
         self.constant_memory: Dict[int, Any] = {}
         
-        # Stack de registros de activación
-        self.call_stack: List[ActivationRecord] = []
+        # Stack de llamadas: frame, layout y dirección de retorno de cada
+        # llamador, en listas paralelas para no crear objetos por llamada
+        self.call_stack: List[List[Any]] = []
+        self.layout_stack: List[FrameLayout] = []
+        self.return_stack: List[int] = []
         
-        # Memoria local y temporal del contexto actual (main inicialmente)
-        self.current_local: Dict[int, Any] = {}
-        self.current_temp: Dict[int, Any] = {}
+        # Frame del contexto actual (main inicialmente)
+        self.main_layout = FrameLayout('main')
+        self.current_layout = self.main_layout
+        self.current_frame: List[Any] = self.current_layout.acquire()
+        
+        # Tabla de segmentos indexada por dirección // 1000
+        self.segments: List[Optional[List[Any]]] = [None] * (CONST_FLOAT + 1)
+        self.segments[GLOBAL_INT] = self.global_int
+        self.segments[GLOBAL_FLOAT] = self.global_float
+        self.segments[CONST_INT] = []
+        self.segments[CONST_FLOAT] = []
+        self.segments[FRAME] = self.current_frame
     
     def load_constants(self, constants: Dict[int, Any]):
         """Carga las constantes desde el archivo .obj"""
         self.constant_memory = dict(constants)
+        for index in (CONST_INT, CONST_FLOAT):
+            base = index * SEGMENT_SIZE
+            offsets = [addr - base for addr in self.constant_memory if addr // SEGMENT_SIZE == index]
+            # Los huecos quedan en None para poder reportarlos
+            segment = [None] * (max(offsets) + 1 if offsets else 0)
+            for offset in offsets:
+                segment[offset] = self.constant_memory[base + offset]
+            self.segments[index] = segment
+    
+    def size_main_frame(self, sizes: Dict[int, int]) -> FrameLayout:
+        """Preasigna el frame de main con las celdas que usa y regresa su layout."""
+        self.main_layout = FrameLayout(
+            'main', sizes[LOCAL_INT], sizes[LOCAL_FLOAT], sizes[TEMP_INT], sizes[TEMP_FLOAT]
+        )
+        self.reset()
+        return self.main_layout
+    
+    def reset(self):
+        """
+        Deja la memoria como recién cargada: globales en 0, sin llamadas
+        activas y un frame de main en ceros. Las listas de globales se
+        limpian en sitio porque los motores compilados las tienen ligadas.
+        """
+        self.global_int[:] = [0] * len(self.global_int)
+        self.global_float[:] = [0] * len(self.global_float)
+        self.call_stack.clear()
+        self.layout_stack.clear()
+        self.return_stack.clear()
+        self.current_layout = self.main_layout
+        self.current_frame = self.main_layout.acquire()
+        self.segments[FRAME] = self.current_frame
     
     def get_segment(self, address: int) -> str:
         """Determina el segmento de una dirección."""
-        if 1000 <= address < 3000:
-            return 'global'
-        elif 3000 <= address < 5000:
-            return 'local'
-        elif 5000 <= address < 7000:
-            return 'temp'
-        elif 7000 <= address < 9000:
-            return 'constant'
-        else:
-            raise ValueError(f"Dirección {address} fuera de rango válido")
+        return MemoryMap.get_segment(address)
     
     def get_value(self, address: int) -> Any:
         """
@@ -88,20 +195,19 @@ class ExecutionMemory:
         Returns:
             Valor almacenado en esa dirección
         """
-        segment = self.get_segment(address)
-        
-        if segment == 'global':
-            return self.global_memory.get(address, 0)
-        elif segment == 'local':
-            return self.current_local.get(address, 0)
-        elif segment == 'temp':
-            return self.current_temp.get(address, 0)
-        elif segment == 'constant':
-            if address not in self.constant_memory:
-                raise ValueError(f"Constante {address} no encontrada")
-            return self.constant_memory[address]
+        segment, slot, scope, _ = MemoryMap.resolve(address)
+        try:
+            if segment in FRAME_SEGMENTS:
+                value = self.current_frame[self.current_layout.slot(segment, slot)]
+            else:
+                value = self.segments[segment][slot]
+        except IndexError:
+            # Celda nunca escrita (o constante inexistente)
+            value = None if scope == 'constant' else 0
         
-        raise ValueError(f"Segmento desconocido para dirección {address}")
+        if value is None:
+            raise ValueError(f"Constante {address} no encontrada")
+        return value
     
     def set_value(self, address: int, value: Any):
         """
@@ -111,37 +217,57 @@ class ExecutionMemory:
             address: Dirección virtual
             value: Valor a almacenar
         """
-        segment = self.get_segment(address)
-        
-        if segment == 'global':
-            self.global_memory[address] = value
-        elif segment == 'local':
-            self.current_local[address] = value
-        elif segment == 'temp':
-            self.current_temp[address] = value
-        elif segment == 'constant':
+        index, offset, scope, _ = MemoryMap.resolve(address)
+        if scope == 'constant':
             raise ValueError(f"No se puede escribir en memoria de constantes: {address}")
-        else:
-            raise ValueError(f"Segmento desconocido para dirección {address}")
+        if index in FRAME_SEGMENTS:
+            # El frame plano no puede crecer un segmento sin mover los demás
+            try:
+                self.current_frame[self.current_layout.slot(index, offset)] = value
+            except IndexError as e:
+                raise ValueError(f"Dirección {address}: {e}") from None
+            return
+        
+        segment = self.segments[index]
+        try:
+            segment[offset] = value
+        except IndexError:
+            # El segmento no estaba dimensionado para esta celda
+            segment.extend([0] * (offset + 1 - len(segment)))
+            segment[offset] = value
     
-    def push_activation_record(self, return_address: int):
+    def push_activation_record(self, return_address: int, layout: FrameLayout,
+                               frame: Optional[List[Any]] = None) -> List[Any]:
         """
-        Crea un nuevo registro de activación al llamar a una función.
-        Guarda el contexto actual y crea uno nuevo.
+        Entra al contexto de una llamada a función.
+        
+        Guarda el frame actual en el stack y activa `frame` (el que creó ERA
+        y ya trae los parámetros), o si no se da, uno en ceros de la free
+        list del layout de la función (o uno nuevo si está vacía).
+        
+        Returns:
+            list: El frame plano activado
+        
+        Raises:
+            CallDepthError: Si ya hay max_depth llamadas activas
         """
-        # Guardar contexto actual
-        ar = ActivationRecord(return_address)
-        ar.local_memory = self.current_local
-        ar.temp_memory = self.current_temp
-        self.call_stack.append(ar)
+        if len(self.return_stack) >= self.max_depth:
+            raise CallDepthError(self.max_depth, layout.name)
+        self.call_stack.append(self.current_frame)
+        self.layout_stack.append(self.current_layout)
+        self.return_stack.append(return_address)
         
-        # Crear nuevo contexto vacío
-        self.current_local = {}
-        self.current_temp = {}
+        if frame is None:
+            frame = layout.acquire()
+        self.current_frame = frame
+        self.current_layout = layout
+        self.segments[FRAME] = frame
+        return frame
     
     def pop_activation_record(self) -> int:
         """
-        Restaura el contexto anterior al retornar de una función.
+        Restaura el contexto anterior al retornar de una función; el frame
+        que termina regresa a la free list de su layout.
         
         Returns:
             int: Dirección de retorno (siguiente IP)
@@ -149,10 +275,28 @@ class ExecutionMemory:
         if not self.call_stack:
             raise RuntimeError("Stack de llamadas vacío")
         
-        ar = self.call_stack.pop()
-        self.current_local = ar.local_memory
-        self.current_temp = ar.temp_memory
-        return ar.return_address
+        free = self.current_layout.free
+        if len(free) < FREE_LIST_LIMIT:
+            free.append(self.current_frame)
+        frame = self.call_stack.pop()
+        self.current_frame = frame
+        self.current_layout = self.layout_stack.pop()
+        self.segments[FRAME] = frame
+        return self.return_stack.pop()
+    
+    def dump_segments(self, *indices: int) -> Dict[int, Any]:
+        """Regresa {dirección: valor} de los segmentos dados (para debugging)."""
+        result = {}
+        for index in indices:
+            base = index * SEGMENT_SIZE
+            if index in FRAME_SEGMENTS:
+                values = self.current_layout.view(self.current_frame, index)
+            else:
+                values = self.segments[index]
+            for offset, value in enumerate(values):
+                if value is not None:
+                    result[base + offset] = value
+        return result
 
 
 class VirtualMachine:
@@ -160,7 +304,7 @@ class VirtualMachine:
     Máquina Virtual para ejecutar programas Patito compilados.
     
     Soporta:
-    - Operaciones aritméticas: +, -, *, /
+    - Operaciones aritméticas: +, -, *, / (y DIV_II / DIV_FF especializadas)
     - Operaciones relacionales: <, >, !=
     - Asignación
     - Control de flujo: GOTO, GOTOF
@@ -168,222 +312,764 @@ class VirtualMachine:
     - I/O: PRINT
     """
     
-    def __init__(self, obj_data: dict):
+    def __init__(self, obj_data: dict, optimize: bool = True, engine: str = 'interp',
+                 hot_loop_threshold: Optional[int] = None, max_depth: int = DEFAULT_MAX_DEPTH,
+                 profile: bool = False, sample_rate: Optional[int] = None,
+                 max_quads: Optional[int] = None, time_limit: Optional[float] = None,
+                 overflow: str = 'error', superinstructions: Any = True,
+                 record_trace: Optional[str] = None):
         """
         Inicializa la VM con datos de un archivo .obj.
         
         Args:
             obj_data: Diccionario con quadruples, constants, functions
+            optimize: Si es True, especializa las divisiones que el análisis
+                      de rangos puede probar seguras (DIV_II / DIV_FF)
+            engine: Motor de ejecución (ver ENGINES y TYPED_ENGINES):
+                    'interp'   - loop de despacho sobre instrucciones decodificadas
+                    'threaded' - cada cuádruplo compilado a una closure
+                    'pyjit'    - cada función traducida a una función de Python
+                    'numpy'    - memoria tipada en arreglos int64 / float64
+                                 (necesita NumPy; ver vm_numpy)
+            hot_loop_threshold: Si se da, el motor 'interp' cuenta las aristas
+                    de regreso de cada ciclo y al llegar a este número de
+                    vueltas compila la traza del ciclo (ver vm_trace)
+            max_depth: Llamadas activas permitidas; una llamada de más es un
+                    CallDepthError (con 'pyjit' el límite es aproximado, por
+                    unos cuantos frames, y no pasa de vm_pyjit.RECURSION_LIMIT)
+            profile: Si es True cada corrida usa el loop instrumentado de
+                    vm_profile y deja el perfil en get_profile()
+            sample_rate: Si se da, muestrea el stack de llamadas Patito
+                    estas veces por segundo durante cada corrida, sin
+                    instrumentar el loop (ver get_samples())
+            max_quads: Presupuesto de cuádruplos por corrida; al agotarse la
+                    corrida falla con ExecutionLimitExceeded
+            time_limit: Segundos de reloj por corrida (desde execute() o
+                    start()); al pasarse, ExecutionLimitExceeded
+            overflow: Desbordamiento de la aritmética int64 / float64 del
+                    motor 'numpy': 'error' (ArithmeticOverflowError) o
+                    'wrap' (complemento a dos)
+            superinstructions: Secuencias que el motor 'interp' despacha como
+                    una sola instrucción (ver vm_superinstructions): True
+                    para DEFAULT_SUPERINSTRUCTIONS, False para ninguna, o
+                    una lista de nombres
+            record_trace: Si se da, cada corrida graba un registro binario
+                    por cuádruplo en este archivo (ver vm_record y
+                    get_record_stats()); solo motores 'interp' y 'threaded'
+        
+        El presupuesto, el tiempo límite y las pausas de resume() solo se
+        revisan en las aristas de regreso de los ciclos y en GOSUB (motor
+        'interp'): todo lo que corre entre dos revisiones es código en línea
+        recta, así que se pasan como mucho por un tramo sin ciclos.
         """
+        if engine not in ENGINES + TYPED_ENGINES:
+            raise ValueError(f"Motor desconocido: {engine} (opciones: {', '.join(ENGINES + TYPED_ENGINES)})")
+        if hot_loop_threshold is not None and engine != 'interp':
+            raise ValueError("Las trazas de ciclos calientes solo están disponibles con el motor 'interp'")
+        if profile and (engine in ('pyjit', 'numpy') or hot_loop_threshold is not None):
+            raise ValueError("El perfilado no está disponible con los motores 'pyjit' y 'numpy' ni con trazas")
+        if overflow != 'error' and engine != 'numpy':
+            raise ValueError("El modo de desbordamiento solo aplica al motor 'numpy'")
+        budgeted = max_quads is not None or time_limit is not None
+        if budgeted and (engine != 'interp' or hot_loop_threshold is not None or profile):
+            raise ValueError("El presupuesto de cuádruplos y el tiempo límite solo están "
+                             "disponibles con el motor 'interp', sin trazas ni perfilado")
+        if record_trace is not None and (engine not in ('interp', 'threaded') or hot_loop_threshold is not None
+                                         or profile or budgeted):
+            raise ValueError("La grabación de la ejecución solo está disponible con los motores "
+                             "'interp' y 'threaded', sin trazas, perfilado ni presupuesto")
+        self.max_quads = max_quads
+        self.time_limit = time_limit
+        self.engine = engine
+        if superinstructions is True:
+            superinstructions = DEFAULT_SUPERINSTRUCTIONS
+        self.superinstructions = check_names(superinstructions or ())
+        
         self.quadruples = obj_data['quadruples']
         self.functions = obj_data.get('functions', {})
         self.program_name = obj_data.get('program_name', 'Unknown')
         
-        # Inicializar memoria
-        self.memory = ExecutionMemory()
+        # Inicializar memoria: globales dimensionadas con todo el programa
+        # y el frame de main con los cuádruplos desde el GOTO main
+        sizes = scan_segment_sizes(self.quadruples)
+        self.max_depth = max_depth
+        self.memory = ExecutionMemory(sizes[GLOBAL_INT], sizes[GLOBAL_FLOAT], max_depth)
         self.memory.load_constants(obj_data.get('constants', {}))
+        main_layout = self.memory.size_main_frame(scan_segment_sizes(self.quadruples, self._main_start()))
+        
+        if optimize:
+            self.quadruples = specialize_divisions(
+                self.quadruples, self.memory.constant_memory, self.functions
+            )
+        
+        # Decodificar una sola vez: opcodes enteros y operandos resueltos
+        self.code = decode(self.quadruples, self.memory.constant_memory)
+        
+        # Frames planos: un layout por función y operandos locales/temporales
+        # reescritos a posiciones del frame
+        self.frame_layouts = self._build_frame_layouts()
+        self._flatten_frames(main_layout)
+        
+        # Planes de llamada: ERA / PARAM / GOSUB ya no usan nombres ni índices
+        self.call_plans = {
+            func_name: CallPlan.for_function(func_name, self.functions[func_name], layout)
+            for func_name, layout in self.frame_layouts.items()
+        }
+        bind_call_plans(self.code, self.call_plans)
+        
+        # Aristas de regreso como OP_LOOP: puntos de revisión de las trazas
+        # y del presupuesto (en una corrida normal son GOTO simples)
+        self._back_edges_marked = hot_loop_threshold is not None or budgeted
+        if self._back_edges_marked:
+            self.code = mark_back_edges(self.code)
+        
+        # Código con superinstrucciones del motor 'interp' y el self.code
+        # del que salió (mark_back_edges() puede reemplazarlo después)
+        self._fused_code: List[Any] = []
+        self._fused_from: Optional[List[Any]] = None
         
         # Instruction Pointer
         self.ip = 0
         
-        # Stack de parámetros pendientes para llamada actual
-        self.param_stack: List[Any] = []
+        # Cuádruplos ejecutados en la última corrida
+        self.quad_count = 0
         
-        # Función que se está llamando actualmente (para ERA)
-        self.current_call: Optional[str] = None
+        # Frames creados por ERA que esperan su GOSUB (PARAM escribe en el último)
+        self.pending_frames: List[List[Any]] = []
         
         # Flag para terminar ejecución
         self.running = True
         
-        # Output buffer para testing
+        # Límites de la corrida actual: hora límite y cuádruplo donde pausar
+        self._deadline: Optional[float] = None
+        self._slice_end: Optional[int] = None
+        
+        # Checkpoints guardados / restaurados (ver get_checkpoint_stats())
+        self._checkpoint_stats: Optional[Dict[str, Any]] = None
+        
+        # Destino de los prints de la corrida actual (ver output_sink)
+        self.output: OutputSink = BufferedSink(capture=True)
+        
+        # Output buffer para testing (lo que capturó el sink)
         self.output_buffer: List[str] = []
+        
+        # Backends alternos: se compilan aquí, una sola vez
+        self._threaded = ThreadedCode(self) if engine == 'threaded' else None
+        self._pyjit = PyJitCode(self) if engine == 'pyjit' else None
+        self._numpy = NumpyCode(self, overflow) if engine == 'numpy' else None
+        
+        # Trazas de ciclos calientes (solo 'interp')
+        self.tracer = HotLoopTracer(self, hot_loop_threshold) if hot_loop_threshold is not None else None
+        
+        # Perfilador (loop instrumentado aparte; el normal no cambia)
+        self.profiler = ExecutionProfiler(self) if profile else None
+        
+        # Muestreo del stack de llamadas desde otro hilo
+        self.sampler = SamplingProfiler(self, sample_rate) if sample_rate is not None else None
+        
+        # Hooks de depuración {evento: [funciones]}; el loop con hooks se
+        # arma en execute() solo si hay alguno (ver vm_hooks)
+        self.hooks: Dict[str, List[Any]] = {}
+        self._hooked: Optional[HookedCode] = None
+        
+        # Grabación binaria de cada cuádruplo (loop aparte, como los hooks)
+        self.recorder = TraceRecorder(self, record_trace) if record_trace is not None else None
     
-    def execute(self) -> List[str]:
+    def _main_start(self) -> int:
+        """Índice del primer cuádruplo de main (destino del GOTO inicial)."""
+        if self.quadruples and self.quadruples[0][0] == 'GOTO' and isinstance(self.quadruples[0][3], int):
+            return self.quadruples[0][3]
+        return 0
+    
+    def _build_frame_layouts(self) -> Dict[str, FrameLayout]:
+        """
+        Layout del frame plano de cada función.
+        
+        Se usan los 'resources' del .obj; si faltan o se quedan cortos
+        (p.ej. un .obj viejo), se completan escaneando el cuerpo de la
+        función, para que el loop nunca lea fuera del frame.
+        """
+        frame_layouts = {}
+        for func_name, func_info in self.functions.items():
+            resources = dict(func_info.get('resources') or {})
+            start = func_info.get('quad_start')
+            if isinstance(start, int):
+                end = start
+                while end < len(self.quadruples) and self.quadruples[end][0] != 'ENDFUNC':
+                    end += 1
+                scanned = scan_segment_sizes(self.quadruples, start, end + 1)
+                for index, name in zip((LOCAL_INT, LOCAL_FLOAT, TEMP_INT, TEMP_FLOAT), FRAME_RESOURCES):
+                    resources[name] = max(resources.get(name, 0), scanned[index])
+            # Los parámetros siempre tienen celda, aunque el cuerpo no los use
+            param_types = [param.get('type', 'int') for param in func_info.get('params', [])]
+            int_params = sum(1 for tipo in param_types if tipo == 'int')
+            resources['local_int'] = max(resources.get('local_int', 0), int_params)
+            resources['local_float'] = max(resources.get('local_float', 0), len(param_types) - int_params)
+            frame_layouts[func_name] = FrameLayout(
+                func_name, *(resources.get(name, 0) for name in FRAME_RESOURCES)
+            )
+        return frame_layouts
+    
+    def _flatten_frames(self, main_layout: FrameLayout):
         """
-        Ejecuta el programa completo.
+        Reescribe los operandos locales y temporales de cada región de
+        código (función, main, o código muerto entre funciones) a
+        posiciones del frame plano de esa región.
+        """
+        starts: Dict[int, FrameLayout] = {}
+        for func_name, layout in self.frame_layouts.items():
+            start = self.functions[func_name].get('quad_start')
+            if isinstance(start, int):
+                starts[start] = layout
+        starts[self._main_start()] = main_layout
+        
+        # (inicio, fin, layout) de cada región, para motores que reacomodan frames
+        self.region_layouts: List[Tuple[int, int, FrameLayout]] = []
+        for start, end, layout in code_regions(self.code, starts):
+            if layout is None:
+                # Región sin dueño (p.ej. la primera copia de un cuerpo):
+                # layout propio con las celdas que usa
+                sizes = scan_segment_sizes(self.quadruples, start, end)
+                layout = FrameLayout(f"<{start}>", *(sizes[index] for index in FRAME_SEGMENTS))
+            flatten_frame_operands(self.code, start, end, layout)
+            self.region_layouts.append((start, end, layout))
+    
+    def execute(self, output: Any = None, stream: bool = False) -> Union[List[str], Iterator[str]]:
+        """
+        Ejecuta el programa completo con el motor elegido.
+        
+        Args:
+            output: A dónde va la salida de los prints:
+                    None       - stdout con buffer, y se captura en output_buffer
+                    OutputSink - ese sink (ver output_sink)
+                    archivo    - cualquier objeto con .write(str), con buffer
+                                 y sin captura
+            stream: Si es True no ejecuta aquí: regresa un iterador de
+                    pedazos de la salida que corre el programa conforme se lee
         
         Returns:
-            List[str]: Salida del programa (prints)
+            List[str]: Salida del programa (prints) si el sink la captura,
+            si no una lista vacía; con stream=True, el iterador
+        """
+        if stream:
+            if output is not None:
+                raise ValueError("stream=True ya define el destino de la salida")
+            return stream_execution(self.execute)
+        
+        self.start(output)
+        if self.sampler is not None:
+            self.sampler.start()
+        try:
+            if self.profiler is not None:
+                self.profiler.run()
+            elif self.recorder is not None:
+                self.recorder.run()
+            elif self.hooks:
+                self._hooked_code().run()
+            elif self._threaded is not None:
+                self._threaded.run()
+            elif self._pyjit is not None:
+                self._pyjit.run()
+            elif self._numpy is not None:
+                self._numpy.run()
+            else:
+                self._slice_end = None
+                self._run_interp(0, 0)
+        finally:
+            if self.sampler is not None:
+                self.sampler.stop()
+            self.output.flush()
+        
+        return self.output_buffer
+    
+    def start(self, output: Any = None):
+        """
+        Prepara una corrida nueva desde el cuádruplo 0 sin ejecutar nada;
+        después resume() la avanza por tramos. La memoria vuelve a como
+        estaba al cargar, así que cada corrida da lo mismo.
+        
+        Args:
+            output: Destino de la salida, igual que en execute()
         """
+        if output is None:
+            output = BufferedSink(capture=True)
+        elif not isinstance(output, OutputSink):
+            output = BufferedSink(output)
+        
         self.ip = 0
+        self.quad_count = 0
         self.running = True
-        self.output_buffer = []
+        self.output = output
+        self.output_buffer = output.captured if output.captured is not None else []
+        self.pending_frames.clear()
+        self.memory.reset()
+        self._deadline = time.monotonic() + self.time_limit if self.time_limit is not None else None
+    
+    def resume(self, quads: Optional[int] = None) -> bool:
+        """
+        Continúa la corrida desde el IP y el stack de llamadas guardados.
         
-        while self.running and self.ip < len(self.quadruples):
-            quad = self.quadruples[self.ip]
-            op, arg1, arg2, result = quad
-            
-            # Despachar operación
-            self.ip = self._dispatch(op, arg1, arg2, result)
+        Args:
+            quads: Cuádruplos a ejecutar en este tramo (aproximado: se pausa
+                   en la primera arista de regreso o GOSUB después de
+                   llegar); None corre hasta el final
         
-        return self.output_buffer
+        Returns:
+            bool: True si el programa terminó, False si quedó en pausa
+        """
+        if self.engine != 'interp' or self.profiler is not None or self.hooks or self.recorder is not None:
+            raise ValueError("Solo el motor 'interp' (sin perfilado, hooks ni grabación) se puede pausar")
+        if not self.running:
+            return True
+        if quads is None:
+            self._slice_end = None
+        else:
+            if self.tracer is not None:
+                raise ValueError("Las trazas de ciclos calientes no se pueden pausar")
+            if not self._back_edges_marked:
+                self.code = mark_back_edges(self.code)
+                self._back_edges_marked = True
+            self._slice_end = self.quad_count + quads
+        try:
+            self._run_interp(self.ip, self.quad_count)
+        finally:
+            self.output.flush()
+        return not self.running
+    
+    def checkpoint(self, path: Optional[str] = None) -> bytes:
+        """
+        Guarda el estado de la corrida (ver vm_checkpoint) para seguirla
+        después con restore() + resume(), aunque sea en otro proceso.
+        Se toma entre tramos de resume() o al terminar.
+        
+        Args:
+            path: Si se da, también escribe el checkpoint ahí (reemplazando
+                  el anterior solo cuando el nuevo ya está completo)
+        
+        Returns:
+            bytes: El checkpoint
+        """
+        if self._numpy is not None:
+            raise ValueError("Los checkpoints no están disponibles con el motor 'numpy'")
+        started = time.perf_counter()
+        data = dump_state(self)
+        if path is not None:
+            temp_path = f"{path}.tmp"
+            with open(temp_path, 'wb') as checkpoint_file:
+                checkpoint_file.write(data)
+            os.replace(temp_path, path)
+        stats = self._stats_for_checkpoints()
+        stats['checkpoints'] += 1
+        stats['bytes'] = len(data)
+        stats['checkpoint_ms'] += (time.perf_counter() - started) * 1000
+        return data
     
-    def _dispatch(self, op: str, arg1: Any, arg2: Any, result: Any) -> int:
+    def restore(self, snapshot: Union[bytes, str], output: Any = None):
         """
-        Despacha una operación y retorna el siguiente IP.
+        Prepara la corrida guardada en un checkpoint; resume() la continúa.
+        
+        Args:
+            snapshot: El checkpoint, o la ruta del archivo
+            output: Destino de la salida que falta, igual que en start()
+        
+        Raises:
+            CheckpointError: Si no se puede leer o es de otro programa
+        """
+        started = time.perf_counter()
+        if isinstance(snapshot, str):
+            with open(snapshot, 'rb') as checkpoint_file:
+                snapshot = checkpoint_file.read()
+        self.start(output)
+        load_state(self, snapshot)
+        stats = self._stats_for_checkpoints()
+        stats['restores'] += 1
+        stats['restore_ms'] += (time.perf_counter() - started) * 1000
+    
+    def _stats_for_checkpoints(self) -> Dict[str, Any]:
+        if self._checkpoint_stats is None:
+            self._checkpoint_stats = {
+                'checkpoints': 0, 'bytes': 0, 'checkpoint_ms': 0.0, 'restores': 0, 'restore_ms': 0.0,
+            }
+        return self._checkpoint_stats
+    
+    def get_checkpoint_stats(self) -> Optional[dict]:
         """
-        next_ip = self.ip + 1
+        Costo de los checkpoints de esta VM.
         
-        # Operaciones aritméticas
-        if op == 'PLUS':
-            val1 = self.memory.get_value(arg1)
-            val2 = self.memory.get_value(arg2)
-            self.memory.set_value(result, val1 + val2)
+        Returns:
+            dict: {'checkpoints', 'bytes' (del último), 'checkpoint_ms',
+            'restores', 'restore_ms'} (tiempos acumulados), o None si no
+            se ha guardado ni restaurado ninguno
+        """
+        if self._checkpoint_stats is None:
+            return None
+        return dict(self._checkpoint_stats)
+    
+    def _next_check(self, count: int) -> int:
+        """Cuádruplo en el que toca la siguiente revisión de límites."""
+        check_at = sys.maxsize
+        if self.max_quads is not None:
+            check_at = min(check_at, self.max_quads)
+        if self._slice_end is not None:
+            check_at = min(check_at, self._slice_end)
+        if self._deadline is not None:
+            check_at = min(check_at, count + CLOCK_CHECK_QUADS)
+        return check_at
+    
+    def _checkpoint(self, count: int) -> int:
+        """
+        Revisa presupuesto, tiempo límite y pausa en una arista de regreso
+        o un GOSUB.
         
-        elif op == 'MINUS':
-            val1 = self.memory.get_value(arg1)
-            val2 = self.memory.get_value(arg2)
-            self.memory.set_value(result, val1 - val2)
+        Returns:
+            int: Siguiente revisión, o _PAUSE si el tramo terminó
         
-        elif op == 'MUL':
-            val1 = self.memory.get_value(arg1)
-            val2 = self.memory.get_value(arg2)
-            self.memory.set_value(result, val1 * val2)
+        Raises:
+            ExecutionLimitExceeded: Si se agotó el presupuesto o el tiempo
+        """
+        if self.max_quads is not None and count >= self.max_quads:
+            raise ExecutionLimitExceeded(
+                f"Presupuesto de instrucciones agotado ({self.max_quads} cuádruplos)")
+        if self._deadline is not None and time.monotonic() >= self._deadline:
+            raise ExecutionLimitExceeded(f"Tiempo límite excedido ({self.time_limit} s)")
+        if self._slice_end is not None and count >= self._slice_end:
+            return _PAUSE
+        return self._next_check(count)
+    
+    def _dispatch_code(self) -> List[Any]:
+        """Instrucciones que despacha el motor 'interp': self.code con superinstrucciones."""
+        if self._fused_from is not self.code:
+            self._fused_code = fuse(self.code, self.region_layouts, self.superinstructions)
+            self._fused_from = self.code
+        return self._fused_code
+    
+    def _run_interp(self, ip: int, count: int):
+        """
+        Motor 'interp'.
         
-        elif op == 'DIV':
-            val1 = self.memory.get_value(arg1)
-            val2 = self.memory.get_value(arg2)
-            if val2 == 0:
-                raise RuntimeError("División por cero")
-            # Mantener tipo: si ambos son int, resultado es int
-            if isinstance(val1, int) and isinstance(val2, int):
-                self.memory.set_value(result, val1 // val2)
-            else:
-                self.memory.set_value(result, val1 / val2)
-        
-        # Operaciones relacionales
-        elif op == 'GT':
-            val1 = self.memory.get_value(arg1)
-            val2 = self.memory.get_value(arg2)
-            self.memory.set_value(result, 1 if val1 > val2 else 0)
-        
-        elif op == 'LT':
-            val1 = self.memory.get_value(arg1)
-            val2 = self.memory.get_value(arg2)
-            self.memory.set_value(result, 1 if val1 < val2 else 0)
-        
-        elif op == 'NEQ':
-            val1 = self.memory.get_value(arg1)
-            val2 = self.memory.get_value(arg2)
-            self.memory.set_value(result, 1 if val1 != val2 else 0)
-        
-        # Asignación
-        elif op == '=':
-            val = self.memory.get_value(arg1)
-            self.memory.set_value(result, val)
-        
-        # Control de flujo
-        elif op == 'GOTO':
-            next_ip = result
-        
-        elif op == 'GOTOF':
-            val = self.memory.get_value(arg1)
-            if val == 0 or val is False:
-                next_ip = result
-        
-        # I/O
-        elif op == 'PRINT':
-            if isinstance(arg1, str):
-                # Es un string literal
-                output = arg1
-            else:
-                # Es una dirección de memoria
-                output = str(self.memory.get_value(arg1))
-            
-            print(output, end='')
-            self.output_buffer.append(output)
-        
-        # Funciones
-        elif op == 'ERA':
-            # Expansion of Activation Record
-            # arg1 = nombre de la función
-            self.current_call = arg1
-            self.param_stack = []
-        
-        elif op == 'PARAM':
-            # arg1 = dirección del argumento
-            # result = número de parámetro
-            val = self.memory.get_value(arg1)
-            self.param_stack.append((result, val))
-        
-        elif op == 'GOSUB':
-            # arg1 = nombre de la función
-            # result = quad_start de la función
-            func_name = arg1
-            func_start = result
-            
-            # Guardar contexto y crear nuevo registro de activación
-            self.memory.push_activation_record(self.ip + 1)
-            
-            # Asignar parámetros a memoria local
-            if func_name in self.functions:
-                func_info = self.functions[func_name]
-                params = func_info.get('params', [])
+        El loop trabaja sobre las instrucciones decodificadas (opcode entero
+        y operandos (segmento, offset)), con todo en variables locales y sin
+        llamar un método por cuádruplo; solo el cambio de frame de GOSUB /
+        RETURN / ENDFUNC llama a la memoria.
+        
+        Empieza en `ip` con `count` cuádruplos ya ejecutados (para resume()).
+        Los límites se revisan solo en OP_LOOP, GOSUB y CALL, cuando count
+        llega a check_at; sin límites check_at es sys.maxsize y nunca se llega.
+        
+        Una superinstrucción suma a count todos los cuádruplos que cubre.
+        """
+        code = self._dispatch_code()
+        memory = self.memory
+        segs = memory.segments          # se actualiza en sitio al cambiar de frame
+        pending = self.pending_frames
+        push_frame = memory.push_activation_record
+        write = self.output.write
+        back_edge = self.tracer.back_edge if self.tracer is not None else None
+        checkpoint = self._checkpoint
+        check_at = self._next_check(count)
+        
+        try:
+            while True:
+                op, a, b, c, d, e, f = code[ip]
+                ip += 1
+                count += 1
+                
+                if op == OP_ASSIGN:
+                    segs[e][f] = segs[a][b]
+                
+                elif op == OP_PLUS:
+                    segs[e][f] = segs[a][b] + segs[c][d]
+                
+                elif op == OP_PLUS_SET:
+                    # PLUS + '=' directo a la variable (se salta el '=')
+                    segs[e][f] = segs[a][b] + segs[c][d]
+                    ip += 1
+                    count += 1
+                
+                elif op == OP_LT_JUMP:
+                    # LT + GOTOF sin escribir el temporal
+                    if segs[a][b] < segs[c][d]:
+                        ip += 1
+                    else:
+                        ip = f
+                    count += 1
+                
+                elif op == OP_CALL:
+                    # ERA + PARAM* + GOSUB (b = argumentos, c = cuádruplos de más)
+                    # IP y count como en el GOSUB: un error lo reporta ahí
+                    ip += c
+                    count += c
+                    layout = a.layout
+                    free = layout.free
+                    if free:
+                        frame = free.pop()
+                        frame[:] = layout.template
+                    else:
+                        frame = layout.template[:]
+                    for seg, off, pos in b:
+                        frame[pos] = segs[seg][off]
+                    if count >= check_at:
+                        check_at = checkpoint(count)
+                        if check_at == _PAUSE:
+                            # Pausar en el GOSUB con el frame pendiente, igual
+                            # que sin superinstrucciones; resume() sigue ahí
+                            pending.append(frame)
+                            ip -= 1
+                            count -= 1
+                            break
+                    push_frame(ip, layout, frame)
+                    ip = f
+                
+                elif op == OP_LT:
+                    segs[e][f] = 1 if segs[a][b] < segs[c][d] else 0
+                
+                elif op == OP_GOTOF:
+                    val = segs[a][b]
+                    if val == 0 or val is False:
+                        ip = f
+                
+                elif op == OP_GOTO:
+                    ip = f
+                
+                elif op == OP_MINUS:
+                    segs[e][f] = segs[a][b] - segs[c][d]
+                
+                elif op == OP_MUL:
+                    segs[e][f] = segs[a][b] * segs[c][d]
+                
+                elif op == OP_GT:
+                    segs[e][f] = 1 if segs[a][b] > segs[c][d] else 0
+                
+                elif op == OP_NEQ:
+                    segs[e][f] = 1 if segs[a][b] != segs[c][d] else 0
+                
+                elif op == OP_MINUS_SET:
+                    segs[e][f] = segs[a][b] - segs[c][d]
+                    ip += 1
+                    count += 1
+                
+                elif op == OP_MUL_SET:
+                    segs[e][f] = segs[a][b] * segs[c][d]
+                    ip += 1
+                    count += 1
                 
-                # Ordenar parámetros por índice
-                self.param_stack.sort(key=lambda x: x[0])
+                elif op == OP_GT_JUMP:
+                    if segs[a][b] > segs[c][d]:
+                        ip += 1
+                    else:
+                        ip = f
+                    count += 1
                 
-                # Base de memoria local para parámetros
-                local_int_base = 3000
-                local_float_base = 4000
-                int_offset = 0
-                float_offset = 0
+                elif op == OP_NEQ_JUMP:
+                    if segs[a][b] != segs[c][d]:
+                        ip += 1
+                    else:
+                        ip = f
+                    count += 1
                 
-                for i, (param_idx, value) in enumerate(self.param_stack):
-                    if i < len(params):
-                        param_type = params[i].get('type', 'int')
-                        if param_type == 'int':
-                            addr = local_int_base + int_offset
-                            int_offset += 1
-                        else:
-                            addr = local_float_base + float_offset
-                            float_offset += 1
-                        self.memory.set_value(addr, value)
-            
-            self.param_stack = []
-            self.current_call = None
-            
-            # Saltar al inicio de la función
-            next_ip = func_start
-        
-        elif op == 'RETURN':
-            # arg1 = dirección del valor a retornar
-            # result = dirección global donde guardar el retorno
-            val = self.memory.get_value(arg1)
-            
-            # Restaurar contexto anterior
-            return_addr = self.memory.pop_activation_record()
-            
-            # Guardar valor de retorno en variable global
-            if result is not None:
-                self.memory.set_value(result, val)
-            
-            next_ip = return_addr
-        
-        elif op == 'ENDFUNC':
-            # Fin de función void (sin RETURN explícito)
-            return_addr = self.memory.pop_activation_record()
-            next_ip = return_addr
-        
-        elif op == 'END':
-            # Fin del programa
-            self.running = False
+                elif op == OP_BRANCH:
+                    # GOTOF + GOTO: e = destino si la condición es cierta
+                    val = segs[a][b]
+                    if val == 0 or val is False:
+                        ip = f
+                    else:
+                        ip = e
+                        count += 1
+                
+                elif op == OP_DIV_II:
+                    segs[e][f] = segs[a][b] // segs[c][d]
+                
+                elif op == OP_DIV_FF:
+                    segs[e][f] = segs[a][b] / segs[c][d]
+                
+                elif op == OP_DIV:
+                    val1 = segs[a][b]
+                    val2 = segs[c][d]
+                    if val2 == 0:
+                        raise RuntimeError("División por cero")
+                    # Mantener tipo: si ambos son int, resultado es int
+                    if isinstance(val1, int) and isinstance(val2, int):
+                        segs[e][f] = val1 // val2
+                    else:
+                        segs[e][f] = val1 / val2
+                
+                elif op == OP_PARAM:
+                    # Directo al frame de la llamada pendiente (f = posición)
+                    pending[-1][f] = segs[a][b]
+                
+                elif op == OP_ERA:
+                    # Expansion of Activation Record (a = CallPlan)
+                    layout = a.layout
+                    free = layout.free
+                    if free:
+                        frame = free.pop()
+                        frame[:] = layout.template
+                    else:
+                        frame = layout.template[:]
+                    pending.append(frame)
+                
+                elif op == OP_GOSUB:
+                    if count >= check_at:
+                        check_at = checkpoint(count)
+                        if check_at == _PAUSE:
+                            # Pausar antes del GOSUB; resume() lo ejecuta
+                            ip -= 1
+                            count -= 1
+                            break
+                    push_frame(ip, a.layout, pending.pop())
+                    ip = f
+                
+                elif op == OP_RETURN:
+                    val = segs[a][b]
+                    # Restaurar contexto anterior y guardar el valor de retorno
+                    ip = memory.pop_activation_record()
+                    if e is not None:
+                        segs[e][f] = val
+                
+                elif op == OP_ENDFUNC:
+                    # Fin de función void (sin RETURN explícito)
+                    ip = memory.pop_activation_record()
+                
+                elif op == OP_PRINT:
+                    write(str(segs[a][b]))
+                
+                elif op == OP_PRINT_STR:
+                    write(a)
+                
+                elif op == OP_END:
+                    # Fin del programa
+                    self.running = False
+                    break
+                
+                elif op == OP_LOOP:
+                    # Arista de regreso de un ciclo (con trazas o límites)
+                    if count >= check_at:
+                        check_at = checkpoint(count)
+                        if check_at == _PAUSE:
+                            ip -= 1
+                            count -= 1
+                            break
+                    if back_edge is None:
+                        ip = f
+                        continue
+                    try:
+                        ip, executed = back_edge(ip - 1, f)
+                    except TraceFault as fault:
+                        ip = fault.ip + 1
+                        count += fault.executed
+                        raise fault.error from None
+                    count += executed
+                
+                else:
+                    # OP_ERROR: el cuádruplo no se pudo decodificar
+                    raise RuntimeError(a)
+        except BaseException:
+            # Dejar el IP en el cuádruplo que falló
+            ip -= 1
+            raise
+        finally:
+            self.ip = ip
+            self.quad_count = count
+    
+    def add_hook(self, event: str, callback: Any) -> None:
+        """
+        Registra un hook de depuración para las siguientes corridas de
+        execute() (ver vm_hooks para los eventos y sus argumentos).
         
-        else:
-            raise RuntimeError(f"Operación desconocida: {op}")
+        Args:
+            event: 'quad', 'call', 'return', 'print' o 'write'
+            callback: Función a llamar en cada evento
+        
+        Raises:
+            ValueError: Evento desconocido, o un motor / modo que no corre
+                        sobre las closures de 'threaded' (pyjit, numpy,
+                        trazas, perfilado, presupuesto, grabación)
+        """
+        if event not in HOOK_EVENTS:
+            raise ValueError(f"Evento desconocido: {event} (opciones: {', '.join(HOOK_EVENTS)})")
+        if not callable(callback):
+            raise TypeError(f"El hook de '{event}' no es una función: {callback!r}")
+        if self.engine not in ('interp', 'threaded') or self.tracer is not None \
+                or self.profiler is not None or self.max_quads is not None or self.time_limit is not None \
+                or self.recorder is not None:
+            raise ValueError("Los hooks solo están disponibles con los motores 'interp' y "
+                             "'threaded', sin trazas, perfilado, presupuesto ni grabación")
+        self.hooks.setdefault(event, []).append(callback)
+    
+    def remove_hook(self, event: str, callback: Any) -> None:
+        """Quita un hook registrado con add_hook(); sin hooks execute() vuelve al loop normal."""
+        callbacks = self.hooks.get(event, [])
+        if callback not in callbacks:
+            raise ValueError(f"El hook no está registrado para '{event}'")
+        callbacks.remove(callback)
+        if not callbacks:
+            del self.hooks[event]
+    
+    def _hooked_code(self) -> HookedCode:
+        """El programa con los hooks actuales ligados (se rearma si cambiaron)."""
+        if self._hooked is None or self._hooked.key != hook_key(self.hooks):
+            self._hooked = HookedCode(self, self.hooks)
+        return self._hooked
+    
+    def get_trace_stats(self) -> Optional[dict]:
+        """
+        Estadísticas de ciclos calientes y trazas compiladas.
+        
+        Returns:
+            dict: Ver HotLoopTracer.stats(), o None si las trazas no están activas
+        """
+        if self.tracer is None:
+            return None
+        return self.tracer.stats()
+    
+    def get_profile(self) -> Optional[dict]:
+        """
+        Perfil de la última corrida.
+        
+        Returns:
+            dict: {'program', 'total_quads', 'wall_time', 'max_depth',
+            'functions', 'opcodes', 'quads'} (ver vm_profile), o None si no
+            se perfiló
+        """
+        if self.profiler is None:
+            return None
+        return self.profiler.profile
+    
+    def get_record_stats(self) -> Optional[dict]:
+        """
+        Grabación de la última corrida.
+        
+        Returns:
+            dict: {'path', 'records', 'bytes', 'flushes'} (ver vm_record), o
+            None si no se grabó
+        """
+        if self.recorder is None:
+            return None
+        return self.recorder.stats
+    
+    def get_samples(self) -> Optional[List[str]]:
+        """
+        Muestras de la última corrida en formato collapsed.
         
-        return next_ip
+        Returns:
+            list: Líneas "main;f;g N" (ver SamplingProfiler.collapsed()), o
+            None si no se muestreó
+        """
+        if self.sampler is None:
+            return None
+        return self.sampler.collapsed()
     
     def get_memory_snapshot(self) -> dict:
         """
         Obtiene un snapshot del estado actual de la memoria.
         Útil para debugging.
         """
+        memory = self.memory
         return {
-            'global': dict(self.memory.global_memory),
-            'local': dict(self.memory.current_local),
-            'temp': dict(self.memory.current_temp),
-            'constants': dict(self.memory.constant_memory),
+            'global': memory.dump_segments(GLOBAL_INT, GLOBAL_FLOAT),
+            'local': memory.dump_segments(LOCAL_INT, LOCAL_FLOAT),
+            'temp': memory.dump_segments(TEMP_INT, TEMP_FLOAT),
+            'constants': dict(memory.constant_memory),
             'call_stack_depth': len(self.memory.call_stack)
         }
 
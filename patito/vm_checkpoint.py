@@ -0,0 +1,167 @@
+"""
+Checkpoints de la Máquina Virtual Patito
+
+Un checkpoint guarda todo lo que la VM necesita para seguir una corrida
+pausada (ver VirtualMachine.resume()):
+- IP, cuádruplos ejecutados y si el programa sigue corriendo
+- Globales int / float
+- El stack de llamadas: por nivel el nombre de su FrameLayout, el frame
+  plano y la dirección de retorno; y el frame actual
+- Los frames que ERA ya creó y esperan su GOSUB (con sus parámetros)
+
+Formato: un encabezado fijo (magia, versión, versión de marshal y hash
+del programa) seguido del estado en marshal comprimido con zlib. marshal
+maneja listas de int / float en C, así que guardar y restaurar son rápidos;
+a cambio el checkpoint solo se lee con la misma versión de marshal. El hash
+evita restaurar el checkpoint en otro programa.
+
+Al restaurar se revisa todo contra el programa cargado antes de tocar la
+VM (tamaños de globales y de cada frame contra su FrameLayout, IP y
+direcciones de retorno dentro del código, celdas int / float), así que un
+checkpoint truncado o ajeno falla con CheckpointError en restore() y no
+después, a media corrida.
+"""
+
+import zlib
+import struct
+import marshal
+import hashlib
+from typing import Any, Dict, List
+
+from .frame_layout import FRAME
+
+MAGIC = b'PTCK'
+VERSION = 1
+
+# magia, versión del formato, versión de marshal, sha256 del programa
+_HEADER = struct.Struct('<4sHH32s')
+
+# Cuádruplos entre checkpoints si no se da otro valor (CLI)
+DEFAULT_CHECKPOINT_EVERY = 1_000_000
+
+# Nivel de zlib: rápido, y las celdas en 0 se comprimen bien igual
+COMPRESSION_LEVEL = 1
+
+
+class CheckpointError(ValueError):
+    """El checkpoint no se puede leer o es de otro programa."""
+
+
+def program_digest(vm) -> bytes:
+    """sha256 de los cuádruplos y constantes de la VM (se calcula una vez)."""
+    digest = getattr(vm, '_program_digest', None)
+    if digest is None:
+        content = repr(([tuple(quad) for quad in vm.quadruples],
+                        sorted(vm.memory.constant_memory.items())))
+        digest = hashlib.sha256(content.encode('utf-8')).digest()
+        vm._program_digest = digest
+    return digest
+
+
+def _layouts(vm) -> Dict[str, Any]:
+    layouts = dict(vm.frame_layouts)
+    layouts['main'] = vm.memory.main_layout
+    return layouts
+
+
+def dump_state(vm) -> bytes:
+    """Serializa el estado de ejecución de la VM."""
+    memory = vm.memory
+    calls = [(layout.name, frame, ret) for layout, frame, ret
+             in zip(memory.layout_stack, memory.call_stack, memory.return_stack)]
+    state = (
+        vm.ip, vm.quad_count, vm.running,
+        memory.global_int, memory.global_float,
+        calls,
+        (memory.current_layout.name, memory.current_frame),
+        vm.pending_frames,
+    )
+    header = _HEADER.pack(MAGIC, VERSION, marshal.version, program_digest(vm))
+    return header + zlib.compress(marshal.dumps(state), COMPRESSION_LEVEL)
+
+
+def _cells(values: Any, size: int, what: str) -> List[Any]:
+    """Revisa que values sea una lista de size celdas int / float."""
+    if not isinstance(values, list) or len(values) != size:
+        raise CheckpointError(f"{what} no corresponde al programa")
+    if not all(type(value) in (int, float) for value in values):
+        raise CheckpointError(f"{what} tiene celdas que no son int / float")
+    # marshal.loads() ya creó listas nuevas: se usan tal cual
+    return values
+
+
+def _frame(layouts: Dict[str, Any], entry: Any):
+    """(nombre del layout, frame) del checkpoint -> (FrameLayout, frame) revisado."""
+    if not (isinstance(entry, tuple) and len(entry) == 2
+            and isinstance(entry[0], str) and entry[0] in layouts):
+        raise CheckpointError("Un frame del checkpoint no es de ninguna función del programa")
+    name, values = entry
+    layout = layouts[name]
+    return layout, _cells(values, layout.size, f"Frame de '{name}'")
+
+
+def _address(value: Any, vm, what: str) -> int:
+    if type(value) is not int or not 0 <= value <= len(vm.quadruples):
+        raise CheckpointError(f"{what} fuera del programa: {value!r}")
+    return value
+
+
+def load_state(vm, data: bytes) -> None:
+    """Pone en la VM el estado guardado por dump_state()."""
+    if len(data) < _HEADER.size:
+        raise CheckpointError("Checkpoint truncado")
+    magic, version, marshal_version, digest = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CheckpointError("No es un checkpoint de Patito")
+    if version != VERSION or marshal_version != marshal.version:
+        raise CheckpointError(f"Versión de checkpoint no soportada ({version}/{marshal_version})")
+    if digest != program_digest(vm):
+        raise CheckpointError("El checkpoint es de otro programa")
+    try:
+        state = marshal.loads(zlib.decompress(data[_HEADER.size:]))
+        ip, quad_count, running, global_int, global_float, calls, current, pending = state
+    except (ValueError, EOFError, TypeError, zlib.error) as e:
+        raise CheckpointError(f"Checkpoint dañado: {e}") from None
+
+    # Primero se revisa todo; la VM solo se toca si el checkpoint es válido
+    layouts = _layouts(vm)
+    memory = vm.memory
+    ip = _address(ip, vm, "IP")
+    if type(quad_count) is not int or quad_count < 0 or not isinstance(running, bool):
+        raise CheckpointError("Contadores de la corrida dañados")
+    global_int = _cells(global_int, len(memory.global_int), "Globales int")
+    global_float = _cells(global_float, len(memory.global_float), "Globales float")
+    if not isinstance(calls, list) or len(calls) > vm.max_depth:
+        raise CheckpointError("Stack de llamadas dañado o más hondo que max_depth")
+    stack = []
+    for call in calls:
+        if not isinstance(call, tuple) or len(call) != 3:
+            raise CheckpointError("Stack de llamadas dañado")
+        layout, frame = _frame(layouts, call[:2])
+        stack.append((layout, frame, _address(call[2], vm, "Dirección de retorno")))
+    current_layout, current_frame = _frame(layouts, current)
+    # Un frame de ERA todavía no sabe su función: tiene que medir como alguna
+    frame_sizes = {layout.size for layout in vm.frame_layouts.values()}
+    if not isinstance(pending, list):
+        raise CheckpointError("Frames pendientes dañados")
+    for frame in pending:
+        if not isinstance(frame, list) or len(frame) not in frame_sizes:
+            raise CheckpointError("Un frame pendiente de ERA no mide como ningún frame del programa")
+        _cells(frame, len(frame), "Frame pendiente de ERA")
+
+    memory.reset()
+    # Las globales se reemplazan en sitio: los motores tienen ligadas las listas
+    memory.global_int[:] = global_int
+    memory.global_float[:] = global_float
+    for layout, frame, ret in stack:
+        memory.layout_stack.append(layout)
+        memory.call_stack.append(frame)
+        memory.return_stack.append(ret)
+    memory.current_layout = current_layout
+    memory.current_frame = current_frame
+    memory.segments[FRAME] = current_frame
+
+    vm.pending_frames[:] = pending
+    vm.ip = ip
+    vm.quad_count = quad_count
+    vm.running = running
@@ -0,0 +1,164 @@
+"""
+Hooks de Depuración y Trazado de la Máquina Virtual Patito
+
+VirtualMachine.add_hook(evento, función) registra una función que se llama
+en cada evento de la corrida:
+
+    'quad'    hook(vm, ip)                    antes de cada cuádruplo
+    'call'    hook(vm, función)               al entrar a una función (el
+                                              frame ya trae los parámetros)
+    'return'  hook(vm, función, valor)        al regresar de una función
+                                              (valor None en ENDFUNC)
+    'print'   hook(vm, texto)                 antes de escribir un print
+    'write'   hook(vm, ip, dirección, valor)  después de escribir una
+                                              dirección (aritmética,
+                                              relacionales, asignación y el
+                                              valor de retorno)
+
+El loop se especializa en execute(): sin hooks la VM corre su motor de
+siempre, sin ninguna revisión por cuádruplo. Con hooks, HookedCode toma las
+closures del motor 'threaded' y envuelve solo las instrucciones que le
+interesan a algún hook registrado (p.ej. con un hook 'call' solo los
+GOSUB); las demás corren igual que en 'threaded'. El código envuelto se
+guarda y se reusa mientras no cambien los hooks.
+
+Las direcciones de 'write' son las virtuales del .obj (las del cuádruplo),
+no las posiciones del frame plano.
+"""
+
+from typing import Callable, Dict, List, Tuple
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_PRINT, OP_PRINT_STR, OP_GOSUB, OP_RETURN, OP_ENDFUNC,
+    BINARY_OPS, OPCODES,
+)
+from .vm_threaded import ThreadedCode, _Halt
+
+HOOK_EVENTS = ('quad', 'call', 'return', 'print', 'write')
+
+_WRITING_OPCODES = frozenset(OPCODES[name] for name in BINARY_OPS) | {OP_ASSIGN}
+
+HookKey = Tuple[Tuple[str, Tuple[Callable, ...]], ...]
+
+
+def hook_key(hooks: Dict[str, List[Callable]]) -> HookKey:
+    """Identidad de un conjunto de hooks (para saber si hay que re-especializar)."""
+    return tuple((event, tuple(hooks[event])) for event in HOOK_EVENTS if hooks.get(event))
+
+
+def _call_all(callbacks: Tuple[Callable, ...]) -> Callable:
+    """Una función que llama a todos los callbacks con los mismos argumentos."""
+    if len(callbacks) == 1:
+        return callbacks[0]
+
+    def call_all(*args):
+        for callback in callbacks:
+            callback(*args)
+    return call_all
+
+
+class HookedCode:
+    """
+    Programa de una VM compilado a closures con los hooks ya ligados.
+
+    Attributes:
+        key: hook_key() de los hooks con los que se armó
+        code: Closure por cuádruplo; cada una regresa el siguiente IP
+    """
+
+    def __init__(self, vm, hooks: Dict[str, List[Callable]]):
+        self.vm = vm
+        self.key = hook_key(hooks)
+        base = vm._threaded.code if vm._threaded is not None else ThreadedCode(vm).code
+        bound = {event: _call_all(callbacks) for event, callbacks in self.key}
+        self.code: List[Callable[[], int]] = [
+            self._wrap(index, instr, handler, bound)
+            for index, (instr, handler) in enumerate(zip(vm.code, base))
+        ]
+
+    def _wrap(self, index: int, instr, handler: Callable[[], int],
+              bound: Dict[str, Callable]) -> Callable[[], int]:
+        """Envuelve handler con los hooks que le tocan a la instrucción."""
+        op, a, b, c, d, e, f = instr
+        vm = self.vm
+        segs = vm.memory.segments
+
+        on_write = bound.get('write')
+        if on_write is not None and (op in _WRITING_OPCODES or (op == OP_RETURN and e is not None)):
+            address = vm.quadruples[index][3]
+            inner_write = handler
+
+            def write():
+                nxt = inner_write()
+                on_write(vm, index, address, segs[e][f])
+                return nxt
+            handler = write
+
+        on_print = bound.get('print')
+        if on_print is not None and op == OP_PRINT:
+            inner_print = handler
+
+            def print_value():
+                on_print(vm, str(segs[a][b]))
+                return inner_print()
+            handler = print_value
+        elif on_print is not None and op == OP_PRINT_STR:
+            inner_string = handler
+
+            def print_string():
+                on_print(vm, a)
+                return inner_string()
+            handler = print_string
+
+        on_call = bound.get('call')
+        if on_call is not None and op == OP_GOSUB:
+            inner_call = handler
+            name = a.name
+
+            def call():
+                nxt = inner_call()
+                on_call(vm, name)
+                return nxt
+            handler = call
+
+        on_return = bound.get('return')
+        if on_return is not None and op in (OP_RETURN, OP_ENDFUNC):
+            inner_return = handler
+            memory = vm.memory
+            returns_value = op == OP_RETURN
+
+            def ret():
+                name = memory.current_layout.name
+                value = segs[a][b] if returns_value else None
+                nxt = inner_return()
+                on_return(vm, name, value)
+                return nxt
+            handler = ret
+
+        on_quad = bound.get('quad')
+        if on_quad is not None:
+            inner_quad = handler
+
+            def quad():
+                on_quad(vm, index)
+                return inner_quad()
+            handler = quad
+
+        return handler
+
+    def run(self) -> None:
+        """Ejecuta desde el cuádruplo 0 hasta END, contando cuádruplos."""
+        vm = self.vm
+        code = self.code
+        ip = 0
+        count = 0
+        try:
+            while True:
+                count += 1
+                ip = code[ip]()
+        except _Halt as halt:
+            ip = halt.args[0]
+            vm.running = False
+        finally:
+            vm.ip = ip
+            vm.quad_count = count
@@ -0,0 +1,452 @@
+"""
+Ejecución por carriles de la Máquina Virtual Patito
+
+Corre un mismo .obj sobre N vectores de entrada a la vez. Cada carril
+(lane) es una corrida independiente con sus propias globales iniciales;
+cada celda de memoria es un vector de NumPy con un valor por carril:
+
+- Globales: arreglos (celdas, carriles) int64 y float64
+- Frames: dos stacks (celdas, carriles), uno int64 y uno float64, con la
+  base y el tope del frame actual de cada carril en vectores. El frame de
+  un carril es el tramo [base, base + celdas) de su columna.
+- Llamadas: direcciones de retorno, bases de los llamadores y frames
+  pendientes de ERA en arreglos (profundidad, carriles)
+
+Cada carril tiene su IP. En cada paso se ejecuta el cuádruplo del IP más
+chico, como una operación vectorial sobre los carriles que están en él
+(estilo SIMT): un GOTOF manda a cada carril por su lado según su máscara
+y los carriles se vuelven a juntar cuando llegan al mismo cuádruplo. Ir
+primero por el IP más chico deja que los carriles atrasados alcancen a
+los demás en el punto donde se unen las ramas (el código de un if o de
+un ciclo siempre salta hacia adelante al salir). La corrida termina
+cuando todos los carriles llegaron a END o se detuvieron.
+
+Un error (división por cero, profundidad de llamadas, presupuesto de
+cuádruplos) detiene solo a su carril.
+
+La memoria es tipada como la del motor 'numpy' (ver vm_numpy): un int
+escrito en una variable float se guarda como float y '/' es entera solo
+entre operandos int. La aritmética int64 da la vuelta en complemento a
+dos y la float64 llega a inf.
+
+Las entradas son las globales iniciales de cada carril, en un CSV (una
+fila por carril, encabezado con nombres de globales o direcciones) o un
+.npy (arreglo estructurado con un campo por global, o 2D con una columna
+por global en el orden en que se declararon).
+"""
+
+import csv
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_PLUS, OP_MINUS, OP_MUL, OP_DIV, OP_DIV_II, OP_DIV_FF,
+    OP_GT, OP_LT, OP_NEQ, OP_GOTO, OP_GOTOF, OP_PRINT, OP_PRINT_STR,
+    OP_ERA, OP_PARAM, OP_GOSUB, OP_RETURN, OP_ENDFUNC, OP_END,
+)
+from .frame_layout import CallDepthError, DEFAULT_MAX_DEPTH
+from .vm_numpy import (
+    np, require_numpy, retype_code, typed_sizes, _typed_array,
+    GLOBAL_INT, GLOBAL_FLOAT, FRAME_INT, FRAME_FLOAT, CONST_INT, CONST_FLOAT,
+)
+from .batch_runner import EXIT_OK, EXIT_ERROR, EXIT_LIMIT
+
+SEGMENT_SIZE = 1000
+
+# Filas iniciales de los stacks de frames y de llamadas (crecen al doble)
+INITIAL_STACK_ROWS = 256
+INITIAL_CALL_ROWS = 64
+
+# Operaciones binarias que no pueden fallar, como ufuncs
+_UFUNCS = {}
+if np is not None:
+    _UFUNCS = {
+        OP_PLUS: np.add,
+        OP_MINUS: np.subtract,
+        OP_MUL: np.multiply,
+        OP_LT: np.less,
+        OP_GT: np.greater,
+        OP_NEQ: np.not_equal,
+    }
+
+
+def _grown(array, rows: int):
+    """El arreglo con al menos `rows` filas (al doble); las nuevas en 0."""
+    if rows <= len(array):
+        return array
+    size = len(array)
+    while size < rows:
+        size *= 2
+    grown = np.zeros((size,) + array.shape[1:], dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+
+def resolve_column(column: str, global_names: Dict[str, int]) -> int:
+    """Dirección de una columna de entrada: nombre de global o dirección."""
+    if column in global_names:
+        return global_names[column]
+    if column.isdigit() and int(column) // SEGMENT_SIZE in (GLOBAL_INT, GLOBAL_FLOAT):
+        return int(column)
+    raise ValueError(f"Columna desconocida: '{column}' (no es una global del programa)")
+
+
+def _keep(value, mask):
+    """Los valores de los carriles que siguen (un escalar vale para todos)."""
+    return value if np.ndim(value) == 0 else value[mask]
+
+
+class LaneMachine:
+    """
+    Un programa .obj listo para correr sobre varios carriles.
+
+    Args:
+        obj_data: Diccionario de un .obj (ver ObjGenerator)
+        lanes: Número de carriles
+        max_depth: Llamadas activas permitidas por carril
+        max_quads: Presupuesto de cuádruplos por carril (None: sin límite)
+
+    Attributes:
+        steps: Pasos vectoriales de la última corrida; la ocupación media
+               es quads totales / (steps * lanes)
+    """
+
+    def __init__(self, obj_data: dict, lanes: int, max_depth: int = DEFAULT_MAX_DEPTH,
+                 max_quads: Optional[int] = None):
+        require_numpy()
+        from .virtual_machine import VirtualMachine
+
+        if lanes < 1:
+            raise ValueError(f"Se necesita al menos un carril: {lanes}")
+        # Sin especializar divisiones: el análisis de rangos no conoce las
+        # entradas de los carriles, así que toda división revisa el cero
+        vm = VirtualMachine(obj_data, optimize=False, max_depth=max_depth)
+        self.lanes = lanes
+        self.max_depth = max_depth
+        self.max_quads = max_quads
+        self.global_names: Dict[str, int] = dict(obj_data.get('globals', {}))
+        self.code = retype_code(vm.code, vm.region_layouts)
+        self.main_sizes = typed_sizes(vm.memory.main_layout)
+        self.global_sizes = (len(vm.memory.global_int), len(vm.memory.global_float))
+        self.consts = {
+            CONST_INT: _typed_array(vm.memory.segments[CONST_INT], np.int64),
+            CONST_FLOAT: _typed_array(vm.memory.segments[CONST_FLOAT], np.float64),
+        }
+        self.steps = 0
+
+    def run(self, inputs: Optional[Dict[Any, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Corre todos los carriles desde el cuádruplo 0 hasta END.
+
+        Args:
+            inputs: {global (nombre o dirección): valores, uno por carril}
+
+        Returns:
+            list: Un registro por carril: {'lane', 'status', 'exit_code',
+            'error', 'output', 'quads', 'globals'}
+        """
+        lanes = self.lanes
+        self.gi = np.zeros((self.global_sizes[0], lanes), dtype=np.int64)
+        self.gf = np.zeros((self.global_sizes[1], lanes), dtype=np.float64)
+        for column, values in (inputs or {}).items():
+            address = column if isinstance(column, int) else resolve_column(str(column), self.global_names)
+            values = np.asarray(values)
+            if values.shape != (lanes,):
+                raise ValueError(f"La columna '{column}' trae {values.size} valores "
+                                 f"para {lanes} carriles")
+            segment, offset = divmod(address, SEGMENT_SIZE)
+            if segment not in (GLOBAL_INT, GLOBAL_FLOAT) or offset >= self.global_sizes[segment - 1]:
+                raise ValueError(f"La dirección {address} no es de una global del programa")
+            (self.gi if segment == GLOBAL_INT else self.gf)[offset] = values
+
+        self.status = ['ok'] * lanes
+        self.errors: List[Optional[str]] = [None] * lanes
+        self.outputs: List[List[str]] = [[] for _ in range(lanes)]
+        self.count = np.zeros(lanes, dtype=np.int64)
+        with np.errstate(all='ignore'):
+            self._run()
+
+        finals = {}
+        for name, address in self.global_names.items():
+            segment, offset = divmod(address, SEGMENT_SIZE)
+            finals[name] = (self.gi if segment == GLOBAL_INT else self.gf)[offset].tolist()
+        quads = self.count.tolist()
+        exit_codes = {'ok': EXIT_OK, 'error': EXIT_ERROR, 'timeout': EXIT_LIMIT}
+        return [{
+            'lane': lane,
+            'status': self.status[lane],
+            'exit_code': exit_codes[self.status[lane]],
+            'error': self.errors[lane],
+            'output': ''.join(self.outputs[lane]),
+            'quads': quads[lane],
+            'globals': {name: values[lane] for name, values in finals.items()},
+        } for lane in range(lanes)]
+
+    def _read(self, segment: int, offset: int, lanes):
+        if segment == FRAME_INT:
+            return self.si[self.base_i[lanes] + offset, lanes]
+        if segment == FRAME_FLOAT:
+            return self.sf[self.base_f[lanes] + offset, lanes]
+        if segment == GLOBAL_INT:
+            return self.gi[offset, lanes]
+        if segment == GLOBAL_FLOAT:
+            return self.gf[offset, lanes]
+        return self.consts[segment][offset]
+
+    def _write(self, segment: int, offset: int, lanes, value) -> None:
+        if segment == FRAME_INT:
+            self.si[self.base_i[lanes] + offset, lanes] = value
+        elif segment == FRAME_FLOAT:
+            self.sf[self.base_f[lanes] + offset, lanes] = value
+        elif segment == GLOBAL_INT:
+            self.gi[offset, lanes] = value
+        else:
+            self.gf[offset, lanes] = value
+
+    def _stop(self, lanes, status: str, message: str) -> None:
+        """Detiene los carriles con un error."""
+        for lane in lanes.tolist():
+            self.status[lane] = status
+            self.errors[lane] = message
+        self.ip[lanes] = self.done
+
+    def _run(self) -> None:
+        code = self.code
+        lanes = self.lanes
+        count = self.count
+        outputs = self.outputs
+        max_quads = self.max_quads
+        max_depth = self.max_depth
+        done = self.done = len(code)
+
+        size_i, size_f = self.main_sizes
+        self.si = np.zeros((max(INITIAL_STACK_ROWS, size_i), lanes), dtype=np.int64)
+        self.sf = np.zeros((max(INITIAL_STACK_ROWS, size_f), lanes), dtype=np.float64)
+        self.base_i = np.zeros(lanes, dtype=np.int64)
+        self.base_f = np.zeros(lanes, dtype=np.int64)
+        top_i = np.full(lanes, size_i, dtype=np.int64)
+        top_f = np.full(lanes, size_f, dtype=np.int64)
+
+        # Llamadas activas y frames de ERA que esperan su GOSUB, por carril
+        depth = np.zeros(lanes, dtype=np.int64)
+        returns = np.zeros((INITIAL_CALL_ROWS, lanes), dtype=np.int64)
+        calls_i = np.zeros((INITIAL_CALL_ROWS, lanes), dtype=np.int64)
+        calls_f = np.zeros((INITIAL_CALL_ROWS, lanes), dtype=np.int64)
+        pending = np.zeros(lanes, dtype=np.int64)
+        pending_i = np.zeros((INITIAL_CALL_ROWS, lanes), dtype=np.int64)
+        pending_f = np.zeros((INITIAL_CALL_ROWS, lanes), dtype=np.int64)
+
+        ip = self.ip = np.zeros(lanes, dtype=np.int64)
+        read, write = self._read, self._write
+        steps = 0
+
+        while True:
+            pc = int(ip.min())
+            if pc >= done:
+                break
+            active = np.flatnonzero(ip == pc)
+            steps += 1
+
+            if max_quads is not None:
+                spent = count[active] >= max_quads
+                if spent.any():
+                    self._stop(active[spent], 'timeout',
+                               f"Presupuesto de instrucciones agotado ({max_quads} cuádruplos)")
+                    active = active[~spent]
+                    if not active.size:
+                        continue
+
+            op, a, b, c, d, e, f = code[pc]
+            count[active] += 1
+            ip[active] = pc + 1
+
+            if op in _UFUNCS:
+                write(e, f, active, _UFUNCS[op](read(a, b, active), read(c, d, active)))
+
+            elif op == OP_ASSIGN:
+                write(e, f, active, read(a, b, active))
+
+            elif op == OP_GOTOF:
+                condition = read(a, b, active)
+                if np.ndim(condition) == 0:
+                    if condition == 0:
+                        ip[active] = f
+                else:
+                    ip[active[condition == 0]] = f
+
+            elif op == OP_GOTO:
+                ip[active] = f
+
+            elif op in (OP_DIV, OP_DIV_II, OP_DIV_FF):
+                left, right = read(a, b, active), read(c, d, active)
+                zero = np.asarray(right == 0)
+                if zero.any():
+                    if zero.ndim == 0:
+                        self._stop(active, 'error', "División por cero")
+                        continue
+                    self._stop(active[zero], 'error', "División por cero")
+                    keep = ~zero
+                    active, left, right = active[keep], _keep(left, keep), right[keep]
+                if op == OP_DIV_FF:
+                    write(e, f, active, np.true_divide(left, right))
+                else:
+                    write(e, f, active, np.floor_divide(left, right))
+
+            elif op == OP_PARAM:
+                # c = segmento tipado del parámetro, f = su índice en el frame
+                slot = pending[active] - 1
+                if c == FRAME_INT:
+                    self.si[pending_i[slot, active] + f, active] = read(a, b, active)
+                else:
+                    self.sf[pending_f[slot, active] + f, active] = read(a, b, active)
+
+            elif op == OP_ERA:
+                # Apartar el frame arriba del stack de cada carril (b, c = celdas)
+                slot = pending[active]
+                rows = int(slot.max()) + 1
+                pending_i = _grown(pending_i, rows)
+                pending_f = _grown(pending_f, rows)
+                pending_i[slot, active] = top_i[active]
+                pending_f[slot, active] = top_f[active]
+                pending[active] = slot + 1
+                for cells, top, name in ((b, top_i, 'si'), (c, top_f, 'sf')):
+                    if cells:
+                        start = top[active]
+                        stack = _grown(getattr(self, name), int(start.max()) + cells)
+                        setattr(self, name, stack)
+                        stack[start[:, None] + np.arange(cells), active[:, None]] = 0
+                        top[active] = start + cells
+
+            elif op == OP_GOSUB:
+                deep = depth[active] >= max_depth
+                if deep.any():
+                    self._stop(active[deep], 'error', str(CallDepthError(max_depth, a.name)))
+                    active = active[~deep]
+                level = depth[active]
+                if active.size:
+                    rows = int(level.max()) + 1
+                    returns = _grown(returns, rows)
+                    calls_i = _grown(calls_i, rows)
+                    calls_f = _grown(calls_f, rows)
+                returns[level, active] = pc + 1
+                calls_i[level, active] = self.base_i[active]
+                calls_f[level, active] = self.base_f[active]
+                depth[active] = level + 1
+                slot = pending[active] - 1
+                pending[active] = slot
+                self.base_i[active] = pending_i[slot, active]
+                self.base_f[active] = pending_f[slot, active]
+                ip[active] = f
+
+            elif op == OP_RETURN or op == OP_ENDFUNC:
+                if op == OP_RETURN:
+                    value = read(a, b, active)
+                empty = depth[active] == 0
+                if empty.any():
+                    self._stop(active[empty], 'error', "Stack de llamadas vacío")
+                    if op == OP_RETURN:
+                        value = _keep(value, ~empty)
+                    active = active[~empty]
+                # Liberar el frame: es el último apartado
+                top_i[active] = self.base_i[active]
+                top_f[active] = self.base_f[active]
+                level = depth[active] - 1
+                depth[active] = level
+                self.base_i[active] = calls_i[level, active]
+                self.base_f[active] = calls_f[level, active]
+                ip[active] = returns[level, active]
+                if op == OP_RETURN and e is not None:
+                    write(e, f, active, value)
+
+            elif op == OP_PRINT:
+                value = read(a, b, active)
+                if np.ndim(value) == 0:
+                    text = str(value.item())
+                    for lane in active.tolist():
+                        outputs[lane].append(text)
+                else:
+                    for lane, item in zip(active.tolist(), value.tolist()):
+                        outputs[lane].append(str(item))
+
+            elif op == OP_PRINT_STR:
+                for lane in active.tolist():
+                    outputs[lane].append(a)
+
+            elif op == OP_END:
+                ip[active] = done
+
+            else:
+                # OP_ERROR: el cuádruplo no se pudo decodificar
+                self._stop(active, 'error', str(a))
+
+        self.steps = steps
+
+
+def load_inputs(path: str, global_names: Dict[str, int]) -> Dict[int, Any]:
+    """
+    Lee las globales iniciales de cada carril.
+
+    Args:
+        path: .csv (encabezado con nombres de globales o direcciones, una
+              fila por carril) o .npy (arreglo estructurado con un campo
+              por global, o 2D con una columna por global en el orden de
+              declaración)
+        global_names: {nombre: dirección} de las globales ('globals' del .obj)
+
+    Returns:
+        dict: {dirección: arreglo con un valor por carril}
+    """
+    require_numpy()
+    if Path(path).suffix.lower() == '.npy':
+        data = np.load(path, allow_pickle=False)
+        if data.dtype.names:
+            columns = {name: data[name] for name in data.dtype.names}
+        elif data.ndim == 2:
+            names = list(global_names)      # orden de declaración
+            if data.shape[1] > len(names):
+                raise ValueError(f"El .npy trae {data.shape[1]} columnas y el "
+                                 f"programa declara {len(names)} globales")
+            columns = {names[index]: data[:, index] for index in range(data.shape[1])}
+        else:
+            raise ValueError("El .npy debe ser estructurado o de 2 dimensiones (carriles, globales)")
+        return {resolve_column(name, global_names): values for name, values in columns.items()}
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        raise ValueError(f"'{path}' está vacío")
+    header, rows = [name.strip() for name in rows[0]], [row for row in rows[1:] if row]
+    addresses = [resolve_column(name, global_names) for name in header]
+    columns = {}
+    for index, address in enumerate(addresses):
+        integer = address // SEGMENT_SIZE == GLOBAL_INT
+        try:
+            values = [int(row[index]) if integer else float(row[index]) for row in rows]
+        except (ValueError, IndexError):
+            raise ValueError(f"Valor inválido en la columna '{header[index]}'") from None
+        columns[address] = np.array(values, dtype=np.int64 if integer else np.float64)
+    return columns
+
+
+def input_lanes(inputs: Dict[int, Any]) -> int:
+    """Número de carriles de unas entradas (todas las columnas iguales)."""
+    sizes = {len(values) for values in inputs.values()}
+    if len(sizes) != 1:
+        raise ValueError("Las columnas de entrada deben tener el mismo número de valores")
+    return sizes.pop()
+
+
+def run_lanes(obj_data: dict, inputs: Dict[Any, Any], **options) -> Tuple[List[Dict[str, Any]], LaneMachine]:
+    """
+    Corre un programa sobre los carriles que dan las entradas.
+
+    Args:
+        obj_data: Diccionario de un .obj
+        inputs: {global (nombre o dirección): valores, uno por carril}
+        **options: max_depth / max_quads de LaneMachine
+
+    Returns:
+        tuple: (registros por carril, la LaneMachine que los corrió)
+    """
+    machine = LaneMachine(obj_data, input_lanes(inputs), **options)
+    return machine.run(inputs), machine
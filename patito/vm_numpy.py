@@ -0,0 +1,388 @@
+"""
+Memoria tipada con NumPy para la Máquina Virtual Patito (motor 'numpy')
+
+Con los otros motores cada celda es un int o float de Python en una lista,
+y el tipo solo lo dice el rango de la dirección. Este motor guarda cada
+celda en un arreglo del tipo de su segmento:
+
+- Globales: un arreglo int64 y uno float64 (memory.global_int / global_float)
+- Constantes: un arreglo int64 y uno float64
+- Frames: dos stacks de celdas, uno int64 y uno float64. Cada activación
+  es un tramo [base, base + celdas) de cada stack; ERA lo aparta arriba
+  del stack y RETURN / ENDFUNC lo libera. segs[3] / segs[4] son vistas al
+  tramo int / float del frame actual, así que no hay una lista por
+  llamada ni free lists, y cada celda ocupa 8 bytes.
+
+Al cargar, los operandos (FRAME, posición en el frame plano) se reescriben
+a (3, índice int) o (4, índice float) con el layout de su región.
+
+Semántica tipada (puede diferir del intérprete, que guarda lo que le den):
+- Un int escrito en una variable float se guarda como float (imprime 3.0)
+- '/' es división entera solo si los dos operandos son de segmento int
+- Aritmética int64 / float64 con desbordamiento según `overflow`:
+    'error' - desbordar int64 (o float64 a infinito) es un
+              ArithmeticOverflowError (default)
+    'wrap'  - int64 da la vuelta en complemento a dos; float64 llega a inf
+
+Las constantes que no caben en int64 se rechazan al cargar.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_PLUS, OP_MINUS, OP_MUL, OP_DIV, OP_DIV_II, OP_DIV_FF,
+    OP_GT, OP_LT, OP_NEQ, OP_GOTO, OP_GOTOF, OP_PRINT, OP_PRINT_STR,
+    OP_ERA, OP_PARAM, OP_GOSUB, OP_RETURN, OP_ENDFUNC, OP_END, BINARY_OPS, OPCODES,
+)
+from .frame_layout import FRAME, CallDepthError, FrameLayout
+
+try:
+    import numpy as np
+except ImportError:     # dependencia opcional: solo la necesita este motor
+    np = None
+
+# Modos de desbordamiento de la aritmética tipada
+OVERFLOW_MODES = ('error', 'wrap')
+
+# Segmentos de la memoria tipada (los de frame ya reescritos)
+GLOBAL_INT, GLOBAL_FLOAT = 1, 2
+FRAME_INT, FRAME_FLOAT = 3, 4
+CONST_INT, CONST_FLOAT = 7, 8
+INT_SEGMENTS = (GLOBAL_INT, FRAME_INT, CONST_INT)
+
+# Celdas iniciales de cada stack de frames (crece al doble al llenarse)
+INITIAL_STACK_SLOTS = 4096
+
+_BINARY_OPCODES = frozenset(OPCODES[name] for name in BINARY_OPS)
+
+
+class ArithmeticOverflowError(RuntimeError):
+    """Una operación int64 / float64 se desbordó con overflow='error'."""
+
+
+def require_numpy() -> None:
+    """ImportError con instrucciones si NumPy no está instalado."""
+    if np is None:
+        raise ImportError("El motor 'numpy' necesita NumPy: pip install numpy")
+
+
+def typed_sizes(layout: FrameLayout) -> Tuple[int, int]:
+    """(celdas int, celdas float) de un frame."""
+    sizes = layout.sizes
+    return sizes[3] + sizes[5], sizes[4] + sizes[6]
+
+
+def typed_slot(layout: FrameLayout, position: int) -> Tuple[int, int]:
+    """
+    Segmento tipado e índice de una posición del frame plano.
+
+    El frame plano es [local int | local float | temp int | temp float];
+    el tramo int es [local int | temp int] y el float [local float | temp float].
+    """
+    local_int, local_float, temp_int = layout.sizes[3], layout.sizes[4], layout.sizes[5]
+    if position < local_int:
+        return FRAME_INT, position
+    if position < local_int + local_float:
+        return FRAME_FLOAT, position - local_int
+    if position < local_int + local_float + temp_int:
+        return FRAME_INT, position - local_float
+    return FRAME_FLOAT, position - local_int - temp_int
+
+
+def _typed(layout: FrameLayout, segment: Any, offset: Any):
+    if segment == FRAME:
+        return typed_slot(layout, offset)
+    return segment, offset
+
+
+def _typed_division(op: int, left: int, right: int, wrap: bool = False) -> int:
+    """
+    Opcode de una división según el tipo de sus operandos. specialize_divisions()
+    elige DIV_II / DIV_FF por los valores que ve; aquí manda el segmento:
+    int / int es entera y cualquier otra es real. Las DIV enteras conservan
+    su revisión de división por cero y las reales pasan a DIV_FF, que en
+    este motor siempre revisa.
+
+    Con wrap=True las DIV_II también vuelven a DIV: el análisis de rangos
+    supone enteros sin límite, y un divisor que probó distinto de cero
+    puede dar la vuelta a 0 en int64.
+    """
+    integer = left in INT_SEGMENTS and right in INT_SEGMENTS
+    if op == OP_DIV or wrap:
+        return OP_DIV if integer else OP_DIV_FF
+    return OP_DIV_II if integer else OP_DIV_FF
+
+
+def _typed_array(values: List[Any], dtype) -> Any:
+    """Arreglo de un segmento de constantes (los huecos quedan en 0)."""
+    array = np.zeros(len(values), dtype=dtype)
+    for index, value in enumerate(values):
+        if value is not None:
+            try:
+                array[index] = value
+            except OverflowError:
+                raise ValueError(f"La constante {value} no cabe en int64") from None
+    return array
+
+
+def retype_code(code: List, regions: List[tuple], wrap: bool = False) -> List[tuple]:
+    """
+    Copia del código con operandos de frame tipados (ver typed_slot()) y
+    los tamaños tipados de cada llamada en ERA / GOSUB (con wrap=True las
+    divisiones enteras quedan revisadas, ver _typed_division()):
+
+        ERA:    a = CallPlan    b, c = celdas int, float
+        PARAM:  a, b = argumento    c = segmento tipado    f = índice
+        GOSUB:  a = CallPlan    b, c = celdas int, float    f = quad_start
+    """
+    code = list(code)
+    for start, end, layout in regions:
+        for index in range(start, end):
+            op, a, b, c, d, e, f = code[index]
+            if op in _BINARY_OPCODES:
+                a, b = _typed(layout, a, b)
+                c, d = _typed(layout, c, d)
+                e, f = _typed(layout, e, f)
+            elif op == OP_ASSIGN or op == OP_RETURN:
+                a, b = _typed(layout, a, b)
+                e, f = _typed(layout, e, f)
+            elif op in (OP_GOTOF, OP_PRINT, OP_PARAM):
+                a, b = _typed(layout, a, b)
+            else:
+                continue
+            code[index] = (op, a, b, c, d, e, f)
+
+    # PARAM escribe en el frame de la llamada pendiente: tipar su
+    # posición con el layout de la función llamada
+    pending = []
+    for index, (op, a, b, c, d, e, f) in enumerate(code):
+        if op == OP_ERA:
+            pending.append(a)
+            code[index] = (op, a, *typed_sizes(a.layout), 0, 0, 0)
+        elif op == OP_PARAM:
+            segment, slot = typed_slot(pending[-1].layout, f)
+            code[index] = (op, a, b, segment, 0, 0, slot)
+        elif op == OP_GOSUB:
+            pending.pop()
+            code[index] = (op, a, *typed_sizes(a.layout), 0, 0, f)
+        elif op in (OP_ENDFUNC, OP_END):
+            pending.clear()
+        elif op in (OP_DIV, OP_DIV_II, OP_DIV_FF):
+            code[index] = (_typed_division(op, a, c, wrap), a, b, c, d, e, f)
+    return code
+
+
+class NumpyCode:
+    """
+    Programa con memoria tipada para una VirtualMachine.
+
+    Reemplaza las globales de la VM por arreglos (reset() las limpia en
+    sitio) y lleva el stack de llamadas en memory.return_stack y
+    memory.current_layout, igual que el intérprete, así que el muestreo
+    del stack funciona sin cambios.
+    """
+
+    def __init__(self, vm, overflow: str = 'error'):
+        require_numpy()
+        if overflow not in OVERFLOW_MODES:
+            raise ValueError(f"Modo de desbordamiento desconocido: {overflow} "
+                             f"(opciones: {', '.join(OVERFLOW_MODES)})")
+        self.vm = vm
+        self.overflow = overflow
+        memory = vm.memory
+
+        memory.global_int = np.zeros(len(memory.global_int), dtype=np.int64)
+        memory.global_float = np.zeros(len(memory.global_float), dtype=np.float64)
+        memory.segments[GLOBAL_INT] = memory.global_int
+        memory.segments[GLOBAL_FLOAT] = memory.global_float
+
+        # Tabla de segmentos propia: 3 / 4 son las vistas del frame actual
+        self.segs: List[Any] = [None] * (CONST_FLOAT + 1)
+        self.segs[GLOBAL_INT] = memory.global_int
+        self.segs[GLOBAL_FLOAT] = memory.global_float
+        self.segs[CONST_INT] = _typed_array(memory.segments[CONST_INT], np.int64)
+        self.segs[CONST_FLOAT] = _typed_array(memory.segments[CONST_FLOAT], np.float64)
+
+        self.ints = np.zeros(INITIAL_STACK_SLOTS, dtype=np.int64)
+        self.floats = np.zeros(INITIAL_STACK_SLOTS, dtype=np.float64)
+        self.code = retype_code(vm.code, vm.region_layouts, wrap=overflow == 'wrap')
+        # Celdas int / float de cada layout, para volver al frame del llamador
+        self.sizes: Dict[FrameLayout, Tuple[int, int]] = {
+            layout: typed_sizes(layout) for _, _, layout in vm.region_layouts}
+        for plan in vm.call_plans.values():
+            self.sizes[plan.layout] = typed_sizes(plan.layout)
+
+    def _grow(self, ints_needed: int, floats_needed: int) -> None:
+        """Agranda los stacks de frames (al doble) para que quepan las celdas."""
+        for name, needed in (('ints', ints_needed), ('floats', floats_needed)):
+            stack = getattr(self, name)
+            if needed > len(stack):
+                size = len(stack)
+                while size < needed:
+                    size *= 2
+                grown = np.zeros(size, dtype=stack.dtype)
+                grown[:len(stack)] = stack
+                setattr(self, name, grown)
+
+    def run(self) -> None:
+        """Ejecuta desde el cuádruplo 0 hasta END."""
+        errors = 'raise' if self.overflow == 'error' else 'ignore'
+        try:
+            with np.errstate(over=errors):
+                self._run()
+        except FloatingPointError as e:
+            raise ArithmeticOverflowError(
+                f"Desbordamiento en el cuádruplo {self.vm.ip}: {e}") from None
+
+    def _run(self) -> None:
+        vm = self.vm
+        memory = vm.memory
+        code = self.code
+        segs = self.segs
+        write = vm.output.write
+        returns = memory.return_stack
+        layouts = memory.layout_stack
+        calls = memory.call_stack       # bases int y float de cada llamador, planas
+        sizes = self.sizes
+        max_depth = memory.max_depth
+        pending: List[Tuple[int, int]] = []
+        ints = self.ints
+        floats = self.floats
+
+        # Frame de main al fondo de los stacks
+        layout = memory.main_layout
+        size_i, size_f = typed_sizes(layout)
+        if size_i > len(ints) or size_f > len(floats):
+            self._grow(size_i, size_f)
+            ints, floats = self.ints, self.floats
+        base_i = base_f = 0
+        top_i, top_f = size_i, size_f
+        ints[:size_i] = 0
+        floats[:size_f] = 0
+        segs[FRAME_INT] = ints[:size_i]
+        segs[FRAME_FLOAT] = floats[:size_f]
+        memory.current_layout = layout
+
+        ip = 0
+        count = 0
+        try:
+            while True:
+                op, a, b, c, d, e, f = code[ip]
+                ip += 1
+                count += 1
+
+                if op == OP_ASSIGN:
+                    segs[e][f] = segs[a][b]
+
+                elif op == OP_PLUS:
+                    segs[e][f] = segs[a][b] + segs[c][d]
+
+                elif op == OP_LT:
+                    segs[e][f] = 1 if segs[a][b] < segs[c][d] else 0
+
+                elif op == OP_GOTOF:
+                    if segs[a][b] == 0:
+                        ip = f
+
+                elif op == OP_GOTO:
+                    ip = f
+
+                elif op == OP_MINUS:
+                    segs[e][f] = segs[a][b] - segs[c][d]
+
+                elif op == OP_MUL:
+                    segs[e][f] = segs[a][b] * segs[c][d]
+
+                elif op == OP_GT:
+                    segs[e][f] = 1 if segs[a][b] > segs[c][d] else 0
+
+                elif op == OP_NEQ:
+                    segs[e][f] = 1 if segs[a][b] != segs[c][d] else 0
+
+                elif op == OP_DIV_II:
+                    segs[e][f] = segs[a][b] // segs[c][d]
+
+                elif op == OP_DIV_FF:
+                    val2 = segs[c][d]
+                    if val2 == 0:
+                        raise RuntimeError("División por cero")
+                    segs[e][f] = segs[a][b] / val2
+
+                elif op == OP_DIV:
+                    # Los dos operandos son int (ver _retype)
+                    val2 = segs[c][d]
+                    if val2 == 0:
+                        raise RuntimeError("División por cero")
+                    segs[e][f] = segs[a][b] // val2
+
+                elif op == OP_PARAM:
+                    if c == FRAME_INT:
+                        ints[pending[-1][0] + f] = segs[a][b]
+                    else:
+                        floats[pending[-1][1] + f] = segs[a][b]
+
+                elif op == OP_ERA:
+                    # Apartar el frame arriba de los stacks (b, c = celdas)
+                    new_i = top_i + b
+                    new_f = top_f + c
+                    if new_i > len(ints) or new_f > len(floats):
+                        self._grow(new_i, new_f)
+                        ints, floats = self.ints, self.floats
+                        segs[FRAME_INT] = ints[base_i:base_i + size_i]
+                        segs[FRAME_FLOAT] = floats[base_f:base_f + size_f]
+                    ints[top_i:new_i] = 0
+                    floats[top_f:new_f] = 0
+                    pending.append((top_i, top_f))
+                    top_i, top_f = new_i, new_f
+
+                elif op == OP_GOSUB:
+                    if len(returns) >= max_depth:
+                        raise CallDepthError(max_depth, a.name)
+                    calls.append(base_i)
+                    calls.append(base_f)
+                    layouts.append(memory.current_layout)
+                    returns.append(ip)
+                    base_i, base_f = pending.pop()
+                    size_i, size_f = b, c
+                    segs[FRAME_INT] = ints[base_i:base_i + size_i]
+                    segs[FRAME_FLOAT] = floats[base_f:base_f + size_f]
+                    memory.current_layout = a.layout
+                    ip = f
+
+                elif op == OP_RETURN or op == OP_ENDFUNC:
+                    if op == OP_RETURN:
+                        val = segs[a][b]
+                    if not returns:
+                        raise RuntimeError("Stack de llamadas vacío")
+                    # Liberar el frame: es el último apartado
+                    top_i, top_f = base_i, base_f
+                    base_f = calls.pop()
+                    base_i = calls.pop()
+                    layout = layouts.pop()
+                    size_i, size_f = sizes[layout]
+                    segs[FRAME_INT] = ints[base_i:base_i + size_i]
+                    segs[FRAME_FLOAT] = floats[base_f:base_f + size_f]
+                    memory.current_layout = layout
+                    ip = returns.pop()
+                    if op == OP_RETURN and e is not None:
+                        segs[e][f] = val
+
+                elif op == OP_PRINT:
+                    write(str(segs[a][b]))
+
+                elif op == OP_PRINT_STR:
+                    write(a)
+
+                elif op == OP_END:
+                    vm.running = False
+                    break
+
+                else:
+                    # OP_ERROR: el cuádruplo no se pudo decodificar
+                    raise RuntimeError(a)
+        except BaseException:
+            ip -= 1
+            raise
+        finally:
+            vm.ip = ip
+            vm.quad_count = count
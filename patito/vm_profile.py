@@ -0,0 +1,362 @@
+"""
+Perfilador de la Máquina Virtual Patito
+
+Con VirtualMachine(profile=True) el programa corre en un loop aparte,
+instrumentado, sobre las closures del motor 'threaded' (la misma semántica
+que el intérprete). El loop de 'interp' no se toca, así que sin perfilar no
+cuesta nada.
+
+El loop instrumentado solo cuenta ejecuciones por cuádruplo y toma el
+tiempo al entrar y salir de cada función; lo demás se calcula al final:
+- Por opcode: suma de los cuádruplos con ese opcode
+- Por función: cada cuádruplo se atribuye a la función cuyo rango
+  (quad_start hasta su ENDFUNC en la tabla de funciones del .obj) lo
+  contiene; main va del destino del GOTO inicial hasta END
+- Llamadas, cuádruplos y tiempo exclusivos (solo el cuerpo de la función)
+  e inclusivos (con todo lo que llama). En recursión el inclusivo cuenta
+  solo la llamada más externa, como cProfile
+- Profundidad máxima del stack de llamadas (main cuenta como 1) y, por
+  función, el máximo de activaciones vivas a la vez (sus frames)
+
+Para corridas largas está el muestreo (VirtualMachine(sample_rate=...)):
+SamplingProfiler no toca el loop; un hilo aparte despierta sample_rate
+veces por segundo y copia el stack de llamadas Patito. Los nombres salen
+de las direcciones de retorno del call_stack (el GOSUB del llamador cae en
+el rango quad_start de su función) y de la función actual; con 'pyjit' se
+leen de los frames de Python del código generado. El resultado se escribe
+en formato "collapsed" (main;f;g 12), el que leen flamegraph.pl y
+speedscope.
+"""
+
+import sys
+import json
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .quad_decoder import OP_GOSUB, OP_RETURN, OP_ENDFUNC, opcode_name
+from .vm_threaded import ThreadedCode, _Halt
+
+# Muestras por segundo si no se da otra tasa
+DEFAULT_SAMPLE_RATE = 1000
+
+# Dueño de los cuádruplos que no son de ninguna función (GOTO inicial,
+# copias muertas de los cuerpos)
+NO_FUNCTION = '<global>'
+
+# Samplers activos que bajaron el intervalo de cambio de hilo y el valor
+# que había antes del primero
+_switch_lock = threading.Lock()
+_switch_users = 0
+_saved_switch = 0.0
+
+
+def quad_owners(quadruples: List, functions: Dict[str, dict], main_start: int) -> List[str]:
+    """
+    Función dueña de cada cuádruplo según los rangos de quad_start.
+
+    Returns:
+        list: Nombre de función (o 'main' / NO_FUNCTION) por índice
+    """
+    owners = [NO_FUNCTION] * len(quadruples)
+    ranges = [(info.get('quad_start'), name, 'ENDFUNC') for name, info in functions.items()]
+    ranges.append((main_start, 'main', 'END'))
+    for start, name, terminator in ranges:
+        if not isinstance(start, int):
+            continue
+        index = start
+        while index < len(quadruples):
+            owners[index] = name
+            if quadruples[index][0] == terminator:
+                break
+            index += 1
+    return owners
+
+
+class _FunctionStats:
+    __slots__ = ('calls', 'max_active', 'quads_self', 'quads_total', 'time_self', 'time_total')
+
+    def __init__(self):
+        self.calls = 0
+        self.max_active = 0
+        self.quads_self = 0
+        self.quads_total = 0
+        self.time_self = 0.0
+        self.time_total = 0.0
+
+
+class ExecutionProfiler:
+    """
+    Ejecuta el programa de una VM contando cuádruplos y llamadas.
+
+    Attributes:
+        profile: Resultado de la última corrida (ver run()), o None
+    """
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.owners = quad_owners(vm.quadruples, vm.functions, vm._main_start())
+        self.handlers = None
+        self.profile = None
+
+    def prepare(self) -> None:
+        """Compila las closures del loop (si no, se compilan en la primera corrida)."""
+        if self.handlers is None:
+            vm = self.vm
+            threaded = vm._threaded if vm._threaded is not None else ThreadedCode(vm)
+            self.handlers = threaded.code
+
+    def run(self) -> None:
+        """Ejecuta el programa completo y deja el resultado en self.profile."""
+        vm = self.vm
+        self.prepare()
+        handlers = self.handlers
+        code = vm.code
+        ops = [instr[0] for instr in code]
+        counts = [0] * len(code)
+        stats: Dict[str, _FunctionStats] = {'main': _FunctionStats()}
+        stats['main'].calls = 1
+        stats['main'].max_active = 1
+        active: Dict[str, int] = {'main': 1}
+        clock = time.perf_counter
+
+        # Llamadas activas: [función, inicio, tiempo en llamadas hijas, cuádruplos al entrar]
+        frames: List[List[Any]] = [['main', clock(), 0.0, 0]]
+        max_depth = 1
+        count = 0
+
+        def leave(now):
+            name, started, children, entry_count = frames.pop()
+            elapsed = now - started
+            info = stats[name]
+            info.time_self += elapsed - children
+            active[name] -= 1
+            if not active[name]:
+                info.time_total += elapsed
+                info.quads_total += count - entry_count
+            if frames:
+                frames[-1][2] += elapsed
+
+        run_started = clock()
+        ip = 0
+        try:
+            while True:
+                counts[ip] += 1
+                count += 1
+                op = ops[ip]
+                if op == OP_GOSUB:
+                    name = code[ip][1].name
+                    ip = handlers[ip]()
+                    info = stats.get(name)
+                    if info is None:
+                        info = stats[name] = _FunctionStats()
+                    info.calls += 1
+                    live = active[name] = active.get(name, 0) + 1
+                    if live > info.max_active:
+                        info.max_active = live
+                    frames.append([name, clock(), 0.0, count])
+                    if len(frames) > max_depth:
+                        max_depth = len(frames)
+                elif op == OP_RETURN or op == OP_ENDFUNC:
+                    ip = handlers[ip]()
+                    leave(clock())
+                else:
+                    ip = handlers[ip]()
+        except _Halt as halt:
+            ip = halt.args[0]
+            vm.running = False
+        finally:
+            now = clock()
+            vm.ip = ip
+            vm.quad_count = count
+            # Cerrar lo que quedó abierto (main, o todo el stack si hubo error)
+            while frames:
+                leave(now)
+            self.profile = self._build(counts, stats, now - run_started, max_depth)
+
+    def _build(self, counts: List[int], stats: Dict[str, _FunctionStats], wall_time: float,
+               max_depth: int) -> Dict[str, Any]:
+        code = self.vm.code
+        opcodes: Dict[str, int] = {}
+        quads = []
+        for index, executed in enumerate(counts):
+            if not executed:
+                continue
+            name = opcode_name(code[index][0])
+            owner = self.owners[index]
+            opcodes[name] = opcodes.get(name, 0) + executed
+            quads.append({'index': index, 'op': name, 'function': owner, 'count': executed})
+            if owner not in stats:
+                stats[owner] = _FunctionStats()
+            stats[owner].quads_self += executed
+        quads.sort(key=lambda quad: (-quad['count'], quad['index']))
+
+        functions = {}
+        for name, info in sorted(stats.items(), key=lambda item: -item[1].time_self):
+            functions[name] = {
+                'calls': info.calls,
+                'max_active': info.max_active,
+                'quads_self': info.quads_self,
+                'quads_total': info.quads_total,
+                'time_self': info.time_self,
+                'time_total': info.time_total,
+            }
+        return {
+            'program': self.vm.program_name,
+            'total_quads': sum(counts),
+            'wall_time': wall_time,
+            'max_depth': max_depth,
+            'functions': functions,
+            'opcodes': dict(sorted(opcodes.items(), key=lambda item: -item[1])),
+            'quads': quads,
+        }
+
+
+def format_profile(profile: Dict[str, Any], top: int = 15) -> str:
+    """
+    Reporte de texto de un perfil, ordenado de lo más caro a lo más barato.
+
+    Args:
+        profile: Resultado de VirtualMachine.get_profile()
+        top: Cuántos cuádruplos mostrar
+    """
+    total = profile['total_quads'] or 1
+    lines = [f"Perfil de {profile['program']}: {profile['total_quads']} cuadruplos "
+             f"en {profile['wall_time'] * 1000:.2f} ms, profundidad maxima {profile['max_depth']}"]
+
+    lines.append("\nFunciones (por tiempo exclusivo):")
+    lines.append(f"  {'funcion':16} {'llamadas':>9} {'cuad excl':>11} {'cuad incl':>11} "
+                 f"{'ms excl':>9} {'ms incl':>9}")
+    for name, info in profile['functions'].items():
+        lines.append(f"  {name:16} {info['calls']:9} {info['quads_self']:11} {info['quads_total']:11} "
+                     f"{info['time_self'] * 1000:9.2f} {info['time_total'] * 1000:9.2f}")
+
+    lines.append("\nOpcodes:")
+    for name, executed in profile['opcodes'].items():
+        lines.append(f"  {name:10} {executed:11} {executed * 100 / total:6.1f}%")
+
+    lines.append(f"\nCuadruplos mas ejecutados (top {top}):")
+    for quad in profile['quads'][:top]:
+        lines.append(f"  {quad['index']:05} {quad['op']:10} {quad['function']:16} {quad['count']:11}")
+    return "\n".join(lines)
+
+
+def dump_profile(profile: Dict[str, Any], path: str) -> None:
+    """Guarda el perfil como JSON."""
+    with open(path, 'w', encoding='utf-8') as profile_file:
+        json.dump(profile, profile_file, indent=2, ensure_ascii=False)
+
+
+def _acquire_switch_interval(interval: float) -> None:
+    """
+    Baja el intervalo de cambio de hilo del proceso a `interval` (nunca lo
+    sube); el primer sampler activo guarda el valor original.
+    """
+    global _switch_users, _saved_switch
+    with _switch_lock:
+        current = sys.getswitchinterval()
+        if _switch_users == 0:
+            _saved_switch = current
+        if interval < current:
+            sys.setswitchinterval(interval)
+        _switch_users += 1
+
+
+def _release_switch_interval() -> None:
+    """Al detenerse el último sampler activo, regresa el intervalo original."""
+    global _switch_users
+    with _switch_lock:
+        _switch_users -= 1
+        if _switch_users == 0:
+            sys.setswitchinterval(_saved_switch)
+
+
+class SamplingProfiler:
+    """
+    Muestrea el stack de llamadas Patito de una VM desde otro hilo.
+
+    Mientras muestrea baja el intervalo de cambio de hilo de Python al
+    periodo de muestreo (si no, el hilo solo despertaría cada 5 ms). El
+    intervalo es del proceso, así que se comparte entre samplers: se
+    regresa a su valor cuando se detiene el último.
+
+    Attributes:
+        samples: {(main, f, g): número de muestras} de la última corrida
+    """
+
+    def __init__(self, vm, rate: int = DEFAULT_SAMPLE_RATE):
+        if rate <= 0:
+            raise ValueError(f"La tasa de muestreo debe ser > 0: {rate}")
+        self.vm = vm
+        self.interval = 1.0 / rate
+        self.owners = quad_owners(vm.quadruples, vm.functions, vm._main_start())
+        self.samples: Dict[Tuple[str, ...], int] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._target_id = 0
+        self._holds_switch = False
+
+    def start(self) -> None:
+        """Empieza a muestrear el hilo que llama (el que ejecuta la VM)."""
+        self.samples = {}
+        self._target_id = threading.get_ident()
+        self._stop.clear()
+        if not self._holds_switch:
+            _acquire_switch_interval(self.interval)
+            self._holds_switch = True
+        self._thread = threading.Thread(target=self._loop, name="patito-vm-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Detiene el muestreo."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._holds_switch:
+            self._holds_switch = False
+            _release_switch_interval()
+
+    def _loop(self) -> None:
+        read_stack = self._python_stack if self.vm.engine == 'pyjit' else self._memory_stack
+        samples = self.samples
+        while not self._stop.wait(self.interval):
+            stack = read_stack()
+            if stack:
+                samples[stack] = samples.get(stack, 0) + 1
+
+    def _memory_stack(self) -> Tuple[str, ...]:
+        memory = self.vm.memory
+        returns = list(memory.return_stack)
+        current = memory.current_layout.name
+        owners = self.owners
+        # El llamador de cada nivel es la función del GOSUB (retorno - 1)
+        names = [owners[ret - 1] if 0 < ret <= len(owners) else NO_FUNCTION for ret in returns]
+        names.append(current)
+        return tuple(names)
+
+    def _python_stack(self) -> Tuple[str, ...]:
+        frame = sys._current_frames().get(self._target_id)
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            if code.co_filename.startswith('<patito-pyjit'):
+                names.append('main' if code.co_name == '_main' else code.co_name[2:])
+            frame = frame.f_back
+        names.reverse()
+        return tuple(names)
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self.samples.values())
+
+    def collapsed(self) -> List[str]:
+        """Líneas "main;f;g N" de la última corrida, de más a menos muestras."""
+        ordered = sorted(self.samples.items(), key=lambda item: (-item[1], item[0]))
+        return [f"{';'.join(stack)} {count}" for stack, count in ordered]
+
+
+def dump_collapsed(lines: List[str], path: str) -> None:
+    """Guarda las líneas collapsed para flamegraph.pl / speedscope."""
+    with open(path, 'w', encoding='utf-8') as folded_file:
+        folded_file.write("\n".join(lines) + "\n" if lines else "")
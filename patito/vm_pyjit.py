@@ -0,0 +1,403 @@
+"""
+Backend JIT a código fuente Python para la Máquina Virtual Patito
+
+Traduce cada función Patito (de su quad_start hasta su ENDFUNC) y main
+(del destino del GOTO inicial hasta END) a una función de Python:
+- Las celdas del frame plano son variables locales de Python
+- Globales son variables globales del módulo generado
+- Constantes se escriben como literales
+- GOTO / GOTOF se resuelven con un loop `while True` que despacha por
+  bloque básico (`pc`); si la función no tiene saltos no hay loop
+- ERA / PARAM / GOSUB se vuelven una llamada directa de Python, así que
+  la profundidad de llamadas se acota con el límite de recursión de Python
+  (ajustado a max_depth de la VM, hasta RECURSION_LIMIT); un RecursionError
+  se reporta como CallDepthError
+
+El límite de recursión es del proceso: las corridas que se traslapan (en
+hilos, el scheduler, un servidor) lo comparten. Cada corrida lo sube si le
+hace falta (una corrida sola lo pone justo en su max_depth) y solo la
+última en terminar lo regresa al valor original, así que una corrida
+nunca lo baja mientras otra está a media recursión; a cambio, mientras se
+traslapan, cada una puede pasarse de su max_depth hasta el límite más alto
+que se haya pedido.
+
+El código se compila una vez con compile() y se guarda en caché por el
+contenido del programa, así que cargar el mismo .obj otra vez no vuelve a
+traducir ni a compilar.
+"""
+
+import sys
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_PLUS, OP_MINUS, OP_MUL, OP_DIV, OP_DIV_II, OP_DIV_FF,
+    OP_GT, OP_LT, OP_NEQ, OP_GOTO, OP_GOTOF, OP_PRINT, OP_PRINT_STR,
+    OP_ERA, OP_PARAM, OP_GOSUB, OP_RETURN, OP_ENDFUNC, OP_END, OP_ERROR,
+)
+from .frame_layout import FRAME, FRAME_SEGMENTS, CallDepthError
+
+# La recursión Patito se vuelve recursión de Python: profundidad máxima
+# con este motor aunque max_depth sea mayor (pasarla es un CallDepthError
+# que lo dice)
+RECURSION_LIMIT = 20000
+
+# Corridas activas que subieron el límite de recursión y el valor que había
+_limit_lock = threading.Lock()
+_limit_users = 0
+_saved_limit = 0
+
+# Frames de Python entre run() y la primera función Patito (más holgura)
+_CALL_OVERHEAD = 10
+
+CONST_SEGMENTS = (7, 8)
+
+BINARY_EXPRS = {
+    OP_PLUS: "{x} + {y}",
+    OP_MINUS: "{x} - {y}",
+    OP_MUL: "{x} * {y}",
+    OP_DIV_II: "{x} // {y}",
+    OP_DIV_FF: "{x} / {y}",
+    OP_GT: "1 if {x} > {y} else 0",
+    OP_LT: "1 if {x} < {y} else 0",
+    OP_NEQ: "1 if {x} != {y} else 0",
+}
+
+# Programas traducidos que se guardan (LRU); cada uno trae su fuente y su
+# código compilado, así que la caché no debe crecer con cada programa nuevo
+CODE_CACHE_SIZE = 64
+
+_code_cache: 'OrderedDict[str, Any]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+class PyJitError(RuntimeError):
+    """El programa no se puede traducir a Python."""
+
+
+def _program_key(quadruples: List, constants: Dict[int, Any], functions: Dict[str, dict]) -> str:
+    """Hash del contenido del programa, para la caché de código compilado."""
+    content = repr((
+        [tuple(quad) for quad in quadruples],
+        sorted(constants.items()),
+        sorted((name, repr(info)) for name, info in functions.items()),
+    ))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class _Translator:
+    """Traduce las instrucciones decodificadas de la VM a código fuente Python."""
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.code = vm.code
+        self.segs = vm.memory.segments
+        self.call_counter = 0
+        self.global_names = set()
+
+    # -- Operandos -----------------------------------------------------------
+
+    def _read(self, seg: int, off: int) -> str:
+        if seg in CONST_SEGMENTS:
+            value = self.segs[seg][off]
+            if isinstance(value, float) and not math.isfinite(value):
+                return f"float({str(value)!r})"
+            return repr(value)
+        return self._name(seg, off)
+
+    def _name(self, seg: int, off: int) -> str:
+        if seg in FRAME_SEGMENTS:
+            return f"v{seg}_{off}"
+        name = f"g{seg}_{off}"
+        self.global_names.add(name)
+        return name
+
+    # -- Regiones y bloques ---------------------------------------------------
+
+    def _region_end(self, start: int, terminator: int) -> int:
+        end = start
+        while end < len(self.code) and self.code[end][0] != terminator:
+            end += 1
+        if end >= len(self.code):
+            raise PyJitError(f"Región desde el cuádruplo {start} sin fin")
+        return end
+
+    def _leaders(self, start: int, end: int) -> List[int]:
+        leaders = {start}
+        for index in range(start, end + 1):
+            op = self.code[index][0]
+            if op in (OP_GOTO, OP_GOTOF):
+                target = self.code[index][6]
+                if not isinstance(target, int) or not start <= target <= end:
+                    raise PyJitError(f"Salto fuera de la función en el cuádruplo {index}")
+                leaders.add(target)
+                if index + 1 <= end:
+                    leaders.add(index + 1)
+        return sorted(leaders)
+
+    def translate_region(self, py_name: str, start: int, end: int, params: List[str]) -> str:
+        """Traduce los cuádruplos [start, end] a una función de Python."""
+        leaders = self._leaders(start, end)
+        use_loop = any(self.code[i][0] in (OP_GOTO, OP_GOTOF) for i in range(start, end + 1))
+        indent = "            " if use_loop else "    "
+
+        frame_names = set()
+        written_globals = set()
+        body: List[str] = []
+        pending_calls: List[Tuple[str, Dict[int, str]]] = []
+
+        for block_index, leader in enumerate(leaders):
+            block_end = leaders[block_index + 1] - 1 if block_index + 1 < len(leaders) else end
+            if use_loop:
+                body.append(f"        if pc == {leader}:")
+            falls_through = True
+
+            for index in range(leader, block_end + 1):
+                op, a, b, c, d, e, f = self.code[index]
+                lines, falls_through = self._translate_instr(
+                    index, op, a, b, c, d, e, f, pending_calls, frame_names, written_globals
+                )
+                body.extend(indent + line for line in lines)
+
+            if use_loop:
+                if falls_through:
+                    if block_index + 1 < len(leaders):
+                        # Cae al siguiente bloque: el siguiente `if` lo atrapa
+                        body.append(f"{indent}pc = {leaders[block_index + 1]}")
+                    else:
+                        body.append(f"{indent}return")
+                elif not body[-1].strip().startswith(("return", "raise")):
+                    body.append(f"{indent}continue")
+
+        header = [f"def {py_name}({', '.join(params)}):"]
+        if written_globals:
+            header.append(f"    global {', '.join(sorted(written_globals))}")
+        # Celdas del frame que no son parámetros empiezan en 0
+        for name in sorted(frame_names - set(params)):
+            header.append(f"    {name} = 0")
+        if use_loop:
+            header.append(f"    pc = {start}")
+            header.append("    while True:")
+        return "\n".join(header + body) + "\n"
+
+    def _translate_instr(self, index, op, a, b, c, d, e, f,
+                         pending_calls, frame_names, written_globals):
+        """Regresa (líneas, sigue al siguiente cuádruplo)."""
+
+        def target(seg, off):
+            name = self._name(seg, off)
+            if seg in FRAME_SEGMENTS:
+                frame_names.add(name)
+            else:
+                written_globals.add(name)
+            return name
+
+        def read(seg, off):
+            name = self._read(seg, off)
+            if seg in FRAME_SEGMENTS:
+                frame_names.add(name)
+            return name
+
+        if op in BINARY_EXPRS:
+            expr = BINARY_EXPRS[op].format(x=read(a, b), y=read(c, d))
+            return [f"{target(e, f)} = {expr}"], True
+
+        if op == OP_DIV:
+            x, y, w = read(a, b), read(c, d), target(e, f)
+            return [
+                f"if {y} == 0:",
+                "    raise RuntimeError('División por cero')",
+                f"if isinstance({x}, int) and isinstance({y}, int):",
+                f"    {w} = {x} // {y}",
+                "else:",
+                f"    {w} = {x} / {y}",
+            ], True
+
+        if op == OP_ASSIGN:
+            return [f"{target(e, f)} = {read(a, b)}"], True
+
+        if op == OP_GOTO:
+            return [f"pc = {f}"], False
+
+        if op == OP_GOTOF:
+            x = read(a, b)
+            return [
+                f"if {x} == 0 or {x} is False:",
+                f"    pc = {f}",
+                "    continue",
+            ], True
+
+        if op == OP_PRINT:
+            return [f"_emit(str({read(a, b)}))"], True
+
+        if op == OP_PRINT_STR:
+            return [f"_emit({a!r})"], True
+
+        if op == OP_ERA:
+            pending_calls.append((a, {}))
+            return [], True
+
+        if op == OP_PARAM:
+            if not pending_calls:
+                raise PyJitError(f"PARAM sin ERA en el cuádruplo {index}")
+            self.call_counter += 1
+            arg_name = f"_a{self.call_counter}"
+            # c = número de parámetro
+            pending_calls[-1][1][c] = arg_name
+            return [f"{arg_name} = {read(a, b)}"], True
+
+        if op == OP_GOSUB:
+            if not pending_calls or pending_calls[-1][0] is not a:
+                raise PyJitError(f"GOSUB sin ERA en el cuádruplo {index}")
+            plan, args = pending_calls.pop()
+            if plan.entry is None:
+                raise PyJitError(f"Función '{plan.name}' no encontrada")
+            if sorted(args) != list(range(len(plan.slots))):
+                raise PyJitError(f"Argumentos incompletos para '{plan.name}' en el cuádruplo {index}")
+            call_args = ", ".join(args[i] for i in range(len(args)))
+            return [f"f_{plan.name}({call_args})"], True
+
+        if op == OP_RETURN:
+            value = read(a, b)
+            if e is None:
+                return ["return"], False
+            return [f"{target(e, f)} = {value}", "return"], False
+
+        if op in (OP_ENDFUNC, OP_END):
+            return ["return"], False
+
+        if op == OP_ERROR:
+            return [f"raise RuntimeError({a!r})"], False
+
+        raise PyJitError(f"Opcode {op} no soportado en el cuádruplo {index}")
+
+    def translate(self) -> str:
+        """Traduce el programa completo a un módulo de Python."""
+        functions = []
+        for func_name, func_info in self.vm.functions.items():
+            start = func_info.get('quad_start')
+            if not isinstance(start, int):
+                continue
+            end = self._region_end(start, OP_ENDFUNC)
+            # Los parámetros son celdas del frame plano, según el plan de llamada
+            params = [self._name(FRAME, slot) for slot in self.vm.call_plans[func_name].slots]
+            functions.append(self.translate_region(f"f_{func_name}", start, end, params))
+
+        main_start = self.vm._main_start()
+        main_end = self._region_end(main_start, OP_END)
+        functions.append(self.translate_region("_main", main_start, main_end, []))
+        return "\n\n".join(functions)
+
+
+class PyJitCode:
+    """
+    Programa traducido a Python para una VirtualMachine.
+
+    Las globales viven en el namespace del módulo generado; antes de correr
+    se cargan desde la memoria de la VM y al terminar se copian de regreso,
+    así que get_memory_snapshot() ve lo mismo que con el intérprete.
+    """
+
+    def __init__(self, vm):
+        self.vm = vm
+        key = _program_key(vm.quadruples, vm.memory.constant_memory, vm.functions)
+        with _cache_lock:
+            cached = _code_cache.get(key)
+            if cached is not None:
+                _code_cache.move_to_end(key)
+        if cached is None:
+            translator = _Translator(vm)
+            source = translator.translate()
+            compiled = compile(source, f"<patito-pyjit {vm.program_name}>", "exec")
+            cached = (source, compiled, sorted(translator.global_names))
+            with _cache_lock:
+                _code_cache[key] = cached
+                while len(_code_cache) > CODE_CACHE_SIZE:
+                    _code_cache.popitem(last=False)
+        self.source, self.compiled, self.global_names = cached
+
+    def run(self) -> None:
+        vm = self.vm
+        segs = vm.memory.segments
+        namespace: Dict[str, Any] = {'_emit': vm.output.write}
+        for name in self.global_names:
+            seg, off = (int(part) for part in name[1:].split('_'))
+            segment = segs[seg]
+            namespace[name] = segment[off] if off < len(segment) else 0
+        exec(self.compiled, namespace)
+
+        max_depth = min(vm.max_depth, RECURSION_LIMIT)
+        _acquire_recursion_limit(_python_depth() + max_depth + _CALL_OVERHEAD)
+        try:
+            namespace['_main']()
+            vm.ip = len(vm.quadruples)
+            vm.running = False
+        except RecursionError as e:
+            note = ""
+            if vm.max_depth > RECURSION_LIMIT:
+                note = f"; el motor 'pyjit' no pasa de {RECURSION_LIMIT} llamadas, usa 'interp' o 'threaded'"
+            raise CallDepthError(max_depth, _innermost_function(e), note) from None
+        finally:
+            _release_recursion_limit()
+            # Copiar las globales de regreso a la memoria de la VM
+            for name in self.global_names:
+                seg, off = (int(part) for part in name[1:].split('_'))
+                segment = segs[seg]
+                if off >= len(segment):
+                    segment.extend([0] * (off + 1 - len(segment)))
+                segment[off] = namespace[name]
+
+
+def _acquire_recursion_limit(limit: int) -> None:
+    """
+    Pone el límite de recursión del proceso para una corrida: exacto si es
+    la única activa; si ya hay otras, solo lo sube (nunca lo baja).
+    """
+    global _limit_users, _saved_limit
+    with _limit_lock:
+        if _limit_users == 0:
+            _saved_limit = sys.getrecursionlimit()
+            sys.setrecursionlimit(limit)
+        elif sys.getrecursionlimit() < limit:
+            sys.setrecursionlimit(limit)
+        _limit_users += 1
+
+
+def _release_recursion_limit() -> None:
+    """Al terminar la última corrida activa, regresa el límite original."""
+    global _limit_users
+    with _limit_lock:
+        _limit_users -= 1
+        if _limit_users == 0:
+            sys.setrecursionlimit(_saved_limit)
+
+
+def _python_depth() -> int:
+    """Frames de Python activos en este momento."""
+    depth = 0
+    frame = sys._getframe(1)
+    while frame is not None:
+        depth += 1
+        frame = frame.f_back
+    return depth
+
+
+def _innermost_function(error: BaseException) -> str:
+    """Nombre de la función Patito más profunda en el traceback del error."""
+    name = '?'
+    tb = error.__traceback__
+    while tb is not None:
+        code_name = tb.tb_frame.f_code.co_name
+        if code_name.startswith('f_'):
+            name = code_name[2:]
+        tb = tb.tb_next
+    return name
+
+
+def clear_cache() -> None:
+    """Vacía la caché de programas traducidos."""
+    with _cache_lock:
+        _code_cache.clear()
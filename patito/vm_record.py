@@ -0,0 +1,369 @@
+"""
+Grabación Binaria de la Ejecución de la Máquina Virtual Patito
+
+Con VirtualMachine(obj, record_trace='corrida.ptrace') cada execute() deja
+en el archivo un registro de ancho fijo por cuádruplo ejecutado, en orden:
+
+    ip        uint32   índice del cuádruplo
+    opcode    uint8    opcode entero (ver quad_decoder)
+    tags      uint8    tipo de cada valor, 2 bits por valor (TAG_*), y
+                       FLAG_FAULT si el cuádruplo falló
+    depth     uint32   llamadas activas al empezar el cuádruplo (main = 0)
+    valores   3 x 8    operando 1, operando 2 y resultado (int64 o
+                       float64 según su tag; 0 si no hay)
+
+Los operandos se leen antes de ejecutar y el resultado después (el valor
+escrito por la aritmética, las relacionales y la asignación). GOTOF,
+PRINT, PARAM y RETURN guardan su único operando. Un valor que no cabe en
+int64 queda como TAG_OTHER.
+
+El archivo empieza con FILE_HEADER (magic, versión, tamaño de registro y
+largo de un JSON con el programa, los nombres de opcodes y el rango de
+cuádruplos de cada función), así que TraceReader puede filtrar por función
+sin el .obj. Los registros se empacan en un buffer en memoria que se
+escribe al archivo cada DEFAULT_FLUSH_RECORDS cuádruplos y al terminar
+(también si el programa falla).
+
+Igual que los hooks (ver vm_hooks), la grabación corre sobre las closures
+del motor 'threaded' envueltas; sin record_trace el loop normal no cambia.
+"""
+
+import json
+import struct
+from itertools import product
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_GOTOF, OP_PRINT, OP_PARAM, OP_RETURN, BINARY_OPS, OPCODES, OPCODE_NAMES,
+)
+from .vm_profile import quad_owners
+from .vm_threaded import ThreadedCode, _Halt
+
+MAGIC = b'PTTR'
+VERSION = 1
+
+FILE_HEADER = struct.Struct('<4sHHI')
+RECORD_PREFIX = '<IBBxxI'
+RECORD_SIZE = struct.calcsize(RECORD_PREFIX + 'qqq')
+
+TAG_NONE = 0
+TAG_INT = 1
+TAG_FLOAT = 2
+TAG_OTHER = 3
+FLAG_FAULT = 0x40
+
+DEFAULT_FLUSH_RECORDS = 1 << 15
+
+_NONE = type(None)
+_TAGS = {_NONE: TAG_NONE, int: TAG_INT, bool: TAG_INT, float: TAG_FLOAT}
+_FORMATS = {TAG_NONE: 'q', TAG_INT: 'q', TAG_FLOAT: 'd', TAG_OTHER: 'q'}
+
+_READ_PREFIX = struct.Struct(RECORD_PREFIX)
+_readers: Dict[int, struct.Struct] = {}
+
+_BINARY_OPCODES = frozenset(OPCODES[name] for name in BINARY_OPS)
+_SINGLE_OPERAND = frozenset((OP_GOTOF, OP_PRINT, OP_PARAM, OP_RETURN))
+
+Record = Tuple[int, int, int, Tuple[Any, ...], bool]
+
+
+def _tags_byte(tags) -> int:
+    return tags[0] | tags[1] << 2 | tags[2] << 4
+
+
+def _packer(types) -> Tuple[Callable[..., bytes], int]:
+    tags = [_TAGS[kind] for kind in types]
+    fmt = RECORD_PREFIX + ''.join(_FORMATS[tag] for tag in tags)
+    return struct.Struct(fmt).pack, _tags_byte(tags)
+
+
+# (tipo op1, tipo op2, tipo resultado) -> (pack, byte de tags)
+_PACKERS = {types: _packer(types) for types in product(_TAGS, repeat=3)}
+
+
+def encode_record(ip: int, opcode: int, depth: int, values=(None, None, None), flags: int = 0) -> bytes:
+    """
+    Empaca un registro revisando cada valor (el camino lento: enteros
+    fuera de int64 o valores que no son números).
+    """
+    tags = []
+    payload = []
+    for value in values:
+        tag = _TAGS.get(type(value), TAG_OTHER)
+        if tag == TAG_INT and not -(1 << 63) <= value < (1 << 63):
+            tag = TAG_OTHER
+        tags.append(tag)
+        payload.append(value if tag in (TAG_INT, TAG_FLOAT) else 0)
+    fmt = RECORD_PREFIX + ''.join(_FORMATS[tag] for tag in tags)
+    return struct.pack(fmt, ip, opcode, _tags_byte(tags) | flags, depth, *payload)
+
+
+def function_ranges(owners: List[str]) -> List[Tuple[int, int, str]]:
+    """Compacta el dueño de cada cuádruplo (quad_owners) a rangos [inicio, fin]."""
+    ranges: List[Tuple[int, int, str]] = []
+    for index, owner in enumerate(owners):
+        if ranges and ranges[-1][2] == owner and ranges[-1][1] == index - 1:
+            ranges[-1] = (ranges[-1][0], index, owner)
+        else:
+            ranges.append((index, index, owner))
+    return ranges
+
+
+class TraceRecorder:
+    """
+    Programa de una VM compilado a closures que graban cada cuádruplo.
+
+    Attributes:
+        path: Archivo donde se graba cada corrida (se reemplaza)
+        flush_every: Registros en memoria antes de escribirlos al archivo
+        stats: Números de la última corrida (ver VirtualMachine.get_record_stats())
+    """
+
+    def __init__(self, vm, path: str, flush_every: int = DEFAULT_FLUSH_RECORDS):
+        if flush_every < 1:
+            raise ValueError("flush_every debe ser al menos 1")
+        self.vm = vm
+        self.path = path
+        self.flush_every = flush_every
+        self.stats: Optional[Dict[str, Any]] = None
+        self.buffer = bytearray()
+
+        main_start = vm._main_start()
+        owners = quad_owners(vm.quadruples, vm.functions, main_start)
+        header = {
+            'program': vm.program_name,
+            'quads': len(vm.quadruples),
+            'opcodes': {str(code): name for code, name in sorted(OPCODE_NAMES.items())},
+            'functions': function_ranges(owners),
+        }
+        text = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        self.header = FILE_HEADER.pack(MAGIC, VERSION, RECORD_SIZE, len(text)) + text
+
+        base = vm._threaded.code if vm._threaded is not None else ThreadedCode(vm).code
+        self.code: List[Callable[[], int]] = [
+            self._wrap(index, instr, handler) for index, (instr, handler) in enumerate(zip(vm.code, base))
+        ]
+
+    def _wrap(self, ip: int, instr, handler: Callable[[], int]) -> Callable[[], int]:
+        """Envuelve handler para que agregue su registro al buffer."""
+        op, a, b, c, d, e, f = instr
+        segs = self.vm.memory.segments
+        depth = self.vm.memory.call_stack.__len__
+        extend = self.buffer.extend
+        packers = _PACKERS
+
+        if op in _BINARY_OPCODES:
+            def record():
+                x = segs[a][b]
+                y = segs[c][d]
+                level = depth()
+                nxt = handler()
+                r = segs[e][f]
+                try:
+                    pack, tags = packers[type(x), type(y), type(r)]
+                    extend(pack(ip, op, tags, level, x, y, r))
+                except (KeyError, struct.error):
+                    extend(encode_record(ip, op, level, (x, y, r)))
+                return nxt
+            return record
+
+        if op == OP_ASSIGN:
+            def record():
+                x = segs[a][b]
+                level = depth()
+                nxt = handler()
+                r = segs[e][f]
+                try:
+                    pack, tags = packers[type(x), _NONE, type(r)]
+                    extend(pack(ip, op, tags, level, x, 0, r))
+                except (KeyError, struct.error):
+                    extend(encode_record(ip, op, level, (x, None, r)))
+                return nxt
+            return record
+
+        if op in _SINGLE_OPERAND:
+            def record():
+                x = segs[a][b]
+                level = depth()
+                nxt = handler()
+                try:
+                    pack, tags = packers[type(x), _NONE, _NONE]
+                    extend(pack(ip, op, tags, level, x, 0, 0))
+                except (KeyError, struct.error):
+                    extend(encode_record(ip, op, level, (x, None, None)))
+                return nxt
+            return record
+
+        pack_plain = struct.Struct(RECORD_PREFIX + 'qqq').pack
+
+        def record():
+            level = depth()
+            nxt = handler()
+            extend(pack_plain(ip, op, 0, level, 0, 0, 0))
+            return nxt
+        return record
+
+    def run(self) -> None:
+        """
+        Ejecuta desde el cuádruplo 0 hasta END grabando la corrida. END y
+        el cuádruplo que falle (con FLAG_FAULT) también quedan grabados.
+        """
+        vm = self.vm
+        code = self.code
+        buffer = self.buffer
+        block = range(self.flush_every)
+        depth = vm.memory.call_stack.__len__
+        flushes = 0
+        written = 0
+        ip = 0
+        buffer.clear()
+        with open(self.path, 'wb') as trace_file:
+            trace_file.write(self.header)
+            try:
+                while True:
+                    for _ in block:
+                        ip = code[ip]()
+                    trace_file.write(buffer)
+                    written += len(buffer)
+                    flushes += 1
+                    buffer.clear()
+            except _Halt as halt:
+                buffer.extend(encode_record(ip, vm.code[ip][0], depth()))
+                ip = halt.args[0]
+                vm.running = False
+            except BaseException:
+                buffer.extend(encode_record(ip, vm.code[ip][0], depth(), flags=FLAG_FAULT))
+                raise
+            finally:
+                trace_file.write(buffer)
+                written += len(buffer)
+                flushes += 1
+                buffer.clear()
+                vm.ip = ip
+                vm.quad_count = written // RECORD_SIZE
+                self.stats = {
+                    'path': self.path,
+                    'records': vm.quad_count,
+                    'bytes': len(self.header) + written,
+                    'flushes': flushes,
+                }
+
+
+class TraceReader:
+    """
+    Lee un archivo grabado por TraceRecorder.
+
+    Attributes:
+        header: JSON del encabezado ('program', 'quads', 'opcodes', 'functions')
+        records: Registros en el archivo
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as trace_file:
+            fixed = trace_file.read(FILE_HEADER.size)
+            if len(fixed) < FILE_HEADER.size:
+                raise ValueError(f"{path} no es una traza de Patito (archivo muy corto)")
+            magic, version, record_size, length = FILE_HEADER.unpack(fixed)
+            if magic != MAGIC:
+                raise ValueError(f"{path} no es una traza de Patito")
+            if version != VERSION or record_size != RECORD_SIZE:
+                raise ValueError(f"Versión de traza no soportada: {version} (registros de {record_size} bytes)")
+            self.header: Dict[str, Any] = json.loads(trace_file.read(length).decode('utf-8'))
+            self._data_start = FILE_HEADER.size + length
+            trace_file.seek(0, 2)
+            self.records = (trace_file.tell() - self._data_start) // RECORD_SIZE
+        self.opcodes = {int(code): name for code, name in self.header['opcodes'].items()}
+
+    def function_of(self, ip: int) -> str:
+        """Función dueña del cuádruplo ip."""
+        for start, end, name in self.header['functions']:
+            if start <= ip <= end:
+                return name
+        return '?'
+
+    def function_ips(self, name: str) -> frozenset:
+        """Índices de los cuádruplos de la función name."""
+        ips = frozenset(
+            ip for start, end, owner in self.header['functions'] if owner == name
+            for ip in range(start, end + 1)
+        )
+        if not ips:
+            names = sorted({owner for _, _, owner in self.header['functions']})
+            raise ValueError(f"La traza no tiene la función '{name}' (hay: {', '.join(names)})")
+        return ips
+
+    def read(self, function: Optional[str] = None, ip_range: Optional[Tuple[int, int]] = None,
+             chunk_records: int = 4096) -> Iterator[Record]:
+        """
+        Registros de la traza en orden, filtrados.
+
+        Args:
+            function: Solo los cuádruplos de esta función
+            ip_range: Solo los cuádruplos con inicio <= ip <= fin
+            chunk_records: Registros leídos del archivo de un jalón
+
+        Returns:
+            Iterator: (ip, opcode, depth, (op1, op2, resultado), falló);
+            los valores que no se grabaron son None
+        """
+        ips = self.function_ips(function) if function is not None else None
+        low, high = ip_range if ip_range is not None else (0, 1 << 32)
+        return self._records(ips, low, high, chunk_records)
+
+    def _records(self, ips: Optional[frozenset], low: int, high: int, chunk_records: int) -> Iterator[Record]:
+        with open(self.path, 'rb') as trace_file:
+            trace_file.seek(self._data_start)
+            while True:
+                data = trace_file.read(RECORD_SIZE * chunk_records)
+                for offset in range(0, len(data) - RECORD_SIZE + 1, RECORD_SIZE):
+                    ip, opcode, tags, depth = _READ_PREFIX.unpack_from(data, offset)
+                    if not low <= ip <= high or (ips is not None and ip not in ips):
+                        continue
+                    yield ip, opcode, depth, _decode_values(data, offset, tags), bool(tags & FLAG_FAULT)
+                if len(data) < RECORD_SIZE * chunk_records:
+                    return
+
+    def format_record(self, record: Record) -> str:
+        """Una línea legible: ip, profundidad, función, opcode, valores."""
+        ip, opcode, depth, (x, y, r), fault = record
+        operands = ", ".join(_format_value(value) for value in (x, y) if value is not None)
+        text = f"{ip:06} {depth:>4} {self.function_of(ip):<14} {self.opcodes.get(opcode, opcode):<8} {operands}"
+        if r is not None:
+            text += f" -> {_format_value(r)}"
+        if fault:
+            text += "  << FALLA"
+        return text.rstrip()
+
+
+class _Other:
+    """Valor grabado como TAG_OTHER (no cabía en el registro)."""
+
+    def __repr__(self):
+        return '?'
+
+
+OTHER = _Other()
+
+
+def _decode_values(data, offset: int, tags: int) -> Tuple[Any, ...]:
+    reader = _readers.get(tags & 0x3F)
+    if reader is None:
+        fmt = RECORD_PREFIX + ''.join(_FORMATS[(tags >> shift) & 3] for shift in (0, 2, 4))
+        reader = _readers[tags & 0x3F] = struct.Struct(fmt)
+    values = reader.unpack_from(data, offset)[4:]
+    decoded = []
+    for shift, value in zip((0, 2, 4), values):
+        tag = (tags >> shift) & 3
+        decoded.append(None if tag == TAG_NONE else OTHER if tag == TAG_OTHER else value)
+    return tuple(decoded)
+
+
+def _format_value(value) -> str:
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def parse_ip_range(text: str) -> Tuple[int, int]:
+    """'10-20' -> (10, 20); '15' -> (15, 15)"""
+    low, _, high = text.partition('-')
+    return int(low), int(high) if high else int(low)
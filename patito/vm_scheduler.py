@@ -0,0 +1,160 @@
+"""
+Scheduler de asyncio para muchos programas Patito en un solo proceso
+
+Cada VirtualMachine (motor 'interp') corre como una corrutina que avanza
+su programa por tramos de slice_quads cuádruplos con vm.resume() y cede el
+turno entre tramos. La cola de listos de asyncio es FIFO, así que los
+programas se turnan en round-robin y ninguno acapara el hilo; uno con un
+ciclo infinito solo gasta sus tramos hasta que su presupuesto
+(max_quads / time_limit de su VM) lo detiene.
+
+La salida de cada programa va a su propio AsyncSink: al final de cada
+tramo se entrega con await, así que el scheduler también le da turno a
+quien consume la salida.
+
+Uso:
+
+    scheduler = VMScheduler(slice_quads=1000)
+    for obj_data in programas:
+        scheduler.submit(VirtualMachine(obj_data, max_quads=10**6))
+    stats = await scheduler.run()
+"""
+
+import time
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional
+
+from .output_sink import AsyncSink
+
+# Cuádruplos por tramo si no se da otro valor
+DEFAULT_SLICE_QUADS = 1000
+
+
+class ProgramTask:
+    """
+    Un programa dentro del scheduler.
+
+    Attributes:
+        name: Nombre para reportes
+        vm: La VirtualMachine que lo ejecuta
+        sink: Su AsyncSink
+        status: 'pendiente', 'corriendo', 'terminado' o 'error'
+        error: La excepción si status es 'error'
+        slices: Tramos que ha corrido
+    """
+
+    def __init__(self, name: str, vm, sink: AsyncSink):
+        self.name = name
+        self.vm = vm
+        self.sink = sink
+        self.status = 'pendiente'
+        self.error: Optional[BaseException] = None
+        self.slices = 0
+
+    @property
+    def output(self) -> Optional[List[str]]:
+        """Lo que capturó su sink (None si no captura)."""
+        return self.sink.captured
+
+    def __repr__(self):
+        return f"ProgramTask({self.name}: {self.status}, {self.slices} tramos)"
+
+
+class VMScheduler:
+    """
+    Corre muchos programas concurrentemente, turnándolos por tramos.
+
+    Args:
+        slice_quads: Cuádruplos por tramo (aproximado: cada tramo termina en
+                     la primera arista de regreso o GOSUB después de llegar)
+        max_active: Programas empezados a la vez como mucho (los demás
+                    esperan a que alguno termine); None es sin límite
+    """
+
+    def __init__(self, slice_quads: int = DEFAULT_SLICE_QUADS, max_active: Optional[int] = None):
+        if slice_quads < 1:
+            raise ValueError(f"El tramo debe ser de al menos 1 cuádruplo: {slice_quads}")
+        self.slice_quads = slice_quads
+        self.max_active = max_active
+        self.tasks: List[ProgramTask] = []
+
+    def submit(self, vm, sink: Optional[AsyncSink] = None, name: Optional[str] = None) -> ProgramTask:
+        """
+        Agrega un programa; empieza a correr con run().
+
+        Args:
+            vm: VirtualMachine con motor 'interp'
+            sink: Destino de su salida (default: AsyncSink que solo captura)
+            name: Nombre para reportes (default: program_name#n)
+        """
+        if vm.engine != 'interp' or vm.tracer is not None or vm.profiler is not None:
+            raise ValueError("El scheduler solo corre VMs con motor 'interp' sin trazas ni perfilado")
+        task = ProgramTask(name or f"{vm.program_name}#{len(self.tasks)}", vm, sink or AsyncSink())
+        self.tasks.append(task)
+        return task
+
+    async def _drive(self, task: ProgramTask, gate: Optional[asyncio.Semaphore]) -> None:
+        if gate is not None:
+            await gate.acquire()
+        vm = task.vm
+        try:
+            task.status = 'corriendo'
+            vm.start(task.sink)
+            finished = False
+            while not finished:
+                try:
+                    finished = vm.resume(self.slice_quads)
+                except Exception as e:
+                    task.status = 'error'
+                    task.error = e
+                    return
+                finally:
+                    task.slices += 1
+                    await task.sink.drain()
+                # Ceder el turno: el siguiente programa listo corre su tramo
+                await asyncio.sleep(0)
+            task.status = 'terminado'
+        finally:
+            if gate is not None:
+                gate.release()
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Corre todos los programas agregados que no han corrido.
+
+        Returns:
+            dict: {'programs', 'finished', 'failed', 'quads', 'slices',
+            'wall_time', 'quads_per_sec'}
+        """
+        pending = [task for task in self.tasks if task.status == 'pendiente']
+        gate = asyncio.Semaphore(self.max_active) if self.max_active else None
+        started = time.perf_counter()
+        await asyncio.gather(*(self._drive(task, gate) for task in pending))
+        wall_time = time.perf_counter() - started
+
+        quads = sum(task.vm.quad_count for task in pending)
+        return {
+            'programs': len(pending),
+            'finished': sum(1 for task in pending if task.status == 'terminado'),
+            'failed': sum(1 for task in pending if task.status == 'error'),
+            'quads': quads,
+            'slices': sum(task.slices for task in pending),
+            'wall_time': wall_time,
+            'quads_per_sec': quads / wall_time if wall_time > 0 else 0.0,
+        }
+
+
+def run_concurrently(vms: Iterable, slice_quads: int = DEFAULT_SLICE_QUADS,
+                     max_active: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Atajo síncrono: corre las VMs en un scheduler nuevo con asyncio.run().
+
+    Returns:
+        dict: Estadísticas de VMScheduler.run() más 'tasks' (los ProgramTask)
+    """
+    scheduler = VMScheduler(slice_quads, max_active)
+    for vm in vms:
+        scheduler.submit(vm)
+    stats = asyncio.run(scheduler.run())
+    stats['tasks'] = scheduler.tasks
+    return stats
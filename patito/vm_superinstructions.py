@@ -0,0 +1,272 @@
+"""
+Superinstrucciones para la Máquina Virtual Patito
+
+El generador de código repite unas cuantas secuencias de cuádruplos todo
+el tiempo. Al cargar, fuse() reescribe cada una como una sola instrucción
+y el loop de 'interp' la despacha una vez en lugar de varias:
+
+    'call'            ERA + PARAM* + GOSUB            -> CALL
+    'arith_assign'    PLUS|MINUS|MUL t + '=' t -> v   -> PLUS_SET / MINUS_SET / MUL_SET
+    'compare_branch'  LT|GT|NEQ t + GOTOF t           -> LT_JUMP / GT_JUMP / NEQ_JUMP
+    'branch_jump'     GOTOF + GOTO                    -> BRANCH
+
+La superinstrucción ocupa el lugar del primer cuádruplo y se salta los
+demás, que se quedan como estaban: los índices, los destinos de salto, las
+direcciones de retorno y los checkpoints no cambian, y un salto a la mitad
+de una secuencia ejecuta los originales. quad_count sigue contando
+cuádruplos originales, así que el presupuesto y los reportes no cambian.
+
+'arith_assign' y 'compare_branch' no escriben el temporal intermedio: solo
+se fusionan si el temporal es del frame, nada más lo lee el cuádruplo
+siguiente y ese cuádruplo no es destino de ningún salto. La copia del
+valor de retorno ('=' después del GOSUB) no puede entrar en CALL porque la
+función llamada corre entre el GOSUB y la copia.
+
+Qué secuencias fusionar sale del perfil: fusion_savings() cuenta, con los
+contadores por cuádruplo de VirtualMachine(profile=True), los despachos
+que se ahorra cada superinstrucción, y choose_superinstructions() se queda
+con las que ahorran en promedio al menos MIN_SAVINGS. Con los programas de
+prueba (benchmarks/bench_superinstructions.py) 'call' ahorra en promedio el
+15% de los despachos, 'compare_branch' el 7% y 'arith_assign' el 6%; GOTOF
++ GOTO solo aparece con un if de rama vacía y no se ejecutó nunca, así que
+DEFAULT_SUPERINSTRUCTIONS no lo incluye.
+"""
+
+from typing import Any, Dict, Iterable, List, Sequence, Set, Tuple
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_PLUS, OP_MINUS, OP_MUL, OP_GT, OP_LT, OP_NEQ,
+    OP_GOTO, OP_GOTOF, OP_LOOP, OP_PRINT, OP_ERA, OP_PARAM, OP_GOSUB, OP_RETURN,
+    OP_CALL, OP_PLUS_SET, OP_MINUS_SET, OP_MUL_SET, OP_LT_JUMP, OP_GT_JUMP,
+    OP_NEQ_JUMP, OP_BRANCH, BINARY_OPS, OPCODES,
+)
+from .frame_layout import FRAME
+
+SUPERINSTRUCTIONS = ('call', 'arith_assign', 'compare_branch', 'branch_jump')
+
+# Elegidas con choose_superinstructions() sobre los programas de prueba
+DEFAULT_SUPERINSTRUCTIONS = ('call', 'arith_assign', 'compare_branch')
+
+# Fracción mínima de despachos que debe ahorrar una superinstrucción
+MIN_SAVINGS = 0.01
+
+_SET_OPS = {OP_PLUS: OP_PLUS_SET, OP_MINUS: OP_MINUS_SET, OP_MUL: OP_MUL_SET}
+_JUMP_OPS = {OP_LT: OP_LT_JUMP, OP_GT: OP_GT_JUMP, OP_NEQ: OP_NEQ_JUMP}
+_BINARY_OPCODES = frozenset(OPCODES[name] for name in BINARY_OPS)
+
+# (índice del primer cuádruplo, superinstrucción, cuádruplos que cubre)
+Site = Tuple[int, str, int]
+
+
+def check_names(names: Iterable[str]) -> Tuple[str, ...]:
+    """Valida una lista de superinstrucciones y la regresa como tupla."""
+    names = tuple(names)
+    for name in names:
+        if name not in SUPERINSTRUCTIONS:
+            raise ValueError(f"Superinstrucción desconocida: {name} "
+                             f"(opciones: {', '.join(SUPERINSTRUCTIONS)})")
+    return names
+
+
+def _reads(instr: tuple) -> List[Tuple[Any, Any]]:
+    """Operandos que lee una instrucción."""
+    op, a, b, c, d = instr[:5]
+    if op in _BINARY_OPCODES:
+        return [(a, b), (c, d)]
+    if op in (OP_ASSIGN, OP_GOTOF, OP_PRINT, OP_PARAM, OP_RETURN):
+        return [(a, b)]
+    return []
+
+
+def jump_targets(code: List) -> Set[int]:
+    """Índices a los que se puede llegar sin venir del cuádruplo anterior."""
+    targets = set()
+    for index, (op, a, b, c, d, e, f) in enumerate(code):
+        if op in (OP_GOTO, OP_GOTOF, OP_LOOP):
+            targets.add(f)
+        elif op == OP_GOSUB:
+            targets.add(f)
+            targets.add(index + 1)
+    return targets
+
+
+def fusion_sites(code: List, regions: List[tuple], names: Sequence[str] = SUPERINSTRUCTIONS) -> List[Site]:
+    """
+    Secuencias del código que se pueden fusionar.
+
+    Args:
+        code: Instrucciones con frames planos y planes de llamada (vm.code)
+        regions: (inicio, fin, layout) de cada región (vm.region_layouts);
+                 un temporal solo se lee dentro de su región
+        names: Superinstrucciones permitidas
+
+    Returns:
+        list: (índice, superinstrucción, cuádruplos que cubre)
+    """
+    targets = jump_targets(code)
+    sites: List[Site] = []
+    for start, end, _ in regions:
+        reads: Dict[Tuple[Any, Any], int] = {}
+        for index in range(start, end):
+            for operand in _reads(code[index]):
+                reads[operand] = reads.get(operand, 0) + 1
+
+        def dead_after(index: int, segment: Any, offset: Any) -> bool:
+            # El temporal que escribe `index` solo lo lee index + 1
+            return (segment == FRAME and reads.get((segment, offset)) == 1
+                    and index + 1 not in targets)
+
+        index = start
+        while index < end - 1:
+            op, a, b, c, d, e, f = code[index]
+            following = code[index + 1]
+            length = 0
+            if op == OP_ERA and 'call' in names:
+                last = index + 1
+                while last < end and code[last][0] == OP_PARAM:
+                    last += 1
+                if (last < end and code[last][0] == OP_GOSUB and code[last][1] is a
+                        and not targets.intersection(range(index + 1, last + 1))):
+                    length = last - index + 1
+                    sites.append((index, 'call', length))
+            elif (op in _SET_OPS and 'arith_assign' in names
+                    and following[0] == OP_ASSIGN and following[1:3] == (e, f)
+                    and dead_after(index, e, f)):
+                length = 2
+                sites.append((index, 'arith_assign', length))
+            elif (op in _JUMP_OPS and 'compare_branch' in names
+                    and following[0] == OP_GOTOF and following[1:3] == (e, f)
+                    and dead_after(index, e, f)):
+                length = 2
+                sites.append((index, 'compare_branch', length))
+            elif (op == OP_GOTOF and 'branch_jump' in names
+                    and following[0] == OP_GOTO and index + 1 not in targets):
+                length = 2
+                sites.append((index, 'branch_jump', length))
+            index += max(length, 1)
+    return sites
+
+
+def fuse(code: List, regions: List[tuple], names: Sequence[str] = DEFAULT_SUPERINSTRUCTIONS) -> List:
+    """
+    Copia del código con las superinstrucciones en su lugar (ver el
+    formato de cada una en quad_decoder). Sin nombres regresa el mismo código.
+    """
+    if not names:
+        return code
+    fused = list(code)
+    for index, name, length in fusion_sites(code, regions, names):
+        op, a, b, c, d, e, f = code[index]
+        following = code[index + 1]
+        if name == 'call':
+            args = tuple((p_a, p_b, p_f) for _, p_a, p_b, _, _, _, p_f in code[index + 1:index + length - 1])
+            fused[index] = (OP_CALL, a, args, length - 1, 0, 0, code[index + length - 1][6])
+        elif name == 'arith_assign':
+            fused[index] = (_SET_OPS[op], a, b, c, d, following[5], following[6])
+        elif name == 'compare_branch':
+            fused[index] = (_JUMP_OPS[op], a, b, c, d, 0, following[6])
+        else:
+            fused[index] = (OP_BRANCH, a, b, 0, 0, following[6], f)
+    return fused
+
+
+def fusion_savings(code: List, regions: List[tuple], counts: Dict[int, int],
+                   names: Sequence[str] = SUPERINSTRUCTIONS) -> Dict[str, Dict[str, int]]:
+    """
+    Despachos que se ahorraría cada superinstrucción en una corrida.
+
+    Args:
+        code, regions: Como en fusion_sites()
+        counts: {índice: ejecuciones} (los 'quads' de un perfil)
+        names: Superinstrucciones a evaluar
+
+    Returns:
+        dict: {superinstrucción: {'sites': lugares, 'saved': despachos ahorrados}}
+    """
+    savings = {name: {'sites': 0, 'saved': 0} for name in names}
+    for index, name, length in fusion_sites(code, regions, names):
+        if name == 'branch_jump':
+            # Solo ahorra cuando no salta: lo que se ejecutó el GOTO
+            saved = counts.get(index + 1, 0)
+        else:
+            saved = counts.get(index, 0) * (length - 1)
+        savings[name]['sites'] += 1
+        savings[name]['saved'] += saved
+    return savings
+
+
+def profile_counts(profile: Dict[str, Any]) -> Dict[int, int]:
+    """{índice: ejecuciones} de un perfil de VirtualMachine.get_profile()."""
+    return {quad['index']: quad['count'] for quad in profile['quads']}
+
+
+def fusion_report(vms: Sequence[Any], names: Sequence[str] = SUPERINSTRUCTIONS) -> Dict[str, Any]:
+    """
+    Reducción de despachos en corridas perfiladas.
+
+    Args:
+        vms: VMs con profile=True que ya corrieron
+        names: Superinstrucciones a evaluar
+
+    Returns:
+        dict: {'programs': [{'program', 'quads', 'savings'}], 'totals':
+        {superinstrucción: despachos ahorrados}, 'quads': total de cuádruplos,
+        'mean': {superinstrucción: fracción ahorrada promedio por programa}}
+    """
+    programs = []
+    totals = {name: 0 for name in names}
+    mean = {name: 0.0 for name in names}
+    quads = 0
+    for vm in vms:
+        profile = vm.get_profile()
+        counts = profile_counts(profile)
+        # Cada una por separado: dos candidatas pueden empezar en el mismo
+        # cuádruplo (LT + GOTOF + GOTO) y aquí se compara cuánto ahorra cada una
+        savings = {}
+        for name in names:
+            savings.update(fusion_savings(vm.code, vm.region_layouts, counts, (name,)))
+        programs.append({'program': profile['program'], 'quads': profile['total_quads'], 'savings': savings})
+        quads += profile['total_quads']
+        for name in names:
+            totals[name] += savings[name]['saved']
+            mean[name] += savings[name]['saved'] / (profile['total_quads'] or 1) / len(vms)
+    return {'programs': programs, 'totals': totals, 'quads': quads, 'mean': mean}
+
+
+def choose_superinstructions(report: Dict[str, Any], min_savings: float = MIN_SAVINGS) -> Tuple[str, ...]:
+    """
+    Superinstrucciones que valen la pena según un fusion_report().
+
+    Se usa el promedio por programa y no el total, para que un programa
+    largo no decida por todos.
+
+    Returns:
+        tuple: Las que ahorran en promedio al menos min_savings de los
+        despachos, de la que más ahorra a la que menos
+    """
+    ranked = sorted(report['mean'].items(), key=lambda item: -item[1])
+    return tuple(name for name, saved in ranked if saved >= min_savings)
+
+
+def format_fusion_report(report: Dict[str, Any], names: Sequence[str] = DEFAULT_SUPERINSTRUCTIONS) -> str:
+    """
+    Reporte de texto: despachos ahorrados por superinstrucción y programa, y
+    la reducción con `names` fusionadas.
+    """
+    columns = list(report['totals'])
+    lines = [f"  {'programa':18} {'cuadruplos':>11} " + " ".join(f"{name:>15}" for name in columns)
+             + f" {'despachos':>11} {'reduccion':>9}"]
+    for program in report['programs']:
+        total = program['quads'] or 1
+        saved = sum(program['savings'][name]['saved'] for name in names if name in program['savings'])
+        lines.append(f"  {program['program'][:18]:18} {program['quads']:11} "
+                     + " ".join(f"{program['savings'][name]['saved'] / total:14.1%} " for name in columns)
+                     + f"{program['quads'] - saved:11} {saved / total:8.1%}")
+    quads = report['quads'] or 1
+    saved = sum(report['totals'][name] for name in names if name in report['totals'])
+    lines.append(f"  {'promedio':18} {'':11} "
+                 + " ".join(f"{report['mean'][name]:14.1%} " for name in columns))
+    lines.append(f"  {'total':18} {report['quads']:11} "
+                 + " ".join(f"{report['totals'][name] / quads:14.1%} " for name in columns)
+                 + f"{report['quads'] - saved:11} {saved / quads:8.1%}")
+    return "\n".join(lines)
@@ -0,0 +1,234 @@
+"""
+Backend de Código Enhebrado (closure-threaded) para la Máquina Virtual Patito
+
+Cada instrucción decodificada se compila una sola vez, al cargar, a una
+closure de Python especializada en sus operandos:
+- Constante: el valor queda ligado directamente en la closure
+- Global: la lista del segmento queda ligada (nunca cambia)
+- Local / temporal: se lee del frame plano en la tabla de segmentos, que
+  cambia con cada llamada
+
+Cada closure ejecuta su cuádruplo y regresa el siguiente IP, así que el loop
+principal es solo:
+
+    ip = code[ip]()
+
+Las closures se generan con fábricas compiladas por (opcode, tipos de
+operando) y se guardan en caché, así que hay pocas compilaciones aunque el
+programa sea grande.
+"""
+
+from typing import Any, Callable, Dict, List, Tuple
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_PLUS, OP_MINUS, OP_MUL, OP_DIV, OP_DIV_II, OP_DIV_FF,
+    OP_GT, OP_LT, OP_NEQ, OP_GOTO, OP_GOTOF, OP_PRINT, OP_PRINT_STR,
+    OP_ERA, OP_PARAM, OP_GOSUB, OP_RETURN, OP_ENDFUNC, OP_END,
+)
+from .frame_layout import FRAME_SEGMENTS
+
+CONST_SEGMENTS = (7, 8)
+
+# Plantillas de cada operación: {x}, {y} = operandos leídos, {w} = destino
+BINARY_TEMPLATES = {
+    OP_PLUS: "{w} = {x} + {y}",
+    OP_MINUS: "{w} = {x} - {y}",
+    OP_MUL: "{w} = {x} * {y}",
+    OP_DIV_II: "{w} = {x} // {y}",
+    OP_DIV_FF: "{w} = {x} / {y}",
+    OP_GT: "{w} = 1 if {x} > {y} else 0",
+    OP_LT: "{w} = 1 if {x} < {y} else 0",
+    OP_NEQ: "{w} = 1 if {x} != {y} else 0",
+    OP_DIV: (
+        "v1 = {x}\n"
+        "v2 = {y}\n"
+        "if v2 == 0:\n"
+        "    raise RuntimeError('División por cero')\n"
+        "if isinstance(v1, int) and isinstance(v2, int):\n"
+        "    {w} = v1 // v2\n"
+        "else:\n"
+        "    {w} = v1 / v2"
+    ),
+}
+
+_factory_cache: Dict[Tuple[int, str], Callable] = {}
+
+
+class _Halt(Exception):
+    """La instrucción END terminó el programa."""
+
+
+def _read_expr(kind: str, n: int) -> str:
+    """Expresión que lee el operando n según su tipo ('k', 'g' o 'f')."""
+    if kind == 'k':
+        return f"x{n}"
+    if kind == 'g':
+        return f"x{n}[y{n}]"
+    return f"segs[x{n}][y{n}]"
+
+
+def _factory(opcode: int, kinds: str) -> Callable:
+    """
+    Regresa (y guarda en caché) la fábrica de closures para un opcode con
+    los tipos de operando dados, p.ej. (OP_PLUS, 'fkf').
+    """
+    key = (opcode, kinds)
+    factory = _factory_cache.get(key)
+    if factory is not None:
+        return factory
+
+    reads = {'x': _read_expr(kinds[0], 1)}
+    if opcode == OP_ASSIGN:
+        body = "{w} = {x}"
+        reads['w'] = _read_expr(kinds[1], 3)
+    else:
+        body = BINARY_TEMPLATES[opcode]
+        reads['y'] = _read_expr(kinds[1], 2)
+        reads['w'] = _read_expr(kinds[2], 3)
+
+    lines = body.format(**reads).split("\n")
+    source = (
+        "def factory(segs, x1, y1, x2, y2, x3, y3, nxt):\n"
+        "    def run():\n"
+        + "".join(f"        {line}\n" for line in lines)
+        + "        return nxt\n"
+        "    return run\n"
+    )
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, f"<patito-threaded {opcode}:{kinds}>", "exec"), namespace)
+    factory = namespace['factory']
+    _factory_cache[key] = factory
+    return factory
+
+
+class ThreadedCode:
+    """
+    Programa compilado a closures para una VirtualMachine.
+
+    Comparte la memoria de la VM (ExecutionMemory) y sus rutinas de llamada,
+    así que el estado final (globales, salida) es el mismo que con el
+    intérprete.
+    """
+
+    def __init__(self, vm):
+        self.vm = vm
+        self.segs = vm.memory.segments
+        self.code: List[Callable[[], int]] = [
+            self._compile(index, instr) for index, instr in enumerate(vm.code)
+        ]
+
+    def _operand(self, seg: int, off: int):
+        """Regresa (tipo, x, y) para ligar un operando en la closure."""
+        if seg in CONST_SEGMENTS:
+            return 'k', self.segs[seg][off], 0
+        if seg in FRAME_SEGMENTS:
+            return 'f', seg, off
+        return 'g', self.segs[seg], off
+
+    def _compile(self, index: int, instr) -> Callable[[], int]:
+        op, a, b, c, d, e, f = instr
+        nxt = index + 1
+        vm = self.vm
+        memory = vm.memory
+        segs = self.segs
+
+        if op in BINARY_TEMPLATES:
+            k1, x1, y1 = self._operand(a, b)
+            k2, x2, y2 = self._operand(c, d)
+            k3, x3, y3 = self._operand(e, f)
+            return _factory(op, k1 + k2 + k3)(segs, x1, y1, x2, y2, x3, y3, nxt)
+
+        if op == OP_ASSIGN:
+            k1, x1, y1 = self._operand(a, b)
+            k3, x3, y3 = self._operand(e, f)
+            return _factory(op, k1 + k3)(segs, x1, y1, None, None, x3, y3, nxt)
+
+        if op == OP_GOTO:
+            def goto():
+                return f
+            return goto
+
+        if op == OP_GOTOF:
+            def gotof():
+                val = segs[a][b]
+                if val == 0 or val is False:
+                    return f
+                return nxt
+            return gotof
+
+        if op == OP_PRINT:
+            def print_value():
+                vm.output.write(str(segs[a][b]))
+                return nxt
+            return print_value
+
+        if op == OP_PRINT_STR:
+            def print_string():
+                vm.output.write(a)
+                return nxt
+            return print_string
+
+        if op == OP_ERA:
+            pending = vm.pending_frames
+            layout = a.layout
+
+            def era():
+                pending.append(layout.acquire())
+                return nxt
+            return era
+
+        if op == OP_PARAM:
+            pending = vm.pending_frames
+
+            def param():
+                pending[-1][f] = segs[a][b]
+                return nxt
+            return param
+
+        if op == OP_GOSUB:
+            pending = vm.pending_frames
+            push = memory.push_activation_record
+            layout = a.layout
+
+            def call():
+                push(nxt, layout, pending.pop())
+                return f
+            return call
+
+        if op == OP_RETURN:
+            pop = memory.pop_activation_record
+
+            def ret():
+                val = segs[a][b]
+                ip = pop()
+                if e is not None:
+                    segs[e][f] = val
+                return ip
+            return ret
+
+        if op == OP_ENDFUNC:
+            return memory.pop_activation_record
+
+        if op == OP_END:
+            def end():
+                raise _Halt(nxt)
+            return end
+
+        # OP_ERROR
+        def error():
+            raise RuntimeError(a)
+        return error
+
+    def run(self) -> None:
+        """Ejecuta desde el cuádruplo 0 hasta END."""
+        vm = self.vm
+        code = self.code
+        ip = 0
+        try:
+            while True:
+                ip = code[ip]()
+        except _Halt as halt:
+            ip = halt.args[0]
+            vm.running = False
+        finally:
+            vm.ip = ip
@@ -0,0 +1,363 @@
+"""
+Trazas de Ciclos Calientes para la Máquina Virtual Patito
+
+Casi todo el tiempo de un programa se va en unos pocos `while`. El ciclo
+termina siempre con un GOTO hacia atrás (la arista de regreso que genera
+_visit_cycle), así que la VM marca esos GOTO como OP_LOOP y cuenta cuántas
+veces se toma cada uno:
+
+1. Al pasar el umbral se graba la traza de UNA vuelta: los cuádruplos que
+   realmente se ejecutaron desde el inicio del ciclo hasta la arista de
+   regreso, junto con la dirección que tomó cada GOTOF.
+2. La traza se compila a una función de Python en línea recta dentro de un
+   `while True`; cada GOTOF se vuelve una guarda que sale de la traza si la
+   condición no va por el mismo lado que en la grabación.
+3. Al fallar una guarda la traza regresa el IP donde debe seguir el
+   intérprete, que continúa normalmente.
+
+Solo se trazan ciclos cuyo cuerpo es aritmética, asignaciones, saltos y
+prints. Un ciclo con llamadas o con otro ciclo adentro se marca como no
+trazable (el ciclo interno sí se puede trazar por su cuenta).
+"""
+
+import math
+import time
+import operator
+from typing import Any, Dict, List, Optional, Tuple
+
+from .quad_decoder import (
+    OP_ASSIGN, OP_PLUS, OP_MINUS, OP_MUL, OP_DIV, OP_DIV_II, OP_DIV_FF,
+    OP_GT, OP_LT, OP_NEQ, OP_GOTO, OP_GOTOF, OP_PRINT, OP_PRINT_STR,
+    OP_LOOP, opcode_name,
+)
+
+CONST_SEGMENTS = (7, 8)
+
+# Una vuelta más larga que esto no se traza
+MAX_TRACE_LENGTH = 2000
+
+BINARY_EXPRS = {
+    OP_PLUS: "{x} + {y}",
+    OP_MINUS: "{x} - {y}",
+    OP_MUL: "{x} * {y}",
+    OP_DIV_II: "{x} // {y}",
+    OP_DIV_FF: "{x} / {y}",
+    OP_GT: "1 if {x} > {y} else 0",
+    OP_LT: "1 if {x} < {y} else 0",
+    OP_NEQ: "1 if {x} != {y} else 0",
+}
+
+
+def _divide(x, y):
+    if y == 0:
+        raise RuntimeError("División por cero")
+    if isinstance(x, int) and isinstance(y, int):
+        return x // y
+    return x / y
+
+
+# Semántica de cada operación para grabar la traza (igual que el intérprete)
+BINARY_FUNCS = {
+    OP_PLUS: operator.add,
+    OP_MINUS: operator.sub,
+    OP_MUL: operator.mul,
+    OP_DIV_II: operator.floordiv,
+    OP_DIV_FF: operator.truediv,
+    OP_DIV: _divide,
+    OP_GT: lambda x, y: 1 if x > y else 0,
+    OP_LT: lambda x, y: 1 if x < y else 0,
+    OP_NEQ: lambda x, y: 1 if x != y else 0,
+}
+
+
+class TraceFault(Exception):
+    """
+    Error dentro de una traza (o de su grabación).
+
+    Lleva el cuádruplo que falló y cuántos cuádruplos se ejecutaron, para
+    que el intérprete deje su IP y su contador igual que si lo hubiera
+    ejecutado él.
+    """
+
+    def __init__(self, ip: int, executed: int, error: BaseException):
+        super().__init__(ip, executed, error)
+        self.ip = ip
+        self.executed = executed
+        self.error = error
+
+
+def mark_back_edges(code: List) -> List:
+    """
+    Regresa una copia de las instrucciones con cada GOTO hacia atrás (o a
+    sí mismo) convertido en OP_LOOP.
+    """
+    marked = []
+    for index, instr in enumerate(code):
+        if instr[0] == OP_GOTO and isinstance(instr[6], int) and instr[6] <= index:
+            instr = (OP_LOOP,) + tuple(instr[1:])
+        marked.append(instr)
+    return marked
+
+
+class CompiledTrace:
+    """Una traza compilada y sus contadores."""
+
+    def __init__(self, header: int, edge: int, path: List[Tuple[int, Optional[bool]]],
+                 source: str, function, compile_ms: float):
+        self.header = header
+        self.edge = edge
+        self.path = path
+        self.length = len(path)
+        self.source = source
+        self.function = function
+        self.compile_ms = compile_ms
+        self.entries = 0
+        self.executed = 0
+        self.guard_exits: Dict[int, int] = {}
+
+
+class HotLoopTracer:
+    """
+    Contadores de aristas de regreso y trazas compiladas de una VM.
+
+    El intérprete llama back_edge() cada vez que ejecuta un OP_LOOP.
+    """
+
+    def __init__(self, vm, threshold: int):
+        if threshold < 1:
+            raise ValueError(f"El umbral de ciclos calientes debe ser >= 1: {threshold}")
+        self.vm = vm
+        self.code = vm.code
+        self.segs = vm.memory.segments
+        self.threshold = threshold
+        self.hits: Dict[int, int] = {}
+        self.traces: Dict[int, CompiledTrace] = {}
+        self.rejected: Dict[int, str] = {}
+        self.events: List[Dict[str, Any]] = []
+
+    # -- Entrada desde el intérprete -------------------------------------------
+
+    def back_edge(self, edge: int, header: int) -> Tuple[int, int]:
+        """
+        Procesa la arista de regreso `edge` (un OP_LOOP hacia `header`).
+
+        Returns:
+            (siguiente IP, cuádruplos ejecutados fuera del intérprete)
+        """
+        trace = self.traces.get(edge)
+        if trace is not None:
+            return self._enter(trace)
+
+        hits = self.hits.get(edge, 0) + 1
+        self.hits[edge] = hits
+        if hits < self.threshold or edge in self.rejected:
+            return header, 0
+
+        ip, executed, path = self._record(edge, header)
+        if path is None:
+            return ip, executed
+
+        trace = self._compile(edge, header, path)
+        self.traces[edge] = trace
+        self.events.append({
+            'event': 'compile',
+            'edge': edge,
+            'header': header,
+            'length': trace.length,
+            'hits': hits,
+            'compile_ms': trace.compile_ms,
+        })
+        # La vuelta grabada terminó en la arista de regreso: seguir en la traza
+        try:
+            ip, in_trace = self._enter(trace)
+        except TraceFault as fault:
+            fault.executed += executed
+            raise
+        return ip, executed + in_trace
+
+    def _enter(self, trace: CompiledTrace) -> Tuple[int, int]:
+        trace.entries += 1
+        try:
+            ip, executed = trace.function(self.segs, self.vm.output.write)
+        except TraceFault as fault:
+            trace.executed += fault.executed
+            raise
+        trace.executed += executed
+        trace.guard_exits[ip] = trace.guard_exits.get(ip, 0) + 1
+        return ip, executed
+
+    # -- Grabación -------------------------------------------------------------
+
+    def _reject(self, edge: int, header: int, reason: str) -> None:
+        self.rejected[edge] = reason
+        self.events.append({'event': 'reject', 'edge': edge, 'header': header, 'reason': reason})
+
+    def _record(self, edge: int, header: int):
+        """
+        Ejecuta una vuelta del ciclo grabando el camino.
+
+        Returns:
+            (siguiente IP, cuádruplos ejecutados, camino o None si no se
+            pudo grabar una vuelta completa)
+        """
+        code = self.code
+        segs = self.segs
+        emit = self.vm.output.write
+        path: List[Tuple[int, Optional[bool]]] = []
+        ip = header
+
+        while True:
+            if len(path) >= MAX_TRACE_LENGTH:
+                self._reject(edge, header, "vuelta demasiado larga")
+                return ip, len(path), None
+
+            op, a, b, c, d, e, f = code[ip]
+
+            if ip == edge:
+                path.append((ip, None))
+                return header, len(path), path
+
+            if op in BINARY_FUNCS:
+                try:
+                    segs[e][f] = BINARY_FUNCS[op](segs[a][b], segs[c][d])
+                except Exception as error:
+                    raise TraceFault(ip, len(path) + 1, error) from None
+                path.append((ip, None))
+                ip += 1
+
+            elif op == OP_ASSIGN:
+                segs[e][f] = segs[a][b]
+                path.append((ip, None))
+                ip += 1
+
+            elif op == OP_GOTOF:
+                taken = segs[a][b] == 0
+                path.append((ip, taken))
+                ip = f if taken else ip + 1
+
+            elif op == OP_GOTO:
+                path.append((ip, None))
+                ip = f
+
+            elif op == OP_PRINT:
+                emit(str(segs[a][b]))
+                path.append((ip, None))
+                ip += 1
+
+            elif op == OP_PRINT_STR:
+                emit(a)
+                path.append((ip, None))
+                ip += 1
+
+            else:
+                # Llamadas, ciclos internos, END, errores: no se trazan
+                name = "ciclo interno" if op == OP_LOOP else opcode_name(op)
+                self._reject(edge, header, f"{name} en el cuádruplo {ip}")
+                return ip, len(path), None
+
+            if not header <= ip <= edge:
+                # El ciclo terminó durante la grabación: intentar la próxima vez
+                return ip, len(path), None
+
+    # -- Compilación -----------------------------------------------------------
+
+    def _read(self, seg: int, off: int) -> str:
+        if seg in CONST_SEGMENTS:
+            value = self.segs[seg][off]
+            if isinstance(value, float) and not math.isfinite(value):
+                return f"float({str(value)!r})"
+            return repr(value)
+        return f"s{seg}[{off}]"
+
+    def _compile(self, edge: int, header: int, path: List[Tuple[int, Optional[bool]]]) -> CompiledTrace:
+        started = time.perf_counter()
+        code = self.code
+        length = len(path)
+        used = set()
+        body: List[str] = []
+
+        def read(seg, off):
+            if seg not in CONST_SEGMENTS:
+                used.add(seg)
+            return self._read(seg, off)
+
+        for position, (ip, taken) in enumerate(path):
+            op, a, b, c, d, e, f = code[ip]
+            done = f"n + {position + 1}"
+
+            if op in BINARY_EXPRS:
+                expr = BINARY_EXPRS[op].format(x=read(a, b), y=read(c, d))
+                body.append(f"{read(e, f)} = {expr}")
+
+            elif op == OP_DIV:
+                x, y = read(a, b), read(c, d)
+                body.append(f"x = {x}")
+                body.append(f"y = {y}")
+                body.append("if y == 0:")
+                body.append(f"    raise TraceFault({ip}, {done}, RuntimeError('División por cero'))")
+                body.append(f"{read(e, f)} = x // y if isinstance(x, int) and isinstance(y, int) else x / y")
+
+            elif op == OP_ASSIGN:
+                body.append(f"{read(e, f)} = {read(a, b)}")
+
+            elif op == OP_GOTOF:
+                # Guarda: salir si la condición va por el otro lado
+                if taken:
+                    body.append(f"if {read(a, b)} != 0:")
+                    body.append(f"    return {ip + 1}, {done}")
+                else:
+                    body.append(f"if {read(a, b)} == 0:")
+                    body.append(f"    return {f}, {done}")
+
+            elif op == OP_PRINT:
+                body.append(f"emit(str({read(a, b)}))")
+
+            elif op == OP_PRINT_STR:
+                body.append(f"emit({a!r})")
+
+            # GOTO y la arista de regreso no generan código
+
+        lines = ["def trace(segs, emit):"]
+        lines.extend(f"    s{seg} = segs[{seg}]" for seg in sorted(used))
+        lines.append("    n = 0")
+        lines.append("    while True:")
+        lines.extend(f"        {line}" for line in body)
+        lines.append(f"        n += {length}")
+        source = "\n".join(lines) + "\n"
+
+        namespace: Dict[str, Any] = {'TraceFault': TraceFault}
+        exec(compile(source, f"<patito-trace {header}-{edge}>", "exec"), namespace)
+        compile_ms = (time.perf_counter() - started) * 1000
+        return CompiledTrace(header, edge, path, source, namespace['trace'], compile_ms)
+
+    # -- Estadísticas ----------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas de ciclos calientes y de compilación.
+
+        Returns:
+            dict: {'threshold', 'loops': {arista: {...}}, 'events': [...]}
+        """
+        loops = {}
+        for edge, hits in sorted(self.hits.items()):
+            header = self.code[edge][6]
+            info: Dict[str, Any] = {'header': header, 'hits': hits, 'status': 'frío'}
+            if edge in self.traces:
+                trace = self.traces[edge]
+                info.update({
+                    'status': 'compilado',
+                    'length': trace.length,
+                    'entries': trace.entries,
+                    'executed': trace.executed,
+                    'iterations': trace.executed // trace.length,
+                    'guard_exits': dict(trace.guard_exits),
+                })
+            elif edge in self.rejected:
+                info.update({'status': 'rechazado', 'reason': self.rejected[edge]})
+            loops[edge] = info
+        return {
+            'threshold': self.threshold,
+            'loops': loops,
+            'events': list(self.events),
+        }
@@ -0,0 +1,472 @@
+"""
+Servidor de ejecución con procesos calientes y caché de programas
+
+`patito worker-pool` atiende pedidos de "corre este programa" (JSONL por
+stdin o por un socket Unix) sin pagar por pedido el arranque de Python ni
+ObjGenerator.load():
+
+- Los workers se crean al arrancar con fork, después de importar la VM,
+  y se quedan esperando pedidos.
+- Cada worker guarda las VMs que ya decodificó en un LRU con llave el
+  hash del contenido (sha256 del .obj o del código fuente). execute()
+  deja la memoria como recién cargada, así que un acierto de caché solo
+  cuesta la ejecución.
+- El proceso principal lleva una copia de los LRU de cada worker y manda
+  cada pedido, en orden de llegada, a un worker libre que ya tenga el
+  programa; si ninguno libre lo tiene, al primero libre. Al worker solo
+  se le manda el contenido cuando no lo tiene.
+
+Pedidos (una línea JSON cada uno; 'id' se regresa tal cual):
+
+    {"id": 1, "obj": "programa.obj"}
+    {"id": 2, "source": "programa P; main { print(1); } end"}
+    {"cmd": "stats"}
+
+Cada respuesta es el registro de la corrida (ver batch_runner.run_loaded())
+más 'id', 'cached' y 'latency' (segundos desde que llegó el pedido). Las
+respuestas salen en el orden en que terminan.
+"""
+
+import os
+import sys
+import json
+import math
+import signal
+import time
+import asyncio
+import hashlib
+import multiprocessing
+from pathlib import Path
+from collections import OrderedDict, deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+from .batch_runner import EXIT_OK, EXIT_ERROR, EXIT_LOAD_ERROR, run_loaded
+
+# Programas decodificados que guarda cada worker si no se da otro valor
+DEFAULT_CACHE_SIZE = 64
+
+# Latencias que se guardan para los percentiles (las más recientes)
+LATENCY_WINDOW = 10_000
+
+
+def _context():
+    """fork si existe: los workers nacen con la VM ya importada."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in methods else None)
+
+
+def _touch(cache: OrderedDict, key: str, cache_size: int) -> bool:
+    """
+    Marca la llave como la más reciente del LRU.
+
+    Returns:
+        bool: True si ya estaba (acierto)
+    """
+    if key in cache:
+        cache.move_to_end(key)
+        return True
+    cache[key] = None
+    while len(cache) > cache_size:
+        cache.popitem(last=False)
+    return False
+
+
+def _decode(kind: str, payload: str) -> Dict[str, Any]:
+    """Datos del programa a partir del contenido de un .obj o de código fuente."""
+    if kind == 'obj':
+        from .obj_generator import ObjGenerator
+        return ObjGenerator.loads(payload)
+    from .patito_parser import parse_and_validate
+    sdt = parse_and_validate(payload)
+    if sdt.has_errors():
+        raise ValueError("; ".join(str(error) for error in sdt.errors))
+    return sdt.to_obj()
+
+
+def _worker_main(conn, cache_size: int, options: Dict[str, Any]) -> None:
+    """Ciclo de un worker: recibe (llave, tipo, contenido) y responde el registro."""
+    from .virtual_machine import VirtualMachine
+
+    cache: OrderedDict = OrderedDict()
+    pid = os.getpid()
+    conn.send(pid)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message is None:
+            break
+        key, kind, payload = message
+        record: Dict[str, Any] = {
+            'status': 'ok', 'exit_code': EXIT_OK, 'output': '', 'quads': 0,
+            'time': 0.0, 'error': None, 'worker': pid,
+        }
+        if not _touch(cache, key, cache_size):
+            # Las excepciones también se guardan: la copia del LRU en el
+            # proceso principal no sabe si decodificar falló
+            try:
+                cache[key] = VirtualMachine(_decode(kind, payload), **options)
+            except Exception as e:
+                cache[key] = e
+        vm = cache[key]
+        if isinstance(vm, Exception):
+            record.update(status='load_error', exit_code=EXIT_LOAD_ERROR, error=str(vm))
+        else:
+            run_loaded(vm, record)
+        conn.send(record)
+    conn.close()
+
+
+class _Job:
+    """Un pedido esperando worker."""
+
+    __slots__ = ('request_id', 'key', 'kind', 'payload', 'future', 'received')
+
+    def __init__(self, request_id, key, kind, payload, future, received):
+        self.request_id = request_id
+        self.key = key
+        self.kind = kind
+        self.payload = payload
+        self.future = future
+        self.received = received
+
+
+class _Worker:
+    """Lado del proceso principal de un worker."""
+
+    __slots__ = ('process', 'conn', 'pid', 'cached', 'job', 'hit')
+
+    def __init__(self, process, conn, pid: int):
+        self.process = process
+        self.conn = conn
+        self.pid = pid
+        self.cached: OrderedDict = OrderedDict()    # copia del LRU del worker
+        self.job: Optional[_Job] = None
+        self.hit = False
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    """Percentil por rango más cercano de una lista ordenada."""
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+class WorkerPool:
+    """
+    Pool de procesos calientes que ejecutan programas Patito.
+
+    Args:
+        workers: Procesos (default: todos los núcleos)
+        cache_size: Programas decodificados por worker (LRU)
+        timeout: Segundos por corrida (time_limit de la VM)
+        max_quads: Presupuesto de cuádruplos por corrida
+    """
+
+    def __init__(self, workers: Optional[int] = None, cache_size: int = DEFAULT_CACHE_SIZE,
+                 timeout: Optional[float] = None, max_quads: Optional[int] = None):
+        if cache_size < 1:
+            raise ValueError(f"La caché debe guardar al menos 1 programa: {cache_size}")
+        self.size = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.options: Dict[str, Any] = {'engine': 'interp'}
+        if timeout is not None:
+            self.options['time_limit'] = timeout
+        if max_quads is not None:
+            self.options['max_quads'] = max_quads
+
+        self.workers: List[_Worker] = []
+        self._idle: Deque[_Worker] = deque()
+        self._pending: Deque[_Job] = deque()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._started: Optional[float] = None
+
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self.max_queue_depth = 0
+        self.counts = {'requests': 0, 'ok': 0, 'errors': 0, 'timeouts': 0, 'load_errors': 0,
+                       'cache_hits': 0, 'cache_misses': 0, 'restarts': 0}
+
+    # =========================================================================
+    # Procesos
+    # =========================================================================
+
+    def start(self) -> None:
+        """Crea los workers y espera a que estén listos."""
+        # Importar antes del fork: los workers ya no lo pagan
+        from . import virtual_machine  # noqa: F401
+        self._started = time.perf_counter()
+        for _ in range(self.size):
+            worker = self._spawn()
+            self.workers.append(worker)
+            self._idle.append(worker)
+
+    def _spawn(self) -> _Worker:
+        context = _context()
+        parent_conn, child_conn = context.Pipe()
+        process = context.Process(target=_worker_main, daemon=True,
+                                  args=(child_conn, self.cache_size, self.options))
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn, parent_conn.recv())
+        if self._loop is not None:
+            self._loop.add_reader(parent_conn.fileno(), self._on_result, worker)
+        return worker
+
+    def _attach(self) -> None:
+        """Escucha las respuestas de los workers en el loop de asyncio actual."""
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        self._loop = loop
+        for worker in self.workers:
+            loop.add_reader(worker.conn.fileno(), self._on_result, worker)
+
+    def _detach(self, worker: _Worker) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.remove_reader(worker.conn.fileno())
+
+    def close(self) -> None:
+        """Detiene los workers."""
+        for worker in self.workers:
+            self._detach(worker)
+            try:
+                worker.conn.send(None)
+            except OSError:
+                pass
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self.workers.clear()
+        self._idle.clear()
+
+    def _replace(self, worker: _Worker) -> None:
+        """Un worker murió: su pedido falla y otro toma su lugar."""
+        self._detach(worker)
+        worker.conn.close()
+        worker.process.join(timeout=1)
+        self.counts['restarts'] += 1
+        job = worker.job
+        if job is not None:
+            record = {'status': 'error', 'exit_code': EXIT_ERROR, 'output': '', 'quads': 0,
+                      'time': 0.0, 'worker': worker.pid,
+                      'error': f"El worker {worker.pid} terminó (código {worker.process.exitcode})"}
+            self._complete(job, record, worker.hit)
+        replacement = self._spawn()
+        self.workers[self.workers.index(worker)] = replacement
+        self._idle.append(replacement)
+        self._dispatch()
+
+    # =========================================================================
+    # Pedidos
+    # =========================================================================
+
+    async def run(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Corre un pedido en algún worker.
+
+        Args:
+            request: {'id', 'obj': ruta} o {'id', 'source': código}
+
+        Returns:
+            dict: Registro de la corrida más 'id', 'cached' y 'latency'
+        """
+        received = time.perf_counter()
+        self._attach()
+        job = _Job(request.get('id'), None, None, None, self._loop.create_future(), received)
+        try:
+            if 'obj' in request:
+                job.kind = 'obj'
+                job.payload = Path(request['obj']).read_text(encoding='utf-8')
+            elif 'source' in request:
+                job.kind = 'source'
+                job.payload = str(request['source'])
+            else:
+                raise ValueError("El pedido necesita 'obj' o 'source'")
+        except (OSError, ValueError) as e:
+            record = {'status': 'load_error', 'exit_code': EXIT_LOAD_ERROR, 'output': '',
+                      'quads': 0, 'time': 0.0, 'error': str(e), 'worker': None}
+            self._complete(job, record, False)
+            return job.future.result()
+
+        job.key = hashlib.sha256(f"{job.kind}\0{job.payload}".encode('utf-8')).hexdigest()
+        self._pending.append(job)
+        self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+        self._dispatch()
+        return await job.future
+
+    def _dispatch(self) -> None:
+        """Manda los pedidos en espera, en orden, a los workers libres."""
+        while self._pending and self._idle:
+            job = self._pending.popleft()
+            worker = next((w for w in self._idle if job.key in w.cached), self._idle[0])
+            self._idle.remove(worker)
+            worker.job = job
+            worker.hit = _touch(worker.cached, job.key, self.cache_size)
+            self.counts['cache_hits' if worker.hit else 'cache_misses'] += 1
+            worker.conn.send((job.key, job.kind, None if worker.hit else job.payload))
+
+    def _on_result(self, worker: _Worker) -> None:
+        try:
+            record = worker.conn.recv()
+        except (EOFError, OSError):
+            self._replace(worker)
+            return
+        job, worker.job = worker.job, None
+        self._idle.append(worker)
+        self._complete(job, record, worker.hit)
+        self._dispatch()
+
+    def _complete(self, job: _Job, record: Dict[str, Any], hit: bool) -> None:
+        latency = time.perf_counter() - job.received
+        record = {'id': job.request_id, **record, 'cached': hit, 'latency': latency}
+        self.latencies.append(latency)
+        self.counts['requests'] += 1
+        counter = {'ok': 'ok', 'error': 'errors', 'timeout': 'timeouts', 'load_error': 'load_errors'}
+        self.counts[counter[record['status']]] += 1
+        if not job.future.done():
+            job.future.set_result(record)
+
+    # =========================================================================
+    # Estadísticas
+    # =========================================================================
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Estadísticas del servidor.
+
+        Returns:
+            dict: Contadores de pedidos, 'queue_depth' y 'max_queue_depth',
+            aciertos de caché y 'cache_hit_rate', 'latency_ms' (p50, p90,
+            p99, max de las últimas LATENCY_WINDOW) y 'uptime'
+        """
+        latencies = sorted(self.latencies)
+        lookups = self.counts['cache_hits'] + self.counts['cache_misses']
+        stats: Dict[str, Any] = {'workers': self.size}
+        stats.update(self.counts)
+        stats.update({
+            'queue_depth': len(self._pending),
+            'max_queue_depth': self.max_queue_depth,
+            'cache_hit_rate': self.counts['cache_hits'] / lookups if lookups else 0.0,
+            'latency_ms': {
+                'p50': _percentile(latencies, 0.50) * 1000,
+                'p90': _percentile(latencies, 0.90) * 1000,
+                'p99': _percentile(latencies, 0.99) * 1000,
+                'max': latencies[-1] * 1000 if latencies else 0.0,
+            },
+            'uptime': time.perf_counter() - self._started if self._started else 0.0,
+        })
+        return stats
+
+
+def format_stats(stats: Dict[str, Any]) -> str:
+    """Reporte en texto de WorkerPool.stats()."""
+    latency = stats['latency_ms']
+    return "\n".join([
+        f"Workers:    {stats['workers']} ({stats['restarts']} reemplazados)",
+        f"Pedidos:    {stats['requests']} (ok {stats['ok']}, errores {stats['errors']}, "
+        f"limite {stats['timeouts']}, sin cargar {stats['load_errors']})",
+        f"Cola:       {stats['queue_depth']} ahora, {stats['max_queue_depth']} maximo",
+        f"Cache:      {stats['cache_hit_rate']:.1%} aciertos "
+        f"({stats['cache_hits']} de {stats['cache_hits'] + stats['cache_misses']})",
+        f"Latencia:   p50 {latency['p50']:.2f} ms, p90 {latency['p90']:.2f} ms, "
+        f"p99 {latency['p99']:.2f} ms, max {latency['max']:.2f} ms",
+    ])
+
+
+# =============================================================================
+# Frontends
+# =============================================================================
+
+async def _answer(pool: WorkerPool, line: str, write: Callable[[Dict[str, Any]], None]) -> None:
+    try:
+        request = json.loads(line)
+        if not isinstance(request, dict):
+            raise ValueError("El pedido debe ser un objeto JSON")
+    except ValueError as e:
+        write({'id': None, 'status': 'load_error', 'exit_code': EXIT_LOAD_ERROR,
+               'error': f"Pedido inválido: {e}"})
+        return
+    if request.get('cmd') == 'stats':
+        write(pool.stats())
+    else:
+        write(await pool.run(request))
+
+
+async def serve_stdin(pool: WorkerPool, stdin=None, stdout=None) -> None:
+    """Atiende pedidos JSONL de stdin hasta EOF; las respuestas van a stdout."""
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    loop = asyncio.get_running_loop()
+
+    def write(response):
+        stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+        stdout.flush()
+
+    tasks = []
+    while True:
+        line = await loop.run_in_executor(None, stdin.readline)
+        if not line:
+            break
+        if line.strip():
+            tasks.append(asyncio.ensure_future(_answer(pool, line, write)))
+    await asyncio.gather(*tasks)
+
+
+async def serve_unix(pool: WorkerPool, path: str) -> None:
+    """Atiende pedidos JSONL en un socket Unix; cada conexión recibe sus respuestas."""
+
+    async def client(reader, writer):
+        def write(response):
+            writer.write((json.dumps(response, ensure_ascii=False) + "\n").encode('utf-8'))
+
+        tasks = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                tasks.append(asyncio.ensure_future(_answer(pool, line.decode('utf-8'), write)))
+        await asyncio.gather(*tasks)
+        await writer.drain()
+        writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(client, path)
+    # SIGTERM detiene el servidor como Ctrl-C (y se reportan las estadísticas)
+    serving = asyncio.ensure_future(server.serve_forever())
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGTERM, serving.cancel)
+    try:
+        await serving
+    except asyncio.CancelledError:
+        pass
+    finally:
+        loop.remove_signal_handler(signal.SIGTERM)
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+def run_requests(requests: Iterable[Dict[str, Any]], **options) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Atajo síncrono: corre los pedidos en un pool nuevo y lo cierra.
+
+    Args:
+        requests: Pedidos como los de stdin
+        **options: Opciones de WorkerPool
+
+    Returns:
+        tuple: (respuestas en el orden de los pedidos, estadísticas)
+    """
+    pool = WorkerPool(**options)
+    pool.start()
+    try:
+        async def run_all():
+            return await asyncio.gather(*(pool.run(request) for request in requests))
+        responses = asyncio.run(run_all())
+        return list(responses), pool.stats()
+    finally:
+        pool.close()
@@ -10,6 +10,9 @@ setup(
     install_requires=[
         "lark",
     ],
+    extras_require={
+        "numpy": ["numpy"],
+    },
     python_requires=">=3.7",
 )
 
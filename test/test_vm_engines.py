@@ -0,0 +1,677 @@
+"""
+Tests de los motores de ejecución alternos de la Máquina Virtual Patito.
+
+Cada motor debe producir exactamente la misma salida que el intérprete.
+"""
+
+import pytest
+from patito import parse_and_validate, VirtualMachine
+from patito.virtual_machine import ENGINES
+
+
+PROGRAMS = {
+    'recursion': """
+    programa Fib;
+    var r: int;
+    int fib(n: int) {
+        {
+            if (n < 2) {
+                return(n);
+            };
+            return(fib(n - 1) + fib(n - 2));
+        }
+    };
+    main {
+        r = fib(12);
+        print("fib=", r);
+    }
+    end
+    """,
+    'ciclos': """
+    programa Ciclos;
+    var i, j, s: int;
+    var f: float;
+    main {
+        i = 0;
+        s = 0;
+        f = 0.5;
+        while (i < 20) do {
+            j = 0;
+            while (j < 10) do {
+                s = s + i * j - j / 3;
+                f = f + 1.5 / 4.0;
+                j = j + 1;
+            };
+            if (i != 7) {
+                s = s - 1;
+            } else {
+                print("siete ", s, " ");
+            };
+            i = i + 1;
+        };
+        print(s, " ", f, " ", f / 3);
+    }
+    end
+    """,
+    'llamadas': """
+    programa Llamadas;
+    var t, k: int;
+    var acc: float;
+    int suma(a: int, b: int) {
+        var c: int;
+        {
+            c = a + b;
+            return(c);
+        }
+    };
+    float mezcla(x: int, y: float) {
+        {
+            return(x * y + y / 2);
+        }
+    };
+    void reporta(v: int, w: float) {
+        {
+            print("[", v, ",", w, "]");
+        }
+    };
+    main {
+        t = 0;
+        k = 0;
+        acc = 1;
+        while (k < 30) do {
+            t = suma(t, suma(k, 1));
+            acc = mezcla(k, acc) / 100;
+            k = k + 1;
+        };
+        reporta(t, acc);
+        reporta(suma(2, 3), mezcla(3, 2.5));
+    }
+    end
+    """,
+    'floats': """
+    programa Floats;
+    var a, b: int;
+    var x, y, z: float;
+    main {
+        a = 9;
+        b = 2;
+        x = a;
+        y = 2;
+        z = x / y;
+        print(z, " ", a / b, " ", 1.0e2 / 3, " ", x - y * 3.5);
+    }
+    end
+    """,
+}
+
+
+def compile_obj(source_code):
+    sdt = parse_and_validate(source_code)
+    assert not sdt.has_errors(), sdt.errors
+    return sdt.to_obj()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_motor_produce_la_misma_salida(name, engine):
+    obj = compile_obj(PROGRAMS[name])
+    expected = VirtualMachine(obj).execute()
+    vm = VirtualMachine(obj, engine=engine)
+    assert vm.execute() == expected
+    # El estado final de las globales también coincide
+    reference = VirtualMachine(obj)
+    reference.execute()
+    assert vm.get_memory_snapshot()['global'] == reference.get_memory_snapshot()['global']
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_motor_division_por_cero(engine):
+    obj = compile_obj("""
+    programa P;
+    var a, b: int;
+    main {
+        a = 3;
+        b = a - 3;
+        print("antes");
+        print(a / b);
+    }
+    end
+    """)
+    vm = VirtualMachine(obj, engine=engine)
+    with pytest.raises(RuntimeError, match="División por cero"):
+        vm.execute()
+    assert vm.output_buffer == ["antes"]
+
+
+def test_motor_desconocido():
+    obj = compile_obj("programa P; main { } end")
+    with pytest.raises(ValueError, match="Motor desconocido"):
+        VirtualMachine(obj, engine="turbo")
+
+
+def test_threaded_se_puede_ejecutar_dos_veces():
+    obj = compile_obj(PROGRAMS['recursion'])
+    vm = VirtualMachine(obj, engine="threaded")
+    assert vm.execute() == vm.execute() == ["fib=", "144"]
+
+
+def test_pyjit_reusa_codigo_en_cache():
+    from patito import vm_pyjit
+    vm_pyjit.clear_cache()
+    obj = compile_obj(PROGRAMS['llamadas'])
+    first = VirtualMachine(obj, engine="pyjit")
+    second = VirtualMachine(obj, engine="pyjit")
+    assert first._pyjit.compiled is second._pyjit.compiled
+    assert first.execute() == second.execute()
+
+
+def test_pyjit_cache_acotada(monkeypatch):
+    from patito import vm_pyjit
+    vm_pyjit.clear_cache()
+    monkeypatch.setattr(vm_pyjit, "CODE_CACHE_SIZE", 2)
+    llamadas = compile_obj(PROGRAMS['llamadas'])
+    recursion = compile_obj(PROGRAMS['recursion'])
+    otro = compile_obj("programa C; var x: int; main { x = 1; print(x); } end")
+
+    first = VirtualMachine(llamadas, engine="pyjit")._pyjit.compiled
+    second = VirtualMachine(recursion, engine="pyjit")._pyjit.compiled
+    # Usar 'llamadas' otra vez la vuelve la más reciente: sale 'recursion'
+    assert VirtualMachine(llamadas, engine="pyjit")._pyjit.compiled is first
+    VirtualMachine(otro, engine="pyjit")
+    assert len(vm_pyjit._code_cache) == 2
+    assert VirtualMachine(llamadas, engine="pyjit")._pyjit.compiled is first
+    assert VirtualMachine(recursion, engine="pyjit")._pyjit.compiled is not second
+    vm_pyjit.clear_cache()
+
+
+def test_pyjit_recursion_profunda():
+    obj = compile_obj("""
+    programa Profundo;
+    var r: int;
+    int cuenta(n: int) {
+        {
+            if (n < 1) {
+                return(0);
+            };
+            return(cuenta(n - 1) + 1);
+        }
+    };
+    main {
+        r = cuenta(3000);
+        print(r);
+    }
+    end
+    """)
+    assert VirtualMachine(obj, engine="pyjit").execute() == ["3000"]
+
+
+def test_pyjit_limite_de_recursion_compartido():
+    import sys
+    from patito import vm_pyjit
+    from patito.frame_layout import CallDepthError
+    original = sys.getrecursionlimit()
+
+    # Una corrida que termina no baja el límite mientras otra sigue activa
+    vm_pyjit._acquire_recursion_limit(original + 5000)
+    vm_pyjit._acquire_recursion_limit(original + 100)
+    vm_pyjit._release_recursion_limit()
+    assert sys.getrecursionlimit() == original + 5000
+    vm_pyjit._release_recursion_limit()
+    assert sys.getrecursionlimit() == original
+
+    obj = compile_obj("""
+    programa Hondo;
+    var r: int;
+    int cuenta(n: int) {
+        {
+            if (n < 1) {
+                return(0);
+            };
+            return(cuenta(n - 1) + 1);
+        }
+    };
+    main {
+        r = cuenta(30000);
+    }
+    end
+    """)
+    with pytest.raises(CallDepthError, match="pyjit"):
+        VirtualMachine(obj, engine="pyjit").execute()
+    assert sys.getrecursionlimit() == original
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_profundidad_maxima_de_llamadas(engine):
+    from patito.frame_layout import CallDepthError
+    obj = compile_obj(PROGRAMS['recursion'])
+    # fib(12) llega a 12 llamadas activas
+    assert VirtualMachine(obj, engine=engine, max_depth=12).execute() == ["fib=", "144"]
+    with pytest.raises(CallDepthError, match=r"Profundidad máxima de llamadas excedida \(5\) al llamar a 'fib'"):
+        VirtualMachine(obj, engine=engine, max_depth=5).execute()
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_muestreo_del_stack_de_llamadas(engine):
+    from patito.output_sink import DiscardSink
+    obj = compile_obj(PROGRAMS['recursion'].replace("fib(12)", "fib(20)"))
+    vm = VirtualMachine(obj, engine=engine, sample_rate=2000)
+    vm.execute(DiscardSink())
+    samples = vm.get_samples()
+    if engine != 'pyjit':
+        # pyjit puede terminar antes de la primera muestra
+        assert samples
+    for line in samples:
+        stack, count = line.rsplit(" ", 1)
+        frames = stack.split(";")
+        assert frames[0] == "main" and set(frames[1:]) <= {"fib"}
+        assert len(frames) <= 21 and int(count) > 0
+    assert VirtualMachine(obj).get_samples() is None
+
+
+def test_samplers_encimados_regresan_el_intervalo():
+    import sys
+    from patito.vm_profile import SamplingProfiler
+    obj = compile_obj(PROGRAMS['recursion'])
+    original = sys.getswitchinterval()
+    lento = SamplingProfiler(VirtualMachine(obj), rate=500)
+    rapido = SamplingProfiler(VirtualMachine(obj), rate=2000)
+
+    lento.start()
+    rapido.start()
+    assert sys.getswitchinterval() == pytest.approx(1 / 2000)
+    # El primero en detenerse no regresa el intervalo mientras el otro muestrea
+    lento.stop()
+    assert sys.getswitchinterval() == pytest.approx(1 / 2000)
+    rapido.stop()
+    rapido.stop()
+    assert sys.getswitchinterval() == original
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_salida_a_sinks(engine):
+    import io
+    from patito.output_sink import CaptureSink, DiscardSink, OutputSink
+    obj = compile_obj(PROGRAMS['llamadas'])
+    expected = VirtualMachine(obj).execute()
+
+    assert VirtualMachine(obj, engine=engine).execute(CaptureSink()) == expected
+    assert VirtualMachine(obj, engine=engine).execute(DiscardSink()) == []
+    assert VirtualMachine(obj, engine=engine).execute(OutputSink(capture=True)) == expected
+    assert VirtualMachine(obj, engine=engine).execute(OutputSink()) == []
+    archivo = io.StringIO()
+    assert VirtualMachine(obj, engine=engine).execute(archivo) == []
+    assert archivo.getvalue() == "".join(expected)
+
+
+def test_salida_con_buffer_se_escribe_en_pedazos():
+    from patito.output_sink import BufferedSink
+
+    class Stream:
+        def __init__(self):
+            self.writes = []
+
+        def write(self, text):
+            self.writes.append(text)
+
+    stream = Stream()
+    obj = compile_obj(PROGRAMS['ciclos'])
+    expected = VirtualMachine(obj).execute()
+    VirtualMachine(obj).execute(BufferedSink(stream, flush_size=16))
+    assert "".join(stream.writes) == "".join(expected)
+    assert len(stream.writes) < len(expected)
+
+
+def test_salida_como_iterador():
+    obj = compile_obj(PROGRAMS['recursion'])
+    assert "".join(VirtualMachine(obj).execute(stream=True)) == "fib=144"
+
+    obj = compile_obj("""
+    programa P;
+    var i: int;
+    main {
+        i = 0;
+        while (i < 100000) do {
+            print(i);
+            i = i + 1;
+        };
+        print(i / 0);
+    }
+    end
+    """)
+    chunks = VirtualMachine(obj).execute(stream=True)
+    assert next(chunks).startswith("0123")
+    chunks.close()
+
+    texto = []
+    with pytest.raises(RuntimeError, match="División por cero"):
+        for chunk in VirtualMachine(obj).execute(stream=True):
+            texto.append(chunk)
+    assert "".join(texto).endswith("99999")
+
+
+def test_presupuesto_de_cuadruplos_y_tiempo_limite():
+    from patito.virtual_machine import ExecutionLimitExceeded
+    obj = compile_obj("""
+    programa Eterno;
+    var i: int;
+    main {
+        i = 0;
+        while (1 > 0) do {
+            i = i + 1;
+        };
+    }
+    end
+    """)
+    vm = VirtualMachine(obj, max_quads=10000)
+    with pytest.raises(ExecutionLimitExceeded, match="10000"):
+        vm.execute()
+    # Se revisa en la arista de regreso: el exceso es menos de una vuelta
+    assert 10000 <= vm.quad_count < 10000 + 5
+    assert vm.quadruples[vm.ip][0] == 'GOTO'
+
+    vm = VirtualMachine(obj, time_limit=0.05)
+    with pytest.raises(ExecutionLimitExceeded, match="Tiempo límite"):
+        vm.execute()
+    with pytest.raises(ValueError):
+        VirtualMachine(obj, engine="threaded", max_quads=10)
+
+
+def test_pausar_y_reanudar():
+    obj = compile_obj(PROGRAMS['llamadas'])
+    reference = VirtualMachine(obj)
+    expected = reference.execute()
+
+    vm = VirtualMachine(obj)
+    vm.start()
+    slices = 1
+    while not vm.resume(50):
+        slices += 1
+        assert vm.running
+    assert slices > 10
+    assert vm.output_buffer == expected
+    assert vm.quad_count == reference.quad_count
+    # Una corrida normal sigue funcionando después
+    assert vm.execute() == expected
+
+
+def test_scheduler_turna_programas():
+    import asyncio
+    from patito.output_sink import AsyncSink
+    from patito.vm_scheduler import VMScheduler
+    from patito.virtual_machine import ExecutionLimitExceeded
+    eterno = compile_obj("""
+    programa Eterno;
+    var i: int;
+    main {
+        i = 0;
+        while (1 > 0) do {
+            i = i + 1;
+        };
+    }
+    end
+    """)
+    objs = [compile_obj(PROGRAMS[name]) for name in ('recursion', 'ciclos', 'llamadas')]
+    expected = [VirtualMachine(obj).execute() for obj in objs]
+
+    received = []
+
+    async def writer(text):
+        received.append(text)
+
+    scheduler = VMScheduler(slice_quads=20)
+    tasks = [scheduler.submit(VirtualMachine(obj)) for obj in objs[:2]]
+    tasks.append(scheduler.submit(VirtualMachine(objs[2]), AsyncSink(writer)))
+    stuck = scheduler.submit(VirtualMachine(eterno, max_quads=5000))
+    stats = asyncio.run(scheduler.run())
+
+    assert [task.output for task in tasks] == expected
+    assert all(task.status == 'terminado' and task.slices > 1 for task in tasks)
+    assert stuck.status == 'error' and isinstance(stuck.error, ExecutionLimitExceeded)
+    assert stats['finished'] == 3 and stats['failed'] == 1
+    assert stats['quads'] == sum(task.vm.quad_count for task in scheduler.tasks)
+    assert "".join(received) == "".join(expected[2])
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_cada_corrida_empieza_con_memoria_limpia(engine):
+    obj = compile_obj("""
+    programa Cuenta;
+    var s: int;
+    main {
+        s = s + 1;
+        print(s);
+    }
+    end
+    """)
+    vm = VirtualMachine(obj, engine=engine)
+    assert vm.execute() == vm.execute() == ["1"]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_run_batch_con_manifiesto(tmp_path, jobs):
+    import json
+    from patito.obj_generator import ObjGenerator
+    from patito.batch_runner import run_batch
+    sources = {
+        'fib': PROGRAMS['recursion'],
+        'eterno': "programa E; var i: int; main { i = 0; while (1 > 0) do { i = i + 1; }; } end",
+        'div': "programa D; var x: int; main { x = 0; print(1 / x); } end",
+    }
+    for name, source in sources.items():
+        ObjGenerator.generate(parse_and_validate(source), str(tmp_path / f"{name}.obj"))
+    (tmp_path / "lote.txt").write_text("# programas\nfib.obj\neterno.obj\ndiv.obj\nfalta.obj\n")
+
+    results = tmp_path / "resultados.jsonl"
+    summary = run_batch(str(tmp_path / "lote.txt"), str(results), jobs=jobs, repeat=2, max_quads=10000)
+    records = [json.loads(line) for line in results.read_text().splitlines()]
+
+    assert [record['index'] for record in records] == list(range(8))
+    assert [record['status'] for record in records[::2]] == ['ok', 'timeout', 'error', 'load_error']
+    assert records[0]['output'] == records[1]['output'] == "fib=144"
+    assert records[0]['quads'] == records[1]['quads'] > 0
+    assert [record['exit_code'] for record in records[::2]] == [0, 2, 1, 3]
+    assert summary['runs'] == 8 and summary['ok'] == 2 and summary['timeouts'] == 2
+
+
+def test_run_batch_sobrevive_a_un_proceso_que_muere(tmp_path, monkeypatch):
+    import os
+    import multiprocessing
+    from patito import batch_runner
+    from patito.obj_generator import ObjGenerator
+    if multiprocessing.get_start_method() != 'fork':
+        pytest.skip("el proceso hijo necesita heredar el monkeypatch (fork)")
+    obj_path = tmp_path / "fib.obj"
+    ObjGenerator.generate(parse_and_validate(PROGRAMS['recursion']), str(obj_path))
+    programs = [str(obj_path), str(tmp_path / "muere.obj"), str(obj_path)]
+
+    run_one = batch_runner.run_one
+
+    def dies(job):
+        if job[1].endswith("muere.obj"):
+            os._exit(1)
+        return run_one(job)
+    monkeypatch.setattr(batch_runner, 'run_one', dies)
+
+    records = list(batch_runner.iter_batch(programs, jobs=2, chunk_size=1))
+    assert [record['index'] for record in records] == [0, 1, 2]
+    assert [record['status'] for record in records] == ['ok', 'error', 'ok']
+    assert "terminó de golpe" in records[1]['error']
+    assert records[2]['output'] == "fib=144"
+
+
+def test_run_batch_cache_acotada(tmp_path):
+    from patito import batch_runner
+    from patito.obj_generator import ObjGenerator
+    paths = []
+    for number in range(3):
+        path = tmp_path / f"p{number}.obj"
+        ObjGenerator.generate(parse_and_validate(PROGRAMS['recursion']), str(path))
+        paths.append(str(path))
+
+    batch_runner._init_worker({}, cache_size=2)
+    try:
+        for path in paths + paths[:1]:
+            batch_runner._load_vm(path)
+        assert list(batch_runner._worker_vms) == [paths[2], paths[0]]
+    finally:
+        batch_runner._worker_vms.clear()
+
+
+def test_checkpoint_y_restore():
+    from patito.vm_checkpoint import CheckpointError
+    obj = compile_obj(PROGRAMS['recursion'])
+    reference = VirtualMachine(obj)
+    expected = reference.execute()
+
+    vm = VirtualMachine(obj)
+    vm.start()
+    # A media recursión: con llamadas activas y frames de ERA pendientes
+    while not vm.memory.call_stack or not vm.pending_frames:
+        assert not vm.resume(7)
+    before = list(vm.output_buffer)
+    snapshot = vm.checkpoint()
+
+    restored = VirtualMachine(obj)
+    restored.restore(snapshot)
+    assert restored.ip == vm.ip and restored.quad_count == vm.quad_count
+    assert restored.memory.return_stack == vm.memory.return_stack
+    assert restored.pending_frames == vm.pending_frames
+    assert restored.resume()
+    assert before + restored.output_buffer == expected
+    assert restored.quad_count == reference.quad_count
+    assert restored.get_checkpoint_stats()['restores'] == 1
+
+    otro = VirtualMachine(compile_obj(PROGRAMS['ciclos']))
+    with pytest.raises(CheckpointError, match="otro programa"):
+        otro.restore(snapshot)
+    with pytest.raises(CheckpointError):
+        restored.restore(b"basura")
+
+
+def test_restore_revisa_el_checkpoint_contra_el_programa():
+    import marshal
+    import zlib
+    from patito.vm_checkpoint import CheckpointError, _HEADER
+    obj = compile_obj(PROGRAMS['recursion'])
+    vm = VirtualMachine(obj)
+    vm.start()
+    while not vm.memory.call_stack or not vm.pending_frames:
+        assert not vm.resume(7)
+    snapshot = vm.checkpoint()
+    header = snapshot[:_HEADER.size]
+    state = list(marshal.loads(zlib.decompress(snapshot[_HEADER.size:])))
+
+    def forged(index, value):
+        broken = list(state)
+        broken[index] = value
+        return header + zlib.compress(marshal.dumps(tuple(broken)))
+
+    name, frame, ret = state[5][0]
+    cases = {
+        "IP": forged(0, len(obj['quadruples']) + 5),
+        "Globales int": forged(3, state[3][:-1] if state[3] else [0]),
+        "Frame de": forged(5, [(name, frame[:-1], ret)]),
+        "ninguna función": forged(6, ('no_existe', state[6][1])),
+        "pendiente": forged(7, [[0] * 999]),
+        "int / float": forged(7, [["x"] * len(state[7][0])]),
+    }
+    restored = VirtualMachine(obj)
+    for message, data in cases.items():
+        with pytest.raises(CheckpointError, match=message):
+            restored.restore(data)
+    # Un checkpoint rechazado no deja la VM a medias
+    restored.restore(snapshot)
+    assert restored.resume() and restored.output_buffer[-1:] == ["144"]
+
+
+def test_worker_pool_con_cache(tmp_path):
+    from patito.obj_generator import ObjGenerator
+    from patito.worker_pool import run_requests
+    ObjGenerator.generate(parse_and_validate(PROGRAMS['recursion']), str(tmp_path / "fib.obj"))
+    eterno = "programa E; var i: int; main { i = 0; while (1 > 0) do { i = i + 1; }; } end"
+    requests = [{'id': n, 'obj': str(tmp_path / "fib.obj")} for n in range(6)]
+    requests += [
+        {'id': 'eterno', 'source': eterno},
+        {'id': 'roto', 'source': "programa R; main { print(x); } end"},
+        {'id': 'falta', 'obj': str(tmp_path / "falta.obj")},
+    ]
+    responses, stats = run_requests(requests, workers=2, cache_size=2, max_quads=10000)
+
+    assert [response['id'] for response in responses] == [request['id'] for request in requests]
+    assert all(response['output'] == "fib=144" for response in responses[:6])
+    assert [response['status'] for response in responses[6:]] == ['timeout', 'load_error', 'load_error']
+    # fib se decodifica una vez por worker; las demás corridas son aciertos
+    assert stats['cache_misses'] == 2 + 2 and stats['cache_hits'] == 4
+    assert sum(response['cached'] for response in responses) == 4
+    assert stats['requests'] == 9 and stats['ok'] == 6 and stats['max_queue_depth'] >= 1
+    assert 0 < stats['latency_ms']['p50'] <= stats['latency_ms']['p99']
+
+
+def test_motor_numpy_memoria_tipada():
+    np = pytest.importorskip("numpy")
+    from patito.vm_numpy import ArithmeticOverflowError
+    # Programas sin ints guardados en variables float: misma salida
+    for name in ('recursion', 'ciclos'):
+        obj = compile_obj(PROGRAMS[name])
+        assert VirtualMachine(obj, engine='numpy').execute() == VirtualMachine(obj).execute()
+
+    # 'floats' guarda ints en variables float: aquí son float de verdad
+    vm = VirtualMachine(compile_obj(PROGRAMS['floats']), engine='numpy')
+    assert "".join(vm.execute()) == "4.5 4 33.333333333333336 2.0"
+    assert vm.memory.global_int.dtype == np.int64 and vm.memory.global_float.dtype == np.float64
+    assert list(vm.memory.global_float) == [9.0, 2.0, 4.5]
+
+    crece = compile_obj(
+        "programa C; var x, i: int; main { x = 3; i = 0; "
+        "while (i < 70) do { x = x * 2; i = i + 1; }; print(x); } end")
+    with pytest.raises(ArithmeticOverflowError, match="Desbordamiento"):
+        VirtualMachine(crece, engine='numpy').execute()
+    assert VirtualMachine(crece, engine='numpy', overflow='wrap').execute() == ["0"]
+    with pytest.raises(ValueError):
+        VirtualMachine(crece, overflow='wrap')
+
+    # El análisis de rangos prueba x != 0, pero en int64 da la vuelta a 0
+    divide = compile_obj(
+        "programa D; var x, i, y: int; main { x = 3; i = 0; "
+        "while (i < 70) do { x = x * 2; i = i + 1; }; y = 10 / x; print(x, y); } end")
+    with pytest.raises(RuntimeError, match="División por cero"):
+        VirtualMachine(divide, engine='numpy', overflow='wrap').execute()
+
+    # Recursión que no cabe en los stacks iniciales de frames
+    from patito.frame_layout import CallDepthError
+    from patito.vm_numpy import INITIAL_STACK_SLOTS
+    obj = compile_obj(
+        "programa P; int baja(n: int) { { if (n < 1) { return(0); }; "
+        "return(baja(n - 1) + 1); } }; main { print(baja(%d)); } end" % INITIAL_STACK_SLOTS)
+    assert VirtualMachine(obj, engine='numpy').execute() == [str(INITIAL_STACK_SLOTS)]
+    with pytest.raises(CallDepthError):
+        VirtualMachine(obj, engine='numpy', max_depth=100).execute()
+
+
+def test_carriles_una_corrida_por_entrada(tmp_path):
+    pytest.importorskip("numpy")
+    from patito.vm_lanes import load_inputs, run_lanes
+    fuente = (
+        "programa L; var n, r: int; var x: float; "
+        "int fib(k: int) { { if (k < 2) { return(k); }; return(fib(k - 1) + fib(k - 2)); } }; "
+        "main { %s r = fib(n); while (n > 3) do { n = n - 2; }; "
+        "print(r, \" \", 12 / n, \" \", x / 2); } end")
+    obj = compile_obj(fuente % "")
+    assert obj['globals'] == {'n': 1001, 'r': 1002, 'x': 2000}
+
+    # Cada carril da lo mismo que una corrida escalar con esas globales
+    entradas = tmp_path / "entradas.csv"
+    entradas.write_text("n,x\n" + "".join(f"{n},{n}.5\n" for n in range(1, 12)))
+    registros, machine = run_lanes(obj, load_inputs(str(entradas), obj['globals']))
+    assert len(registros) == 11 and machine.steps < sum(r['quads'] for r in registros)
+    for n, registro in zip(range(1, 12), registros):
+        escalar = VirtualMachine(compile_obj(fuente % f"n = {n}; x = {n}.5;"), engine='numpy')
+        assert registro['output'] == "".join(escalar.execute())
+        assert registro['status'] == 'ok' and registro['globals']['r'] == int(registro['output'].split()[0])
+
+    # Un error detiene solo a su carril
+    registros, _ = run_lanes(obj, {'n': [0, 5, 40]}, max_quads=5000)
+    assert [r['status'] for r in registros] == ['error', 'ok', 'timeout']
+    assert registros[0]['error'] == "División por cero" and registros[1]['output'] == "5 4 0.0"
+    with pytest.raises(ValueError, match="Columna desconocida"):
+        run_lanes(obj, {'y': [1]})
@@ -0,0 +1,672 @@
+"""
+Tests de las optimizaciones de la Máquina Virtual Patito.
+"""
+
+import pytest
+from pathlib import Path
+from patito import parse_and_validate, VirtualMachine
+from patito.range_analysis import RangeAnalysis, specialize_divisions
+
+EJEMPLO = Path(__file__).resolve().parent.parent / "ejemplo.patito"
+
+
+def compile_obj(source_code):
+    """Helper para compilar un programa a su dict .obj."""
+    sdt = parse_and_validate(source_code)
+    assert not sdt.has_errors(), sdt.errors
+    return sdt.to_obj()
+
+
+def div_ops(obj_data):
+    """Regresa los opcodes de división después de especializar."""
+    quads = specialize_divisions(obj_data['quadruples'], obj_data['constants'], obj_data['functions'])
+    return [quad[0] for quad in quads if quad[0].startswith('DIV')]
+
+
+def test_div_constante_entera_se_especializa():
+    obj = compile_obj("""
+    programa P;
+    var x, y: int;
+    main {
+        x = 17;
+        y = x / 5;
+        print(y);
+    }
+    end
+    """)
+    assert div_ops(obj) == ['DIV_II']
+    assert VirtualMachine(obj).execute() == ['3']
+
+
+def test_div_float_se_especializa():
+    obj = compile_obj("""
+    programa P;
+    var z: float;
+    main {
+        z = 7.5;
+        print(z / 2);
+    }
+    end
+    """)
+    assert div_ops(obj) == ['DIV_FF']
+    assert VirtualMachine(obj).execute() == ['3.75']
+
+
+def test_float_con_valor_int_no_se_asume_float():
+    # z es float pero guarda un int: el análisis sigue el tipo del valor
+    obj = compile_obj("""
+    programa P;
+    var z: float;
+    main {
+        z = 7;
+        print(z / 2);
+    }
+    end
+    """)
+    assert div_ops(obj) == ['DIV_II']
+    assert VirtualMachine(obj).execute() == VirtualMachine(obj, optimize=False).execute()
+
+
+def test_divisor_desconocido_conserva_div():
+    obj = compile_obj("""
+    programa P;
+    var x, y: int;
+    main {
+        x = 10;
+        y = 0;
+        print(x / y);
+    }
+    end
+    """)
+    assert div_ops(obj) == ['DIV']
+    with pytest.raises(RuntimeError, match="División por cero"):
+        VirtualMachine(obj).execute()
+
+
+def test_parametro_divisor_conserva_div():
+    obj = compile_obj("""
+    programa P;
+    var r: int;
+    int mitad(a: int, b: int) {
+        {
+            return(a / b);
+        }
+    };
+    main {
+        r = mitad(10, 2);
+        print(r);
+    }
+    end
+    """)
+    assert set(div_ops(obj)) == {'DIV'}
+    assert VirtualMachine(obj).execute() == ['5']
+
+
+def test_ciclo_con_contador_positivo():
+    obj = compile_obj("""
+    programa P;
+    var i, s: int;
+    main {
+        i = 1;
+        s = 0;
+        while (i < 10) do {
+            s = s + 100 / i;
+            i = i + 1;
+        };
+        print(s);
+    }
+    end
+    """)
+    assert div_ops(obj) == ['DIV_II']
+    assert VirtualMachine(obj).execute() == VirtualMachine(obj, optimize=False).execute()
+
+
+def test_ciclo_que_puede_llegar_a_cero():
+    obj = compile_obj("""
+    programa P;
+    var i, s: int;
+    main {
+        i = 5;
+        s = 0;
+        while (i > 0) do {
+            i = i - 1;
+            s = s + 10 / i;
+        };
+    }
+    end
+    """)
+    assert div_ops(obj) == ['DIV']
+
+
+def test_globales_desconocidas_despues_de_llamada():
+    obj = compile_obj("""
+    programa P;
+    var d, r: int;
+    void cambia() {
+        {
+            d = 0;
+        }
+    };
+    main {
+        d = 4;
+        cambia();
+        r = 8 / d;
+    }
+    end
+    """)
+    assert div_ops(obj) == ['DIV']
+
+
+def test_value_before_inalcanzable():
+    obj = compile_obj("programa P; var x: int; main { x = 1; } end")
+    analysis = RangeAnalysis(obj['quadruples'], obj['constants'], obj['functions']).run()
+    assert analysis.value_before(0, 1000) == ('int', 0, 0)
+
+
+def test_analisis_solo_en_regiones_con_division():
+    obj = compile_obj("""
+    programa P;
+    var r: int;
+    void sin_div(a: int) {
+        {
+            r = a + 1;
+        }
+    };
+    main {
+        r = 8 / 2;
+        sin_div(r);
+    }
+    end
+    """)
+    quads = obj['quadruples']
+    start = obj['functions']['sin_div']['quad_start']
+    analysis = RangeAnalysis(quads, obj['constants'], obj['functions'], only_divisions=True).run()
+    assert analysis.value_before(start, 1000) is None
+    assert analysis.value_before(len(quads) - 1, 1000) is not None
+    assert div_ops(obj) == ['DIV_II']
+
+    # Una región más larga que el límite no se analiza y su DIV queda genérico
+    small = RangeAnalysis(quads, obj['constants'], obj['functions'],
+                          only_divisions=True, max_region_quads=2).run()
+    assert all(state is None for state in small.states)
+
+
+def test_frame_preasignado_con_resources():
+    obj = compile_obj("""
+    programa P;
+    var r: int;
+    int f(a: int, b: float) {
+        var c: int;
+        {
+            c = a + 1;
+            return(c);
+        }
+    };
+    main {
+        r = f(1, 2.5);
+    }
+    end
+    """)
+    vm = VirtualMachine(obj)
+    layout = vm.frame_layouts['f']
+    assert layout.sizes == {3: 2, 4: 1, 5: obj['functions']['f']['resources']['temp_int'], 6: 0}
+    # Un solo frame plano: [local int | local float | temp int | temp float]
+    assert layout.bases == {3: 0, 4: 2, 5: 3, 6: 3 + layout.sizes[5]}
+    frame = vm.memory.push_activation_record(0, layout)
+    assert len(frame) == layout.size
+    assert vm.memory.get_value(3001) == 0
+    vm.memory.set_value(4000, 2.5)
+    assert frame[2] == 2.5
+
+
+def test_frames_se_reutilizan_en_recursion():
+    obj = compile_obj(EJEMPLO.read_text(encoding="utf-8"))
+    vm = VirtualMachine(obj)
+    vm.execute()
+    # Al terminar, cada frame usado quedó en la free list de su función
+    (layout,) = [layout for layout in vm.frame_layouts.values() if layout.free]
+    assert len(layout.free) == 3
+    frames = list(layout.free)
+    vm.execute()
+    # La segunda corrida no creó frames nuevos y los reutilizados empiezan en 0
+    assert all(any(frame is old for old in frames) for frame in layout.free)
+    assert vm.output_buffer == ["El factorial de 3 es: ", "6"]
+
+
+def test_recursion_profunda_con_limite():
+    from patito.frame_layout import CallDepthError, FREE_LIST_LIMIT
+    obj = compile_obj("""
+    programa Profundo;
+    var r: int;
+    int baja(n: int) {
+        {
+            if (n < 1) {
+                return(0);
+            };
+            return(baja(n - 1) + 1);
+        }
+    };
+    main {
+        r = baja(3000);
+        print(r);
+    }
+    end
+    """)
+    # baja(3000) hace 3001 llamadas anidadas
+    vm = VirtualMachine(obj, max_depth=3001)
+    assert vm.execute() == ["3000"]
+    # La free list no se queda con todos los frames de la recursión
+    assert len(vm.frame_layouts['baja'].free) == FREE_LIST_LIMIT
+
+    vm = VirtualMachine(obj, max_depth=3000)
+    with pytest.raises(CallDepthError) as info:
+        vm.execute()
+    assert info.value.max_depth == 3000 and info.value.function == 'baja'
+    assert vm.quadruples[vm.ip][0] == 'GOSUB'
+    assert vm.get_memory_snapshot()['call_stack_depth'] == 3000
+
+
+
+def test_planes_de_llamada():
+    from patito.quad_decoder import OP_ERA, OP_PARAM, OP_GOSUB
+    obj = compile_obj("""
+    programa P;
+    var r: float;
+    float f(a: int, x: float, b: int) {
+        var c: int;
+        {
+            c = a + b;
+            return(c * x);
+        }
+    };
+    main {
+        r = f(2, f(1, 0.5, 3), 4);
+        print(r);
+    }
+    end
+    """)
+    vm = VirtualMachine(obj)
+    plan = vm.call_plans['f']
+    # int -> local int en orden, float -> local float (después de los int)
+    assert plan.slots == [0, 3, 1]
+    assert plan.entry == obj['functions']['f']['quad_start']
+    assert plan.layout is vm.frame_layouts['f']
+
+    # ERA / GOSUB traen el plan; PARAM trae su posición en el frame
+    for instr in vm.code:
+        if instr[0] in (OP_ERA, OP_GOSUB):
+            assert instr[1] is plan
+        elif instr[0] == OP_PARAM:
+            assert instr[6] == plan.slots[instr[3]]
+    assert vm.execute() == ["12.0"]
+    assert vm.pending_frames == []
+
+def test_memoria_en_listas():
+    from patito.virtual_machine import ExecutionMemory
+    memory = ExecutionMemory(global_int=2)
+    memory.load_constants({7000: 4, 8000: 1.5})
+    memory.set_value(1001, 9)
+    memory.set_value(1005, 3)  # fuera del tamaño inicial: crece
+    assert memory.get_value(1001) == 9
+    assert memory.get_value(1005) == 3
+    assert memory.get_value(2000) == 0
+    assert memory.get_value(8000) == 1.5
+    with pytest.raises(ValueError):
+        memory.get_value(7003)
+    with pytest.raises(ValueError):
+        memory.set_value(7000, 1)
+    with pytest.raises(ValueError):
+        memory.get_value(9500)
+
+
+def test_snapshot_y_recursion():
+    obj = compile_obj(EJEMPLO.read_text(encoding="utf-8"))
+    vm = VirtualMachine(obj)
+    assert vm.execute() == ["El factorial de 3 es: ", "6"]
+    snapshot = vm.get_memory_snapshot()
+    assert 6 in snapshot['global'].values()
+    assert snapshot['call_stack_depth'] == 0
+
+
+def test_decodificacion_a_opcodes_enteros():
+    from patito.quad_decoder import decode, OP_PLUS, OP_GOTO, OP_END, OP_PRINT_STR
+    quads = [('GOTO', None, None, 1), ('PLUS', 1000, 7000, 5003), ('PRINT', 'hola', None, None)]
+    code = decode(quads, {7000: 2})
+    assert code[0] == (OP_GOTO, 0, 0, 0, 0, 0, 1)
+    assert code[1] == (OP_PLUS, 1, 0, 7, 0, 5, 3)
+    assert code[2][:2] == (OP_PRINT_STR, 'hola')
+    # END de guardia al final
+    assert code[-1][0] == OP_END
+
+
+def test_cuadruplo_invalido_falla_al_ejecutarse():
+    obj = {
+        'quadruples': [('GOTO', None, None, 1), ('PRINT', 'a', None, None),
+                       ('FOO', None, None, None), ('END', None, None, None)],
+        'constants': {},
+        'functions': {},
+    }
+    vm = VirtualMachine(obj)
+    with pytest.raises(RuntimeError, match="Operación desconocida: FOO"):
+        vm.execute()
+    assert vm.output_buffer == ['a']
+    assert vm.ip == 2
+
+
+def test_caer_al_final_termina_y_cuenta_cuadruplos():
+    obj = {
+        'quadruples': [('GOTO', None, None, 1), ('=', 7000, None, 1000), ('PRINT', 1000, None, None)],
+        'constants': {7000: 5},
+        'functions': {},
+    }
+    vm = VirtualMachine(obj)
+    assert vm.execute() == ['5']
+    assert vm.quad_count == 4
+
+
+
+def test_descriptor_de_operando():
+    from patito.memory_map import MemoryMap
+    assert MemoryMap.resolve(4003) == (4, 3, 'local', 'float')
+    assert MemoryMap.resolve(7010).scope == 'constant'
+    assert MemoryMap.get_segment(5999) == 'temp'
+    assert MemoryMap.get_type_from_address(2000) == 'float'
+    for invalida in (999, 9000, -1, None, True):
+        with pytest.raises(ValueError):
+            MemoryMap.resolve(invalida)
+
+
+def test_direcciones_invalidas_se_detectan_al_cargar():
+    from patito.quad_decoder import decode, OP_ERROR
+    code = decode([('PLUS', 1000, 9123, 5000), ('=', 7000, None, 8000)], {7000: 1})
+    assert code[0][0] == OP_ERROR and "fuera de rango" in code[0][1]
+    assert code[1][0] == OP_ERROR and "constantes" in code[1][1]
+
+CICLO_CON_IF = """
+programa Traza;
+var i, s: int;
+var f: float;
+main {
+    i = 0;
+    s = 0;
+    f = 0.5;
+    while (i < 50) do {
+        if (i > 30) {
+            s = s + i / 3;
+        } else {
+            s = s - 1;
+        };
+        f = f * 1.5 / 2;
+        i = i + 1;
+    };
+    print(s, " ", f);
+}
+end
+"""
+
+
+def test_traza_de_ciclo_caliente_da_el_mismo_resultado():
+    obj = compile_obj(CICLO_CON_IF)
+    reference = VirtualMachine(obj)
+    expected = reference.execute()
+
+    vm = VirtualMachine(obj, hot_loop_threshold=5)
+    assert vm.execute() == expected
+    assert vm.quad_count == reference.quad_count
+    assert vm.get_memory_snapshot()['global'] == reference.get_memory_snapshot()['global']
+
+    stats = vm.get_trace_stats()
+    (loop,) = stats['loops'].values()
+    assert loop['status'] == 'compilado'
+    # La grabación fue por el else; al cambiar de rama falla la guarda
+    assert loop['entries'] > 1
+    assert [event['event'] for event in stats['events']].count('compile') == 1
+
+
+def test_ciclo_con_llamada_no_se_traza():
+    obj = compile_obj("""
+    programa P;
+    var i: int;
+    void nada() {
+        {
+            print("");
+        }
+    };
+    main {
+        i = 0;
+        while (i < 10) do {
+            nada();
+            i = i + 1;
+        };
+    }
+    end
+    """)
+    vm = VirtualMachine(obj, hot_loop_threshold=2)
+    vm.execute()
+    (loop,) = vm.get_trace_stats()['loops'].values()
+    assert loop['status'] == 'rechazado'
+    assert 'ERA' in loop['reason']
+
+
+def test_division_por_cero_dentro_de_traza():
+    obj = compile_obj("""
+    programa P;
+    var i, s, fin: int;
+    main {
+        i = 5;
+        s = 0;
+        fin = 0 - 1;
+        while (i > fin) do {
+            s = s + 10 / i;
+            i = i - 1;
+        };
+    }
+    end
+    """)
+    reference = VirtualMachine(obj)
+    with pytest.raises(RuntimeError):
+        reference.execute()
+
+    vm = VirtualMachine(obj, hot_loop_threshold=1)
+    with pytest.raises(RuntimeError, match="División por cero"):
+        vm.execute()
+    assert vm.ip == reference.ip
+    assert vm.quad_count == reference.quad_count
+
+
+def test_trazas_solo_con_interp():
+    obj = compile_obj("programa P; main { } end")
+    assert VirtualMachine(obj).get_trace_stats() is None
+    with pytest.raises(ValueError):
+        VirtualMachine(obj, engine='threaded', hot_loop_threshold=10)
+
+
+def test_perfil_de_funciones_y_cuadruplos():
+    import json
+    obj = compile_obj(EJEMPLO.read_text(encoding="utf-8"))
+    reference = VirtualMachine(obj)
+    expected = reference.execute()
+
+    vm = VirtualMachine(obj, profile=True)
+    assert vm.execute() == expected
+    profile = vm.get_profile()
+    assert profile['total_quads'] == vm.quad_count == reference.quad_count
+    assert sum(profile['opcodes'].values()) == profile['total_quads']
+    assert sum(info['quads_self'] for info in profile['functions'].values()) == profile['total_quads']
+    # factorial(3) entra 3 veces; el inclusivo de main es toda la corrida
+    assert profile['functions']['factorial']['calls'] == 3
+    assert profile['functions']['main']['quads_total'] == profile['total_quads']
+    assert all(quad['function'] == 'factorial' for quad in profile['quads']
+               if quad['op'] == 'RETURN')
+    json.dumps(profile)
+
+
+def test_reporte_de_memoria_por_fase_y_frames():
+    import json
+    from patito.output_sink import DiscardSink
+    from patito.memory_report import MemoryReport, STRUCTURES, format_memory_report
+
+    with MemoryReport() as report:
+        sdt = report.compile(EJEMPLO.read_text(encoding="utf-8"))
+        with report.phase('vm_load'):
+            vm = VirtualMachine(sdt.to_obj())
+        report.run(vm, DiscardSink())
+    data = report.to_dict()
+
+    assert [phase['phase'] for phase in data['phases']] == ['parse', 'sdt', 'vm_load', 'instrument', 'vm_run']
+    assert set(data['structures']) == {key for key, _ in STRUCTURES}
+    assert data['structures']['lark_tree'] > 0 and data['structures']['quadruples'] > 0
+    # factorial(3): main + 3 activaciones de factorial vivas a la vez
+    assert data['vm']['max_depth'] == 4
+    factorial = data['vm']['functions']['factorial']
+    assert factorial['calls'] == factorial['max_active'] == 3
+    assert factorial['slots'] == vm.frame_layouts['factorial'].size
+    assert "profundidad maxima 4" in format_memory_report(data)
+    json.dumps(data)
+
+    with pytest.raises(ValueError):
+        MemoryReport().run(VirtualMachine(sdt.to_obj(), engine='pyjit'))
+
+
+def test_hooks_de_depuracion():
+    obj = compile_obj(EJEMPLO.read_text(encoding="utf-8"))
+    reference = VirtualMachine(obj)
+    expected = reference.execute()
+
+    vm = VirtualMachine(obj)
+    events = []
+    quads = []
+    vm.add_hook('call', lambda vm, name: events.append(('call', name)))
+    vm.add_hook('return', lambda vm, name, value: events.append(('return', name, value)))
+    vm.add_hook('print', lambda vm, text: events.append(('print', text)))
+    vm.add_hook('write', lambda vm, ip, address, value: events.append(('write', address, value))
+                if address == obj['globals']['resultado'] else None)
+    vm.add_hook('quad', lambda vm, ip: quads.append(ip))
+    assert vm.execute() == expected
+    assert len(quads) == vm.quad_count == reference.quad_count
+
+    calls = [event for event in events if event[0] == 'call']
+    returns = [event[2] for event in events if event[0] == 'return']
+    assert calls == [('call', 'factorial')] * 3
+    assert returns == [1, 2, 6]
+    assert ('write', obj['globals']['resultado'], 6) in events
+    assert "".join(event[1] for event in events if event[0] == 'print') == "".join(expected)
+
+    # Sin hooks execute() vuelve al loop de siempre
+    for event in list(vm.hooks):
+        for callback in list(vm.hooks[event]):
+            vm.remove_hook(event, callback)
+    events.clear()
+    assert vm.execute() == expected and events == []
+
+    with pytest.raises(ValueError):
+        VirtualMachine(obj, engine='pyjit').add_hook('call', print)
+    with pytest.raises(ValueError):
+        vm.add_hook('jump', print)
+
+
+def test_grabacion_binaria_de_la_ejecucion(tmp_path):
+    from patito.vm_record import TraceReader, TraceRecorder
+
+    obj = compile_obj(EJEMPLO.read_text(encoding="utf-8"))
+    reference = VirtualMachine(obj)
+    expected = reference.execute()
+
+    path = str(tmp_path / "corrida.ptrace")
+    vm = VirtualMachine(obj, record_trace=path)
+    assert vm.execute() == expected
+    assert vm.get_record_stats()['records'] == vm.quad_count == reference.quad_count
+
+    reader = TraceReader(path)
+    records = list(reader.read())
+    assert len(records) == reader.records == vm.quad_count
+    assert [record[0] for record in records[:2]] == [0, reference._main_start()]
+    assert reader.opcodes[records[-1][1]] == 'END' and not records[-1][4]
+
+    # factorial(3): las llamadas anidadas llegan a profundidad 3
+    factorial = list(reader.read(function='factorial'))
+    assert factorial and all(record[2] >= 1 for record in factorial)
+    assert max(record[2] for record in factorial) == 3
+    returns = [record[3][0] for record in factorial if reader.opcodes[record[1]] == 'RETURN']
+    assert returns == [1, 2, 6]
+    low, high = 3, 5
+    assert all(low <= record[0] <= high for record in reader.read(ip_range=(low, high)))
+
+    # Flushes frecuentes dejan el mismo archivo
+    vm.recorder = TraceRecorder(vm, str(tmp_path / "chico.ptrace"), flush_every=3)
+    vm.execute()
+    assert vm.get_record_stats()['flushes'] > 3
+    assert (tmp_path / "chico.ptrace").read_bytes() == (tmp_path / "corrida.ptrace").read_bytes()
+
+    # El cuádruplo que falla queda al final de la traza
+    failing = compile_obj("programa P; var x: int; main { x = 0; x = 1 / x; } end")
+    vm = VirtualMachine(failing, engine='threaded', record_trace=path)
+    with pytest.raises(RuntimeError):
+        vm.execute()
+    last = list(TraceReader(path).read())[-1]
+    assert last[0] == vm.ip and last[4]
+
+    with pytest.raises(ValueError):
+        VirtualMachine(obj, engine='pyjit', record_trace=path)
+    with pytest.raises(ValueError):
+        reader.read(function='no_existe')
+
+
+def test_perfil_apagado_y_motores():
+    obj = compile_obj("programa P; main { } end")
+    assert VirtualMachine(obj).get_profile() is None
+    with pytest.raises(ValueError):
+        VirtualMachine(obj, engine='pyjit', profile=True)
+    vm = VirtualMachine(obj, engine='threaded', profile=True)
+    vm.execute()
+    assert vm.get_profile()['total_quads'] == 2
+
+
+def test_superinstrucciones_elegidas_por_perfil():
+    from patito.vm_superinstructions import (
+        fusion_sites, fusion_report, choose_superinstructions, SUPERINSTRUCTIONS,
+    )
+    obj = compile_obj("""
+    programa P;
+    var i, s: int;
+    int suma(a: int, b: int) {
+        {
+            return(a + b);
+        }
+    };
+    main {
+        i = 0;
+        s = 0;
+        while (i < 50) do {
+            s = suma(s, i);
+            if (i > 40) {
+            } else {
+                s = s - 1;
+            };
+            i = i + 1;
+        };
+        print(s);
+    }
+    end
+    """)
+    vm = VirtualMachine(obj, superinstructions=False)
+    expected = vm.execute()
+    sites = {name for _, name, _ in fusion_sites(vm.code, vm.region_layouts)}
+    assert sites == {'call', 'arith_assign', 'compare_branch'}
+    assert [name for _, name, _ in fusion_sites(vm.code, vm.region_layouts, ['branch_jump'])] == ['branch_jump']
+
+    # Mismo resultado y mismos cuádruplos contados, con cualquier combinación
+    for names in (True, SUPERINSTRUCTIONS, ('branch_jump',)):
+        fused = VirtualMachine(obj, superinstructions=names)
+        assert fused.execute() == expected
+        assert fused.quad_count == vm.quad_count
+    with pytest.raises(ValueError, match="desconocida"):
+        VirtualMachine(obj, superinstructions=['nada'])
+
+    # El if de rama vacía solo ahorra despachos cuando no salta
+    profiled = VirtualMachine(obj, profile=True)
+    profiled.execute()
+    report = fusion_report([profiled])
+    assert report['totals']['call'] == 50 * 3 and report['totals']['branch_jump'] == 9
+    assert choose_superinstructions(report, min_savings=0.02)[0] == 'call'
+    assert 'branch_jump' not in choose_superinstructions(report, min_savings=0.02)